@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+"""
+@description: Measures axl() construction time per schema version with and without
+              the on-disk WSDL cache. Every sample runs in a fresh interpreter so
+              the numbers match what each pipeline process pays at start.
+
+@usage: python benchmarks/bench_axl_startup.py [--repeat 3] [--versions 11.5 12.5 14.0 15.0]
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+DATA_COLLECTION_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "data_collection")
+VERSIONS = ["11.5", "12.5", "14.0", "15.0"]
+
+SAMPLE = """
+import time
+start = time.perf_counter()
+from ciscoaxl import axl
+axl("user", "password", "127.0.0.1", "{version}", wsdl_cache={wsdl_cache})
+print(time.perf_counter() - start)
+"""
+
+
+def run_sample(version, wsdl_cache, cache_dir):
+    """
+    Times one axl() construction in a fresh interpreter.
+
+    Args:
+        version (str): AXL schema version.
+        wsdl_cache (bool): Whether the WSDL cache is enabled.
+        cache_dir (str): Cache directory used by the sample.
+
+    Returns:
+        float: Construction time in seconds.
+    """
+    env = dict(os.environ, AXL_WSDL_CACHE_DIR=cache_dir)
+    result = subprocess.run(
+        [sys.executable, "-c", SAMPLE.format(version=version, wsdl_cache=wsdl_cache)],
+        cwd=DATA_COLLECTION_DIR,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return float(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    """
+    Runs the startup benchmark and prints a summary table.
+    """
+    parser = argparse.ArgumentParser(description="AXL client startup benchmark")
+    parser.add_argument("--repeat", type=int, default=3, help="Samples per measurement")
+    parser.add_argument("--versions", nargs="+", default=VERSIONS, help="Schema versions")
+    args = parser.parse_args()
+
+    print(f"{'Version':<8} {'No cache (s)':>13} {'Cold cache (s)':>15} {'Warm cache (s)':>15} {'Speedup':>8}")
+    for version in args.versions:
+        uncached, cold, warm = [], [], []
+        for _ in range(args.repeat):
+            uncached.append(run_sample(version, False, tempfile.mkdtemp()))
+            cache_dir = tempfile.mkdtemp()
+            cold.append(run_sample(version, True, cache_dir))
+            warm.append(run_sample(version, True, cache_dir))
+        uncached, cold, warm = (statistics.median(samples) for samples in (uncached, cold, warm))
+        print(f"{version:<8} {uncached:>13.2f} {cold:>15.2f} {warm:>15.2f} {uncached / warm:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+# -*- coding: utf-8 -*-
+"""
+@description: Micro-benchmark of cleanObject + record encoding on Phone.json-shaped data.
+              The exported phones are turned back into the shape zeep returns
+              (OrderedDicts, uuid on every complex value, XFkType fields wrapped
+              in {"_value_1": ..., "uuid": ...}) and replicated to the requested
+              size. The previous recursive implementation is kept here as the
+              reference, both outputs are compared before timing.
+
+@usage: python benchmarks/bench_clean_object.py [--records 5000] [--repeat 3]
+"""
+
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+from collections import OrderedDict
+
+ROOT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.append(os.path.join(ROOT_DIR, "data_collection"))
+
+from zeep.helpers import serialize_object
+from adapter.appcore import cleanObject, encodeRecord
+
+
+def legacy_clean_object(data):
+    """
+    Recursive cleanObject as shipped before the single-pass normalizer.
+    """
+    if 'vendorConfig' in data:
+        del data['vendorConfig']
+    if data != None:
+        if type(data) != str:
+            dictData = dict(serialize_object(data))
+            returnedDict = dictData
+            if "uuid" in dictData:
+                del dictData["uuid"]
+            for key, value in dictData.items():
+                if key == "sigDigits":
+                    continue
+                if type(value) == str:
+                    continue
+                elif type(value) == OrderedDict:
+                    if "_value_1" in value.keys():
+                        returnedDict[key] = value["_value_1"]
+                    else:
+                        returnedDict[key] = legacy_clean_object(value)
+                elif type(value) == list:
+                    returnedDict[key] = [legacy_clean_object(entry) for entry in value]
+            return returnedDict
+        else:
+            return data
+    else:
+        return data
+
+
+def legacy_encode(entry):
+    """
+    Legacy write path: clean, then serialize_object again before json.dumps.
+    """
+    return json.dumps(serialize_object(legacy_clean_object(entry)), indent=4)
+
+
+def to_zeep_shape(value, key=None):
+    """
+    Rebuild the zeep response shape of an exported value.
+
+    Args:
+        value: Value from an exported JSON file.
+        key (str): Key the value is stored under.
+
+    Returns:
+        OrderedDict/list/scalar shaped like serialize_object output.
+    """
+    if isinstance(value, dict):
+        result = OrderedDict((k, to_zeep_shape(v, k)) for k, v in value.items())
+        result["uuid"] = "{00000000-0000-0000-0000-000000000000}"
+        return result
+    if isinstance(value, list):
+        return [to_zeep_shape(entry) for entry in value]
+    if key and key.endswith("Name") and isinstance(value, str):
+        return OrderedDict([("_value_1", value), ("uuid", "{00000000-0000-0000-0000-000000000000}")])
+    return value
+
+
+def load_phones():
+    """
+    Loads every bundled ConfigExports/*/Phone.json.
+
+    Returns:
+        list: Exported phone dicts.
+    """
+    phones = []
+    for path in sorted(glob.glob(os.path.join(ROOT_DIR, "ConfigExports", "*", "Phone.json"))):
+        with open(path, "r") as file:
+            phones.extend(json.load(file))
+    return phones
+
+
+def timed(label, func, records, repeat):
+    """
+    Times func over a fresh copy of the records and prints records/sec.
+
+    Returns:
+        float: Best wall time in seconds.
+    """
+    best = None
+    for _ in range(repeat):
+        batch = [to_zeep_shape(record) for record in records]
+        start = time.perf_counter()
+        for record in batch:
+            func(record)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    print(f"{label:<28} {best:>8.3f} s {len(records) / best:>12,.0f} records/s")
+    return best
+
+
+def main():
+    """
+    Runs the cleanObject micro-benchmark.
+    """
+    parser = argparse.ArgumentParser(description="cleanObject micro-benchmark")
+    parser.add_argument("--records", type=int, default=5000, help="Number of phone records")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per measurement, best is reported")
+    args = parser.parse_args()
+
+    phones = load_phones()
+    records = [phones[index % len(phones)] for index in range(args.records)]
+
+    for record in records[: len(phones)]:
+        if legacy_clean_object(to_zeep_shape(record)) != cleanObject(to_zeep_shape(record)):
+            raise SystemExit(f"Output mismatch for {record.get('name')}")
+
+    print(f"{len(records)} Phone records ({len(phones)} distinct)")
+    legacy_clean = timed("legacy cleanObject", legacy_clean_object, records, args.repeat)
+    single_clean = timed("single-pass cleanObject", cleanObject, records, args.repeat)
+    legacy_write = timed("legacy clean + encode", legacy_encode, records, args.repeat)
+    single_write = timed("single-pass clean + encode", lambda record: encodeRecord(record, "Phone"), records, args.repeat)
+    print(f"cleanObject speedup: {legacy_clean / single_clean:.1f}x, "
+          f"clean + encode speedup: {legacy_write / single_write:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,267 @@
+# -*- coding: utf-8 -*-
+"""
+@description: Throughput and peak memory of each pipeline stage on synthetic exports
+              (see generate_exports.py), checked against THRESHOLDS to catch
+              regressions. Every stage runs in a fresh interpreter, so its peak RSS
+              is its own and not that of the stages before it.
+
+                clean_object                 cleanObject on zeep-shaped Phone records
+                write_results                write_results of zeep-shaped Phone records
+                read_json                    transformation.read_json of Phone.json
+                iter_records                 streaming read of Phone.json
+                site_index                   load_site_index of Phone/User/Line.json
+                transform_users              User.json -> User.csv
+                transform_phones             Phone.json -> Phone.csv
+                transform_directory_numbers  Line.json -> DirectoryNumber.csv
+
+              A stage fails when its throughput is below min_rate, or its peak RSS
+              is above max_rss_mb plus rss_kb_per_device for each phone of the site.
+              The exit code is 1 if any stage failed.
+
+@usage: python benchmarks/bench_suite.py [--devices 1000 10000 100000] [--stages ...]
+            [--data-dir DIR] [--rate-scale 1.0] [--no-check] [--json results.json]
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+ROOT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.append(ROOT_DIR)
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from generate_exports import DEFAULT_OUTPUT_DIR, DEFAULT_SEED, ensure_site, size_label
+
+STAGES = [
+    "clean_object",
+    "write_results",
+    "read_json",
+    "iter_records",
+    "site_index",
+    "transform_users",
+    "transform_phones",
+    "transform_directory_numbers",
+]
+
+# Records/s are set well under the rates of a current laptop core, so only a
+# real regression fails; --rate-scale lowers them for slower machines.
+# read_json keeps the whole export in memory and the transforms hold the site
+# index, so they are allowed to grow with the site; the streaming stages are not.
+THRESHOLDS = {
+    "clean_object": {"min_rate": 2500, "max_rss_mb": 200, "rss_kb_per_device": 0},
+    "write_results": {"min_rate": 1000, "max_rss_mb": 200, "rss_kb_per_device": 0},
+    "read_json": {"min_rate": 2500, "max_rss_mb": 100, "rss_kb_per_device": 32},
+    "iter_records": {"min_rate": 4000, "max_rss_mb": 64, "rss_kb_per_device": 0},
+    "site_index": {"min_rate": 4000, "max_rss_mb": 100, "rss_kb_per_device": 12},
+    "transform_users": {"min_rate": 5000, "max_rss_mb": 100, "rss_kb_per_device": 12},
+    "transform_phones": {"min_rate": 4000, "max_rss_mb": 100, "rss_kb_per_device": 12},
+    "transform_directory_numbers": {"min_rate": 5000, "max_rss_mb": 100, "rss_kb_per_device": 12},
+}
+
+BATCH_SIZE = 1000
+
+
+def peak_rss_mb():
+    """
+    Returns:
+        float: Peak resident set size of this process in MiB, None if unknown.
+    """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in KiB on Linux
+    return peak / (1 << 20) if sys.platform == "darwin" else peak / 1024
+
+
+def zeep_batches(site_dir):
+    """
+    Yields the phones of a site in zeep response shape, BATCH_SIZE at a time.
+    """
+    from bench_clean_object import to_zeep_shape
+    from data_transformation.json_stream import iter_array
+
+    batch = []
+    for phone in iter_array(os.path.join(site_dir, "Phone.json")):
+        batch.append(to_zeep_shape(phone))
+        if len(batch) == BATCH_SIZE:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def run_stage(stage, site_dir, work_dir):
+    """
+    Runs one stage on a synthetic site. Modules are imported here, so each
+    stage's peak RSS only includes what it uses.
+
+    Args:
+        stage (str): One of STAGES.
+        site_dir (str): Directory of the synthetic exports.
+        work_dir (str): Scratch directory for the stage output.
+
+    Returns:
+        tuple: (records read, seconds spent in the measured code).
+    """
+    if stage in ["clean_object", "write_results"]:
+        sys.path.append(os.path.join(ROOT_DIR, "data_collection"))
+        from adapter.appcore import cleanObject, write_results
+
+        if stage == "clean_object":
+            records, seconds = 0, 0.0
+            for batch in zeep_batches(site_dir):
+                start = time.perf_counter()
+                for record in batch:
+                    cleanObject(record)
+                seconds += time.perf_counter() - start
+                records += len(batch)
+            return records, seconds
+
+        # Time spent shaping the records is left out of the write
+        produced = {"records": 0, "seconds": 0.0}
+
+        def produce():
+            batches = zeep_batches(site_dir)
+            while True:
+                start = time.perf_counter()
+                batch = next(batches, None)
+                produced["seconds"] += time.perf_counter() - start
+                if batch is None:
+                    return
+                produced["records"] += len(batch)
+                yield from batch
+
+        start = time.perf_counter()
+        write_results(work_dir, produce(), "Phone")
+        return produced["records"], time.perf_counter() - start - produced["seconds"]
+
+    os.chdir(ROOT_DIR)
+    from data_transformation import transformation
+
+    phone_file = os.path.join(site_dir, "Phone.json")
+    if stage == "read_json":
+        start = time.perf_counter()
+        records = len(transformation.read_json(phone_file))
+        return records, time.perf_counter() - start
+    if stage == "iter_records":
+        start = time.perf_counter()
+        records = sum(1 for _ in transformation.iter_records(phone_file, transformation.PHONE_SPEC.keys))
+        return records, time.perf_counter() - start
+    if stage == "site_index":
+        start = time.perf_counter()
+        index = transformation.load_site_index(site_dir)
+        return len(index.phones) + len(index.users) + len(index.lines), time.perf_counter() - start
+
+    # The transforms are measured with a prebuilt index, as transform_directory shares one
+    index = transformation.load_site_index(site_dir)
+    site_code = os.path.basename(os.path.normpath(site_dir))
+    start = time.perf_counter()
+    if stage == "transform_users":
+        records = transformation.transform_users(
+            os.path.join(site_dir, "User.json"), os.path.join(work_dir, "User.csv"), site_code, index
+        )
+    elif stage == "transform_phones":
+        records = transformation.transform_phones(phone_file, os.path.join(work_dir, "Phone.csv"), index)
+    elif stage == "transform_directory_numbers":
+        records = transformation.transform_directory_numbers(
+            os.path.join(site_dir, "Line.json"), os.path.join(work_dir, "DirectoryNumber.csv"), index
+        )
+    else:
+        raise ValueError(f"Unknown stage {stage}")
+    return records, time.perf_counter() - start
+
+
+def measure(stage, site_dir):
+    """
+    Runs a stage in a fresh interpreter.
+
+    Returns:
+        dict: {"records", "seconds", "peak_rss_mb"} of the stage.
+    """
+    with tempfile.TemporaryDirectory() as work_dir:
+        result = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--run-stage", stage, "--site-dir", site_dir, "--work-dir", work_dir],
+            capture_output=True,
+            text=True,
+        )
+    if result.returncode != 0:
+        raise RuntimeError(f"{stage} failed:\n{result.stderr}")
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def check(stage, sample, rate_scale=1.0):
+    """
+    Compares a stage sample with THRESHOLDS.
+
+    Returns:
+        list: Failure messages, empty if the stage is within its thresholds.
+    """
+    threshold = THRESHOLDS[stage]
+    failures = []
+    min_rate = threshold["min_rate"] * rate_scale
+    if sample["rate"] < min_rate:
+        failures.append(f"{sample['rate']:,.0f} records/s < {min_rate:,.0f}")
+    if sample["peak_rss_mb"] is not None:
+        max_rss = threshold["max_rss_mb"] + threshold["rss_kb_per_device"] * sample["devices"] / 1024
+        if sample["peak_rss_mb"] > max_rss:
+            failures.append(f"peak RSS {sample['peak_rss_mb']:,.0f} MiB > {max_rss:,.0f} MiB")
+    return failures
+
+
+def main():
+    """
+    Runs the benchmark suite, or a single stage with --run-stage.
+    """
+    parser = argparse.ArgumentParser(description="Pipeline stage benchmark suite")
+    parser.add_argument("--devices", type=int, nargs="+", default=[1000, 10000, 100000], help="Site sizes in phones")
+    parser.add_argument("--stages", nargs="+", choices=STAGES, default=STAGES, help="Stages to run")
+    parser.add_argument("--data-dir", default=DEFAULT_OUTPUT_DIR, help="Directory of the synthetic sites, reused across runs")
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED, help="Random seed of the synthetic sites")
+    parser.add_argument("--compact", action="store_true", help="Generate compact JSON exports")
+    parser.add_argument("--rate-scale", type=float, default=1.0, help="Factor applied to every min_rate")
+    parser.add_argument("--no-check", action="store_true", help="Report only, do not fail on thresholds")
+    parser.add_argument("--json", help="Also write the samples to this JSON file")
+    parser.add_argument("--run-stage", choices=STAGES, help=argparse.SUPPRESS)
+    parser.add_argument("--site-dir", help=argparse.SUPPRESS)
+    parser.add_argument("--work-dir", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run_stage:
+        records, seconds = run_stage(args.run_stage, os.path.abspath(args.site_dir), args.work_dir)
+        print(json.dumps({"records": records, "seconds": seconds, "peak_rss_mb": peak_rss_mb()}))
+        return
+
+    samples = []
+    failed = False
+    print(f"{'size':>6} {'stage':<28} {'records':>10} {'seconds':>9} {'records/s':>12} {'peak RSS':>10}")
+    for devices in args.devices:
+        site_dir, _ = ensure_site(args.data_dir, devices, args.seed, args.compact)
+        for stage in args.stages:
+            sample = measure(stage, site_dir)
+            sample.update({"devices": devices, "stage": stage, "rate": sample["records"] / max(sample["seconds"], 1e-9)})
+            sample["failures"] = [] if args.no_check else check(stage, sample, args.rate_scale)
+            failed = failed or bool(sample["failures"])
+            samples.append(sample)
+            rss = "n/a" if sample["peak_rss_mb"] is None else f"{sample['peak_rss_mb']:,.0f} MiB"
+            status = f"  FAIL: {'; '.join(sample['failures'])}" if sample["failures"] else ""
+            print(f"{size_label(devices):>6} {stage:<28} {sample['records']:>10,} {sample['seconds']:>9.3f} "
+                  f"{sample['rate']:>12,.0f} {rss:>10}{status}")
+
+    if args.json:
+        with open(args.json, "w") as file:
+            json.dump(samples, file, indent=4)
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
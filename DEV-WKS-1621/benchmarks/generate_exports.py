@@ -0,0 +1,272 @@
+# -*- coding: utf-8 -*-
+"""
+@description: Generates synthetic CUCM exports (Phone.json, User.json, Line.json) of a
+              large cluster, in the layout written by data_collection. Records are
+              built from the bundled ConfigExports/*/ records, so every key of the
+              real AXL shapes is present, with the identifying fields rewritten:
+
+                - 1 to 4 lines per phone, some shared between phones
+                - common-area phones without an owner, users owning two phones,
+                  users without devices
+                - nulls where AXL returns them: no lines, no partition, no device
+                  pool, no primaryExtension, no associatedDevices
+                - a few primaryExtensions missing from Line.json
+
+              Records are written as they are generated, so 1M devices need no more
+              memory than 1k. The output is the same for the same size and seed.
+
+@usage: python benchmarks/generate_exports.py [--devices 1000 10000 100000 1000000]
+            [--output DIR] [--seed 1621] [--compact]
+        Each size is written to <DIR>/Synthetic-<size>/, e.g. Synthetic-100k/.
+"""
+
+import argparse
+import collections
+import glob
+import json
+import os
+import random
+import tempfile
+
+ROOT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+DEFAULT_OUTPUT_DIR = os.path.join(tempfile.gettempdir(), "cucm_synthetic_exports")
+DEFAULT_SEED = 1621
+SIZES = [1000, 10000, 100000, 1000000]
+MANIFEST_FILE = "manifest.json"
+
+PARTITIONS = ["PhoneDN-PT", "Internal_PT", "uccx_pt", None]
+PARTITION_WEIGHTS = [50, 25, 15, 10]
+LINES_PER_PHONE = [1, 2, 3, 4]
+LINES_PER_PHONE_WEIGHTS = [75, 18, 5, 2]
+COMMON_AREA_RATIO = 0.06
+SECOND_PHONE_RATIO = 0.10
+NO_DEVICE_USER_RATIO = 0.03
+SHARED_LINE_RATIO = 0.10
+NO_LINES_RATIO = 0.03
+UNASSIGNED_LINE_RATIO = 0.02
+NULL_DEVICE_POOL_RATIO = 0.01
+NULL_ASSOCIATED_DEVICES_RATIO = 0.03
+NULL_PRIMARY_EXTENSION_RATIO = 0.25
+MISSING_PRIMARY_EXTENSION_RATIO = 0.02
+RECENT_LINES = 256
+
+
+def size_label(count):
+    """
+    Returns:
+        str: Short label of a size, e.g. 1k, 100k, 1M.
+    """
+    for unit, suffix in ((1000000, "M"), (1000, "k")):
+        if count >= unit and count % unit == 0:
+            return f"{count // unit}{suffix}"
+    return str(count)
+
+
+def load_templates():
+    """
+    Loads the bundled ConfigExports/*/ records used as templates.
+
+    Returns:
+        dict: {"Phone", "User", "Line"} -> list of records.
+    """
+    templates = {"Phone": [], "User": [], "Line": []}
+    for dtype, records in templates.items():
+        for path in sorted(glob.glob(os.path.join(ROOT_DIR, "ConfigExports", "*", f"{dtype}.json"))):
+            with open(path, "r") as file:
+                records.extend(json.load(file))
+    return templates
+
+
+class ArrayWriter(object):
+    """
+    Writes records to a JSON array file one at a time, in the format of
+    write_results in data_collection/adapter/appcore.py.
+    """
+
+    def __init__(self, path, compact=False):
+        self.file = open(path, "w")
+        self.compact = compact
+        self.count = 0
+
+    def write(self, record):
+        if self.compact:
+            self.file.write(("," if self.count else "[") + json.dumps(record, separators=(",", ":")))
+        else:
+            self.file.write((",\n" if self.count else "[\n") + "    " + json.dumps(record, indent=4).replace("\n", "\n    "))
+        self.count += 1
+
+    def close(self):
+        if not self.count:
+            self.file.write("[")
+        self.file.write("]" if self.compact or not self.count else "\n]")
+        self.file.close()
+
+
+def generate_site(site_dir, devices, seed=DEFAULT_SEED, compact=False):
+    """
+    Writes Phone.json, User.json and Line.json of a synthetic site.
+
+    Args:
+        site_dir (str): Directory the exports are written to, created if needed.
+        devices (int): Number of phones.
+        seed (int): Random seed; the same seed gives the same exports.
+        compact (bool): Write compact JSON without indentation.
+
+    Returns:
+        dict: Records written, {"Phone", "User", "Line"}.
+    """
+    os.makedirs(site_dir, exist_ok=True)
+    rng = random.Random(seed)
+    templates = load_templates()
+    line_entry = next(
+        phone["lines"]["line"][0] for phone in templates["Phone"] if (phone.get("lines") or {}).get("line")
+    )
+    site_code = os.path.basename(os.path.normpath(site_dir))
+    writers = {dtype: ArrayWriter(os.path.join(site_dir, f"{dtype}.json"), compact) for dtype in templates}
+    recent_lines = collections.deque(maxlen=RECENT_LINES)
+    counters = {"Phone": 0, "User": 0, "Line": 0}
+
+    def new_line():
+        counters["Line"] += 1
+        pattern = str(1000000 + counters["Line"])
+        partition = rng.choices(PARTITIONS, PARTITION_WEIGHTS)[0]
+        template = templates["Line"][counters["Line"] % len(templates["Line"])]
+        writers["Line"].write(dict(
+            template,
+            pattern=pattern,
+            routePartitionName=partition,
+            description=f"Line {pattern}",
+            alertingName=f"Line {pattern}",
+            asciiAlertingName=f"Line {pattern}",
+        ))
+        return {"pattern": pattern, "routePartitionName": partition}
+
+    def phone_lines(label):
+        if rng.random() < NO_LINES_RATIO:
+            return None
+        dirns = []
+        for _ in range(rng.choices(LINES_PER_PHONE, LINES_PER_PHONE_WEIGHTS)[0]):
+            if recent_lines and rng.random() < SHARED_LINE_RATIO:
+                dirn = rng.choice(recent_lines)
+                if dirn in dirns:
+                    continue
+            else:
+                dirn = new_line()
+                recent_lines.append(dirn)
+            dirns.append(dirn)
+        entries = [
+            dict(line_entry, index=index, label=label, display=label, displayAscii=label, dirn=dict(dirn))
+            for index, dirn in enumerate(dirns, start=1)
+        ]
+        return {"line": entries, "lineIdentifier": None}
+
+    def new_phone(owner, label):
+        template = templates["Phone"][counters["Phone"] % len(templates["Phone"])]
+        name = f"{template['name'][:3]}{counters['Phone']:012X}"
+        counters["Phone"] += 1
+        lines = phone_lines(label)
+        writers["Phone"].write(dict(
+            template,
+            name=name,
+            description=f"{name}_{site_code}_{owner or 'COMMON'}",
+            ownerUserName=owner,
+            devicePoolName=None if rng.random() < NULL_DEVICE_POOL_RATIO else f"{site_code}_DP{counters['Phone'] // 1000}",
+            versionStamp=f"{{{1739376906 + counters['Phone']}-{rng.getrandbits(64):016X}}}",
+            lines=lines,
+        ))
+        return name, lines
+
+    def new_user(phones):
+        counters["User"] += 1
+        userid = f"user{counters['User']:07d}"
+        first_name, last_name = "User", f"{counters['User']:07d}"
+        names, first_line = [], None
+        for _ in range(phones):
+            name, lines = new_phone(userid, f"{first_name} {last_name}")
+            names.append(name)
+            if first_line is None and lines:
+                first_line = lines["line"][0]["dirn"]
+        primary_extension = None
+        draw = rng.random()
+        if draw < MISSING_PRIMARY_EXTENSION_RATIO:
+            primary_extension = {"pattern": f"9{counters['User']:07d}", "routePartitionName": "PhoneDN-PT"}
+        elif first_line is not None and draw >= MISSING_PRIMARY_EXTENSION_RATIO + NULL_PRIMARY_EXTENSION_RATIO:
+            primary_extension = dict(first_line)
+        template = templates["User"][counters["User"] % len(templates["User"])]
+        writers["User"].write(dict(
+            template,
+            userid=userid,
+            firstName=first_name,
+            lastName=last_name,
+            displayName=f"{first_name} {last_name}",
+            mailid=f"{userid}@example.com",
+            associatedDevices=None if not names or rng.random() < NULL_ASSOCIATED_DEVICES_RATIO else {"device": names},
+            primaryExtension=primary_extension,
+            lineAppearanceAssociationForPresences=None,
+        ))
+
+    try:
+        while counters["Phone"] < devices:
+            draw = rng.random()
+            if draw < COMMON_AREA_RATIO:
+                new_phone(None, "Common Area")
+            elif draw < COMMON_AREA_RATIO + NO_DEVICE_USER_RATIO:
+                new_user(0)
+            else:
+                second = devices - counters["Phone"] > 1 and rng.random() < SECOND_PHONE_RATIO
+                new_user(2 if second else 1)
+            if rng.random() < UNASSIGNED_LINE_RATIO:
+                new_line()
+    finally:
+        for writer in writers.values():
+            writer.close()
+    return dict(counters)
+
+
+def ensure_site(output_dir, devices, seed=DEFAULT_SEED, compact=False):
+    """
+    Returns the directory of a synthetic site, generating it unless a site of
+    the same size and seed is already there.
+
+    Args:
+        output_dir (str): Directory holding the Synthetic-<size>/ sites.
+        devices (int): Number of phones.
+        seed (int): Random seed.
+        compact (bool): Write compact JSON without indentation.
+
+    Returns:
+        tuple: (site directory, manifest dict with "devices", "seed", "records").
+    """
+    site_dir = os.path.join(output_dir, f"Synthetic-{size_label(devices)}")
+    manifest_path = os.path.join(site_dir, MANIFEST_FILE)
+    if os.path.exists(manifest_path):
+        with open(manifest_path, "r") as file:
+            manifest = json.load(file)
+        if manifest.get("devices") == devices and manifest.get("seed") == seed and manifest.get("compact") == compact:
+            return site_dir, manifest
+    records = generate_site(site_dir, devices, seed, compact)
+    manifest = {"devices": devices, "seed": seed, "compact": compact, "records": records}
+    with open(manifest_path, "w") as file:
+        json.dump(manifest, file, indent=4)
+    return site_dir, manifest
+
+
+def main():
+    """
+    Generates one synthetic site per requested size.
+    """
+    parser = argparse.ArgumentParser(description="Synthetic CUCM export generator")
+    parser.add_argument("--devices", type=int, nargs="+", default=SIZES, help="Phones per site, one site per size")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT_DIR, help="Directory the sites are written to")
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED, help="Random seed")
+    parser.add_argument("--compact", action="store_true", help="Write compact JSON without indentation")
+    args = parser.parse_args()
+
+    for devices in args.devices:
+        site_dir, manifest = ensure_site(args.output, devices, args.seed, args.compact)
+        size = sum(os.path.getsize(os.path.join(site_dir, f"{dtype}.json")) for dtype in manifest["records"])
+        print(f"{site_dir}: {manifest['records']}, {size / (1 << 20):,.1f} MiB")
+
+
+if __name__ == "__main__":
+    main()
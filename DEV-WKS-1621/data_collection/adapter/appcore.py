@@ -1,137 +1,262 @@
-try:
-    from ciscoaxl import axl
-except:
-    from data_collection.ciscoaxl import axl
 import json
-from collections import OrderedDict
-from zeep.helpers import serialize_object
-import datetime
+from functools import lru_cache
 import traceback
-import multiprocessing as mp
-from tqdm import tqdm
-from sys import exit
 import os
-from pathlib import Path
 
-ucmSourceContent = json.load(open("data_Collection/adapter/source.json"))
-ucm_source = axl(
-    username=ucmSourceContent["username"],
-    password=ucmSourceContent["password"],
-    cucm=ucmSourceContent["sourceCUCM"],
-    cucm_version=ucmSourceContent["version"],
-)
+SOURCE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "source.json")
+
+
+def load_source_content(path=SOURCE_FILE):
+    """
+    Read the CUCM source definition.
+
+    Args:
+        path (str): Path of source.json.
+
+    Returns:
+        dict: Source content (sourceCUCM, username, password, version, siteCode, ...).
+    """
+    with open(path) as sourceFile:
+        return json.load(sourceFile)
+
+
+def load_clusters(source=None):
+    """
+    Expand the source definition into one entry per CUCM cluster.
+
+    source.json either describes a single cluster at top level or holds a
+    "clusters" list. In the latter case every other top-level key (workers,
+    pageSize, collectionMode, ...) is a default the cluster entries may override.
+
+    Args:
+        source (dict): Source content. Defaults to the content of source.json.
+
+    Returns:
+        list: Cluster definitions with sourceCUCM, username, password, version and siteCode.
+    """
+    if source is None:
+        source = load_source_content()
+    defaults = {key: value for key, value in source.items() if key != "clusters"}
+    if "clusters" not in source:
+        return [defaults]
+    return [dict(defaults, **cluster) for cluster in source["clusters"]]
+
+
+@lru_cache(maxsize=None)
+def _connect(cucm, username, password, cucm_version, pool_maxsize):
+    # Imported here so offline tooling (cleanObject, write_results) does not
+    # pay for the AXL client module.
+    try:
+        from ciscoaxl import axl
+    except:
+        from data_collection.ciscoaxl import axl
+    return axl(
+        username=username,
+        password=password,
+        cucm=cucm,
+        cucm_version=cucm_version,
+        pool_maxsize=pool_maxsize,
+    )
+
+
+def get_ucm_source(source=None):
+    """
+    Get the AXL client for a CUCM cluster, creating it on first use.
+
+    Clients are memoized per (cucm, username, password, version), so every
+    caller asking for the same cluster shares one client and its session.
+    The HTTP connection pool is sized to the configured worker count so
+    concurrent requests keep their connections alive.
+
+    Args:
+        source (dict): Cluster definition with sourceCUCM, username, password,
+            version and optionally workers. Defaults to the first cluster of source.json.
+
+    Returns:
+        axl: AXL client for the cluster.
+    """
+    if source is None:
+        source = load_clusters()[0]
+    return _connect(
+        source["sourceCUCM"],
+        source["username"],
+        source["password"],
+        source["version"],
+        max(10, source.get("workers", 1)),
+    )
+
+
+def __getattr__(name):
+    # Backwards compatible module attributes, resolved on first access
+    # instead of at import time.
+    if name == "ucmSourceContent":
+        return load_source_content()
+    if name == "ucm_source":
+        return get_ucm_source()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def _fields(value):
+    # dicts and zeep CompoundValues (whose fields live in __values__) are the
+    # only containers cleanObject descends into
+    if isinstance(value, dict):
+        return value
+    return getattr(value, "__values__", None)
+
+
+def _plain(value):
+    # serialize without cleaning, for values that are kept as returned
+    fields = _fields(value)
+    if fields is not None:
+        return {key: _plain(item) for key, item in fields.items()}
+    if isinstance(value, list):
+        return [_plain(item) for item in value]
+    return value
 
 
 def cleanObject(data):
-    # if 'locationName' in data and data['locationName']:
-    #     print(data)
-    #     exit()
-    if 'vendorConfig' in data:
-        del data['vendorConfig']
-    if data != None:
-        if type(data) != str:
-            dictData = dict(serialize_object(data))
-            returnedDict = dictData
-            if "uuid" in dictData:
-                del dictData["uuid"]
-            for key, value in dictData.items():
-                if key == "sigDigits":
-                    continue
-                if type(value) == str:
-                    continue
-                elif type(value) == OrderedDict:
-                    if "_value_1" in value.keys():
-                        returnedDict[key] = value["_value_1"]
-                    else:
-                        returnedDict[key] = cleanObject(value)
-                elif type(value) == list:
-                    tempdataList = []
-                    for entries in value:
-                        tempdataList.append(cleanObject(entries))
-                    returnedDict[key] = tempdataList
-            return returnedDict
-        else:
-            return data
-    else:
+    """
+    Normalize a zeep object into plain JSON-ready dicts in a single traversal.
+
+    Serialization and cleaning happen in the same walk, driven by an
+    explicit stack: uuid and vendorConfig are dropped, {"_value_1": ...}
+    wrappers under a key are unwrapped, sigDigits is kept as returned, and
+    _raw_elements/_Element deques of lxml elements are folded into their
+    parent as tag: text entries.
+
+    Args:
+        data: zeep object, dict, string or None.
+
+    Returns:
+        dict: Cleaned record (strings and None are returned unchanged).
+    """
+    fields = _fields(data)
+    if fields is None:
         return data
 
+    root = {}
+    stack = [(fields, root)]
+    while stack:
+        source, target = stack.pop()
+        rawElements = []
+        for key, value in source.items():
+            if key == "uuid" or key == "vendorConfig":
+                continue
+            if key == "_raw_elements" or key == "_Element":
+                rawElements.extend(value or [])
+                continue
+            if key == "sigDigits":
+                target[key] = _plain(value)
+                continue
+
+            valueFields = _fields(value)
+            if valueFields is not None:
+                if "_value_1" in valueFields:
+                    target[key] = _plain(valueFields["_value_1"])
+                else:
+                    child = target[key] = {}
+                    stack.append((valueFields, child))
+            elif isinstance(value, list):
+                entries = target[key] = []
+                for entry in value:
+                    entryFields = _fields(entry)
+                    if entryFields is None:
+                        entries.append(entry)
+                    else:
+                        child = {}
+                        entries.append(child)
+                        stack.append((entryFields, child))
+            else:
+                target[key] = value
+
+        # zeep keeps elements unknown to the schema as lxml elements
+        for element in rawElements:
+            target.setdefault(element.tag.rsplit("}", 1)[-1], element.text)
+    return root
 
-def changeDeque(cleanedData):
-    if isinstance(cleanedData, dict):
-        if "_raw_elements" in cleanedData:
-            configsDict = {
-                entry.tag: entry.text
-                for entry in cleanedData["_raw_elements"]
-            }
-            del cleanedData["_raw_elements"]
-            configsDict.update(configsDict)
 
-        if "_Element" in cleanedData:
-            configsDict = {
-                entry.tag: entry.text
-                for entry in cleanedData["_Element"]
-            }
-            del cleanedData["_Element"]
-            configsDict.update(configsDict)
+def encodeRecord(entry, dtype, compact=False, cleaned=False):
+    """
+    Clean a single record and encode it as JSON.
 
+    Args:
+        entry: zeep object or dict returned by an AXL call.
+        dtype (str): Data type being written, e.g. "Phone".
+        compact (bool): Encode without indentation.
+        cleaned (bool): entry is already a cleanObject result and is encoded as is.
+
+    Returns:
+        str: JSON text of the cleaned record.
+    """
+    if dtype in ["callpark", "directedcallpark"]:
+        uuid = None
+        if "uuid" in entry:
+            uuid = entry["uuid"]
+        cleanedData = cleanObject(entry)
+        if uuid != None:
+            cleanedData["uuid"] = uuid
+    elif cleaned:
+        cleanedData = entry
+    else:
+        cleanedData = cleanObject(entry)
 
-        for key, val in cleanedData.items():
-            if isinstance(val, dict):
-                cleanedData[key] = changeDeque(val)
+    if compact:
+        return json.dumps(cleanedData, separators=(",", ":"))
+    return json.dumps(cleanedData, indent=4)
 
-    elif isinstance(cleanedData, list) and isinstance(cleanedData[0], dict):
-        for i in range(len(cleanedData)):
-            cleanedData[i] = changeDeque(cleanedData[i])
 
-    return cleanedData
+def write_results(directory, data, dtype, compact=False, atomic=False, cleaned=False):
+    """
+    Stream records to <directory>/<dtype>.json as a JSON array.
 
+    Records are cleaned, encoded and written one at a time, so memory does
+    not grow with the size of the export. The default output is identical
+    to json.dumps(records, indent=4). Without records, an empty [] replaces
+    the previous export, so records deleted on CUCM do not linger.
 
-def write_results(directory, data, dtype):
+    Args:
+        directory (str): Output directory.
+        data (iterable): Records returned by AXL calls, may be a generator.
+        dtype (str): Data type being written, used as the file name.
+        compact (bool): Write compact JSON without indentation.
+        atomic (bool): Write to a temporary file and rename it on completion,
+            so readers never see a partially written export.
+        cleaned (bool): Records are already cleanObject results, skip cleaning them again.
+
+    Returns:
+        bool: True.
+    """
+    path = os.path.join(directory, dtype + ".json")
+    target = path + ".tmp" if atomic else path
+    jsonFile = None
     try:
-        if dtype in ["callpark", "directedcallpark"]:
-            cleanedData = []
-            for entry in data:
-                uuid = None
-                if "uuid" in entry:
-                    uuid = entry["uuid"]
-                tempCleanedData = cleanObject(entry)
-                if uuid != None:
-                    tempCleanedData["uuid"] = uuid
-                cleanedData.append(tempCleanedData)
-                del tempCleanedData
-        else:
-            cleanedData = [cleanObject(entry) for entry in data]
-        if cleanedData:
-            try:
-                jsonString = json.dumps(
-                    serialize_object(cleanedData), indent=4)
-            except Exception as err:
-                jsonString = []
-                if "Object of type deque" in str(err):
-                    #DO Something to remove the Deque
-                    # print(cleanedData)
-                    cleanedData = changeDeque(cleanedData)
-                    jsonString = json.dumps(
-                        serialize_object(cleanedData), indent=4)
-                else:
-                    # print(cleanedData)
-                    print("Error Occured in writing " +
-                          str(dtype) + " as json file: "+str(err))
-                    traceback.print_exc()
-            jsonFile = open(os.path.join(directory, dtype+".json"), "w")
-            if isinstance(jsonString, list):
-                for entry in jsonString:
-                    jsonFile.write(entry)
+        for entry in data:
+            record = encodeRecord(entry, dtype, compact, cleaned)
+            if jsonFile is None:
+                jsonFile = open(target, "w")
+                jsonFile.write("[" if compact else "[\n")
             else:
-                jsonFile.write(jsonString)
-            print(f"Saved {dtype}.json")
-            jsonFile.close()
-        else:
+                jsonFile.write("," if compact else ",\n")
+            jsonFile.write(record if compact else "    " + record.replace("\n", "\n    "))
+        if jsonFile is None:
             print(f"No Data found for-{dtype}")
+            # Always atomic: the previous export is only replaced once [] is on disk
+            emptyTarget = path + ".tmp"
+            with open(emptyTarget, "w") as emptyFile:
+                emptyFile.write("[]")
+            os.replace(emptyTarget, path)
+            return True
+        jsonFile.write("]" if compact else "\n]")
+        jsonFile.close()
+        if atomic:
+            os.replace(target, path)
+        print(f"Saved {dtype}.json")
     except Exception as err:
-        # print(cleanedData)
         print("Error Occured in writing " +
               str(dtype) + " as json file: "+str(err))
-        # print('Data::',data)
         traceback.print_exc()
-    return True
\ No newline at end of file
+        if jsonFile is not None:
+            jsonFile.close()
+            if atomic and os.path.exists(target):
+                os.remove(target)
+    return True
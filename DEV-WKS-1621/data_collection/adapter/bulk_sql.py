@@ -0,0 +1,383 @@
+# -*- coding: utf-8 -*-
+"""
+Bulk SQL extraction of Phones, Lines and Users.
+
+Instead of one listPhone plus one getPhone round trip per device, the device,
+numplan, devicenumplanmap and enduser tables are read with a handful of paged
+executeSQLQuery calls and folded back into the same nested dicts that
+getPhone/getLine/getUser return, so write_results and the transformation
+stage do not need to know which path produced them.
+"""
+
+from adapter.concurrency import fan_out
+
+SQL_PAGE_SIZE = 5000
+
+# (AXL key, SQL expression) in the order getPhone returns them.
+PHONE_COLUMNS = [
+    ("name", "d.name"),
+    ("description", "d.description"),
+    ("product", "tp.name"),
+    ("model", "tm.name"),
+    ("class", "tc.name"),
+    ("protocol", "tdp.name"),
+    ("callingSearchSpaceName", "css.name"),
+    ("devicePoolName", "dp.name"),
+    ("locationName", "loc.name"),
+    ("versionStamp", "d.versionstamp"),
+    ("ownerUserName", "eu.userid"),
+]
+
+LINE_COLUMNS = [
+    ("pattern", "n.dnorpattern"),
+    ("description", "n.description"),
+    ("usage", "tpu.name"),
+    ("routePartitionName", "rp.name"),
+    ("alertingName", "n.alertingname"),
+    ("asciiAlertingName", "n.alertingnameascii"),
+]
+
+USER_COLUMNS = [
+    ("firstName", "eu.firstname"),
+    ("displayName", "eu.displayname"),
+    ("middleName", "eu.middlename"),
+    ("lastName", "eu.lastname"),
+    ("userid", "eu.userid"),
+    ("mailid", "eu.mailid"),
+    ("department", "eu.department"),
+    ("telephoneNumber", "eu.telephonenumber"),
+]
+
+# Top-level keys the SQL mapping can rebuild, per data type.
+SQL_FIELDS = {
+    "Phone": {key for key, _ in PHONE_COLUMNS} | {"lines"},
+    "Line": {key for key, _ in LINE_COLUMNS},
+    "User": {key for key, _ in USER_COLUMNS} | {"associatedDevices", "primaryExtension"},
+}
+
+# AXL keys read by the transformation (its field specs and site index), the
+# default of pull_sql. "type" and "deviceType" of the Phone CSV are not AXL
+# keys and always take their defaults.
+TRANSFORM_FIELDS = {
+    "Phone": ["name", "ownerUserName", "lines", "model", "devicePoolName"],
+    "Line": ["pattern", "routePartitionName"],
+    "User": ["userid", "firstName", "lastName", "displayName", "primaryExtension", "associatedDevices"],
+}
+
+# getX request of one record of each data type, with the returnedTags to fetch.
+GETTERS = {
+    "Phone": lambda client, record, tags: client.getPhone(name=record["name"], returnedTags=tags),
+    "Line": lambda client, record, tags: client.getLine(
+        pattern=record["pattern"], routePartitionName=record["routePartitionName"], returnedTags=tags
+    ),
+    "User": lambda client, record, tags: client.getUser(userid=record["userid"], returnedTags=tags),
+}
+
+# listPhone searchCriteria keys that can be expressed as SQL filters.
+SEARCH_CRITERIA_COLUMNS = {
+    "name": "d.name",
+    "description": "d.description",
+    "devicePoolName": "dp.name",
+    "callingSearchSpaceName": "css.name",
+}
+
+DEVICE_JOINS = """
+    INNER JOIN typeproduct tp ON tp.enum = d.tkproduct
+    INNER JOIN typemodel tm ON tm.enum = d.tkmodel
+    INNER JOIN typeclass tc ON tc.enum = d.tkclass
+    INNER JOIN typedeviceprotocol tdp ON tdp.enum = d.tkdeviceprotocol
+    LEFT OUTER JOIN callingsearchspace css ON css.pkid = d.fkcallingsearchspace
+    LEFT OUTER JOIN devicepool dp ON dp.pkid = d.fkdevicepool
+    LEFT OUTER JOIN location loc ON loc.pkid = d.fklocation
+    LEFT OUTER JOIN enduser eu ON eu.pkid = d.fkenduser
+"""
+
+
+def _quote(value):
+    """
+    Quote a value as an Informix string literal.
+
+    Args:
+        value (str): Raw value.
+
+    Returns:
+        str: Single-quoted literal with embedded quotes doubled.
+    """
+    return "'" + str(value).replace("'", "''") + "'"
+
+
+def build_device_filter(search_criteria):
+    """
+    Translate listPhone searchCriteria into an SQL WHERE clause.
+
+    Args:
+        search_criteria (dict): listPhone searchCriteria, e.g. {"devicePoolName": "Test_DP"}.
+
+    Returns:
+        str: WHERE clause selecting phones, or None if a criterion has no SQL mapping.
+    """
+    clauses = ["d.tkclass = 1"]
+    for key, value in search_criteria.items():
+        if key not in SEARCH_CRITERIA_COLUMNS:
+            return None
+        operator = "LIKE" if "%" in str(value) else "="
+        clauses.append(f"{SEARCH_CRITERIA_COLUMNS[key]} {operator} {_quote(value)}")
+    return "WHERE " + " AND ".join(clauses)
+
+
+def _select(columns):
+    return ", ".join(f"{expression} AS c{index}" for index, (_, expression) in enumerate(columns))
+
+
+def sql_rows(ucm_source, query, page_size=SQL_PAGE_SIZE):
+    """
+    Run a SELECT through executeSQLQuery, paging with SKIP/FIRST.
+
+    Args:
+        ucm_source: CUCM source object.
+        query (str): SELECT statement without the leading "SELECT" keyword.
+        page_size (int): Rows requested per executeSQLQuery call.
+
+    Returns:
+        list: List of rows as {column tag: text} dicts, or None if a query failed.
+    """
+    rows = []
+    skip = 0
+    while True:
+        result = ucm_source.sql_query(f"SELECT SKIP {skip} FIRST {page_size} {query}")
+        if isinstance(result, str):
+            print(f"Error running SQL query: {result}")
+            return None
+        page = result["row"] if result and result["row"] else []
+        rows.extend({element.tag: element.text for element in row} for row in page)
+        if len(page) < page_size:
+            return rows
+        skip += page_size
+
+
+def _map_row(row, columns):
+    return {key: row.get(f"c{index}") for index, (key, _) in enumerate(columns)}
+
+
+def query_phones(ucm_source, where, page_size=SQL_PAGE_SIZE):
+    """
+    Fetch phones with their line appearances.
+
+    Returns:
+        list: Phone dicts shaped like getPhone responses, or None on failure.
+    """
+    phone_rows = sql_rows(
+        ucm_source,
+        f"{_select(PHONE_COLUMNS)} FROM device d {DEVICE_JOINS} {where} ORDER BY d.name",
+        page_size,
+    )
+    appearance_columns = [
+        ("deviceName", "d.name"),
+        ("index", "dnpm.numplanindex"),
+        ("label", "dnpm.label"),
+        ("display", "dnpm.display"),
+        ("displayAscii", "dnpm.displayascii"),
+        ("pattern", "n.dnorpattern"),
+        ("routePartitionName", "rp.name"),
+    ]
+    appearance_rows = sql_rows(
+        ucm_source,
+        f"{_select(appearance_columns)} FROM device d {DEVICE_JOINS}"
+        " INNER JOIN devicenumplanmap dnpm ON dnpm.fkdevice = d.pkid"
+        " INNER JOIN numplan n ON n.pkid = dnpm.fknumplan"
+        " LEFT OUTER JOIN routepartition rp ON rp.pkid = n.fkroutepartition"
+        f" {where} ORDER BY d.name, dnpm.numplanindex",
+        page_size,
+    )
+    if phone_rows is None or appearance_rows is None:
+        return None
+
+    lines_by_device = {}
+    for row in appearance_rows:
+        appearance = _map_row(row, appearance_columns)
+        lines_by_device.setdefault(appearance["deviceName"], []).append({
+            "index": int(appearance["index"]) if appearance["index"] else None,
+            "label": appearance["label"],
+            "display": appearance["display"],
+            "dirn": {
+                "pattern": appearance["pattern"],
+                "routePartitionName": appearance["routePartitionName"],
+            },
+            "displayAscii": appearance["displayAscii"],
+        })
+
+    phones = []
+    for row in phone_rows:
+        phone = _map_row(row, PHONE_COLUMNS)
+        line_entries = lines_by_device.get(phone["name"])
+        phone["lines"] = {"line": line_entries} if line_entries else None
+        phones.append(phone)
+    return phones
+
+
+def query_version_stamps(ucm_source, where, page_size=SQL_PAGE_SIZE):
+    """
+    Fetch only the name and versionStamp of the selected phones.
+
+    Returns:
+        dict: {phone name: versionStamp} in name order, or None on failure.
+    """
+    columns = [("name", "d.name"), ("versionStamp", "d.versionstamp")]
+    rows = sql_rows(
+        ucm_source,
+        f"{_select(columns)} FROM device d {DEVICE_JOINS} {where} ORDER BY d.name",
+        page_size,
+    )
+    if rows is None:
+        return None
+    return {entry["name"]: entry["versionStamp"] for entry in (_map_row(row, columns) for row in rows)}
+
+
+def query_lines(ucm_source, where, page_size=SQL_PAGE_SIZE):
+    """
+    Fetch the directory numbers that appear on the selected phones.
+
+    Returns:
+        list: Line dicts shaped like getLine responses, or None on failure.
+    """
+    rows = sql_rows(
+        ucm_source,
+        f"DISTINCT {_select(LINE_COLUMNS)} FROM numplan n"
+        " INNER JOIN typepatternusage tpu ON tpu.enum = n.tkpatternusage"
+        " LEFT OUTER JOIN routepartition rp ON rp.pkid = n.fkroutepartition"
+        " WHERE n.pkid IN (SELECT dnpm.fknumplan FROM device d"
+        f" INNER JOIN devicenumplanmap dnpm ON dnpm.fkdevice = d.pkid {DEVICE_JOINS} {where})"
+        " ORDER BY 1, 4",
+        page_size,
+    )
+    if rows is None:
+        return None
+    return [_map_row(row, LINE_COLUMNS) for row in rows]
+
+
+def query_users(ucm_source, where, page_size=SQL_PAGE_SIZE):
+    """
+    Fetch the owners of the selected phones with their primary extension and
+    associated devices.
+
+    Returns:
+        list: User dicts shaped like getUser responses, or None on failure.
+    """
+    owners = f"eu.pkid IN (SELECT d.fkenduser FROM device d {DEVICE_JOINS} {where})"
+    extension_columns = [
+        ("pattern", "n.dnorpattern"),
+        ("routePartitionName", "rp.name"),
+    ]
+    user_rows = sql_rows(
+        ucm_source,
+        f"{_select(USER_COLUMNS + extension_columns)} FROM enduser eu"
+        " LEFT OUTER JOIN endusernumplanmap eunpm ON eunpm.fkenduser = eu.pkid AND eunpm.tkdnusage = 1"
+        " LEFT OUTER JOIN numplan n ON n.pkid = eunpm.fknumplan"
+        " LEFT OUTER JOIN routepartition rp ON rp.pkid = n.fkroutepartition"
+        f" WHERE {owners} ORDER BY eu.userid",
+        page_size,
+    )
+    device_columns = [("userid", "eu.userid"), ("device", "dev.name")]
+    device_rows = sql_rows(
+        ucm_source,
+        f"{_select(device_columns)} FROM enduser eu"
+        " INNER JOIN enduserdevicemap eudm ON eudm.fkenduser = eu.pkid AND eudm.tkuserassociation = 1"
+        " INNER JOIN device dev ON dev.pkid = eudm.fkdevice"
+        f" WHERE {owners} ORDER BY eu.userid, dev.name",
+        page_size,
+    )
+    if user_rows is None or device_rows is None:
+        return None
+
+    devices_by_user = {}
+    for row in device_rows:
+        entry = _map_row(row, device_columns)
+        devices_by_user.setdefault(entry["userid"], []).append(entry["device"])
+
+    users = []
+    for row in user_rows:
+        user = _map_row(row, USER_COLUMNS)
+        extension = _map_row(row, USER_COLUMNS + extension_columns)
+        devices = devices_by_user.get(user["userid"])
+        user["associatedDevices"] = {"device": devices} if devices else None
+        user["primaryExtension"] = (
+            {"pattern": extension["pattern"], "routePartitionName": extension["routePartitionName"]}
+            if extension["pattern"] else None
+        )
+        users.append(user)
+    return users
+
+
+def fill_missing_fields(ucm_source, dtype, records, fields, workers=1):
+    """
+    Fetch fields the SQL mapping does not cover with a trimmed getPhone,
+    getLine or getUser per record.
+
+    Args:
+        ucm_source: CUCM source object.
+        dtype (str): "Phone", "Line" or "User".
+        records (list): Records built from SQL, updated in place.
+        fields (list): Fields not covered by SQL_FIELDS[dtype].
+        workers (int): Number of concurrent requests.
+    """
+    returned_tags = {field: "" for field in fields}
+    get_record = GETTERS[dtype]
+    response_key = dtype.lower()
+    outcomes = fan_out(
+        lambda record: get_record(ucm_source.client, record, returned_tags),
+        records,
+        workers=workers,
+        desc=f"Fetching {dtype} fields not covered by SQL",
+    )
+    for record, (_, response, error) in zip(records, outcomes):
+        if error:
+            label = record.get("name") or record.get("pattern") or record.get("userid")
+            print(f"Error fetching {dtype} {label}: {str(error)}")
+        elif response and response["return"]:
+            full_record = response["return"][response_key]
+            for field in fields:
+                record[field] = full_record[field]
+
+
+def pull_sql(ucm_source, configList, fields=None, workers=1, page_size=SQL_PAGE_SIZE):
+    """
+    Pull Phones, Lines and Users with set-based SQL queries.
+
+    Args:
+        ucm_source: CUCM source object.
+        configList (dict): Configuration list for different entities.
+        fields (dict): {"Phone", "Line", "User"} -> fields required downstream.
+            Fields outside SQL_FIELDS are fetched per record with a trimmed
+            getPhone/getLine/getUser. A missing or None entry defaults to
+            TRANSFORM_FIELDS, which SQL covers, so no record is fetched.
+        workers (int): Number of concurrent requests for missing fields.
+        page_size (int): Rows requested per executeSQLQuery call.
+
+    Returns:
+        dict: {"Phone": [...], "Line": [...], "User": [...]}, or None if the
+        getPhone path should be used instead.
+    """
+    where = build_device_filter(configList["Phone"][0])
+    if where is None:
+        print("\nPhone search criteria not supported by SQL mode. Falling back to getPhone.")
+        return None
+
+    phones = query_phones(ucm_source, where, page_size)
+    lines = query_lines(ucm_source, where, page_size) if phones is not None else None
+    users = query_users(ucm_source, where, page_size) if lines is not None else None
+    if users is None:
+        print("\nSQL extraction failed. Falling back to getPhone.")
+        return None
+
+    results = {"Phone": phones, "Line": lines, "User": users}
+    for dtype, records in results.items():
+        wanted = (fields or {}).get(dtype)
+        if wanted is None:
+            wanted = TRANSFORM_FIELDS[dtype]
+        missing = [field for field in wanted if field not in SQL_FIELDS[dtype]]
+        if missing and records:
+            print(f"\n{dtype} fields not covered by SQL, fetching them per record: {', '.join(missing)}")
+            fill_missing_fields(ucm_source, dtype, records, missing, workers=workers)
+
+    print(f"\nFound {len(phones)} Phones, {len(lines)} Lines and {len(users)} Users using SQL.")
+    return results
@@ -0,0 +1,156 @@
+# -*- coding: utf-8 -*-
+"""
+Bounded-concurrency helpers shared by the AXL pull stages.
+
+Every AXL get* call is a blocking SOAP round trip, so the pull loops spend
+most of their time waiting on the publisher. `fan_out` runs those calls on a
+small thread pool while keeping the per-item result/error reporting of the
+original sequential loops.
+"""
+
+import queue
+import threading
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from tqdm import tqdm
+
+Outcome = namedtuple("Outcome", ["item", "result", "error"])
+
+
+def _capture(func, item):
+    """
+    Call func(item) and capture either its result or the raised exception.
+
+    Args:
+        func (callable): Function to apply.
+        item: Input item.
+
+    Returns:
+        Outcome: (item, result, error) with exactly one of result/error set.
+    """
+    try:
+        return Outcome(item, func(item), None)
+    except Exception as e:
+        return Outcome(item, None, e)
+
+
+def iter_fan_out(func, items, workers=1, ordered=True, max_pending=None):
+    """
+    Apply func to every item with at most `workers` calls in flight.
+
+    Items are pulled from the iterable lazily, so a generator (for example a
+    paginated list call) is only advanced as fast as the workers drain it.
+
+    Args:
+        func (callable): Function applied to each item.
+        items (iterable): Input items, consumed lazily.
+        workers (int): Number of worker threads. 1 runs sequentially in the
+            calling thread, exactly like the original loops.
+        ordered (bool): Yield outcomes in input order (True) or as soon as
+            they complete (False).
+        max_pending (int): Upper bound on submitted-but-not-yielded items.
+            Defaults to 4 * workers.
+
+    Yields:
+        Outcome: (item, result, error) for every input item.
+    """
+    if workers <= 1:
+        for item in items:
+            yield _capture(func, item)
+        return
+
+    max_pending = max_pending or workers * 4
+    items = iter(items)
+    pending = {}
+    ready = {}
+    submitted = 0
+    next_index = 0
+    exhausted = False
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        while True:
+            while not exhausted and len(pending) + len(ready) < max_pending:
+                try:
+                    item = next(items)
+                except StopIteration:
+                    exhausted = True
+                    break
+                pending[pool.submit(_capture, func, item)] = submitted
+                submitted += 1
+
+            if not pending:
+                break
+
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                index = pending.pop(future)
+                if ordered:
+                    ready[index] = future.result()
+                else:
+                    yield future.result()
+
+            while next_index in ready:
+                yield ready.pop(next_index)
+                next_index += 1
+
+
+def prefetch(items, depth=1):
+    """
+    Iterate items while a background thread loads up to `depth` items ahead.
+
+    Used to overlap paginated list calls with the work done on the current
+    page: page N+1 is requested while the workers are still busy with page N.
+
+    Args:
+        items (iterable): Source iterable, typically a page generator.
+        depth (int): Number of items buffered ahead of the consumer.
+
+    Yields:
+        Items from the source iterable, in order. Exceptions raised by the
+        source are re-raised in the consumer.
+    """
+    buffer = queue.Queue(maxsize=depth)
+    done = object()
+
+    def producer():
+        try:
+            for item in items:
+                buffer.put((item, None))
+        except Exception as e:
+            buffer.put((done, e))
+            return
+        buffer.put((done, None))
+
+    threading.Thread(target=producer, daemon=True).start()
+    while True:
+        item, error = buffer.get()
+        if item is done:
+            if error:
+                raise error
+            return
+        yield item
+
+
+def fan_out(func, items, workers=1, ordered=True, desc=None):
+    """
+    Apply func to every item on a bounded thread pool with a progress bar.
+
+    Args:
+        func (callable): Function applied to each item.
+        items (iterable): Input items.
+        workers (int): Number of worker threads.
+        ordered (bool): Return outcomes in input order.
+        desc (str): tqdm progress bar description.
+
+    Returns:
+        list: List of Outcome tuples, one per input item.
+    """
+    total = len(items) if hasattr(items, "__len__") else None
+    return [
+        outcome
+        for outcome in tqdm(
+            iter_fan_out(func, items, workers=workers, ordered=ordered),
+            total=total,
+            desc=desc,
+        )
+    ]
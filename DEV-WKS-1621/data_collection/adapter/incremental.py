@@ -0,0 +1,172 @@
+# -*- coding: utf-8 -*-
+"""
+Incremental collection keyed on the phone versionStamp.
+
+CUCM bumps a device's versionStamp whenever its configuration changes. The
+previous export in ConfigExports/<siteCode>/ is used as the local store:
+only phones that are new or whose versionStamp changed are fetched with
+getPhone, and only the users and lines referenced by those phones (or new
+to the export) are fetched with getUser/getLine. Records no longer
+referenced by the current phone list are pruned.
+
+listPhone cannot return versionStamp (it is not part of LPhone), so the
+name/versionStamp list is read from the device table with executeSQLQuery.
+Users and lines carry no versionStamp of their own; edits that do not touch
+a phone are picked up by the next full run.
+"""
+
+import json
+import os
+from adapter.appcore import cleanObject
+from adapter.bulk_sql import SQL_PAGE_SIZE, build_device_filter, query_version_stamps
+from adapter.concurrency import fan_out
+
+
+def normalize_stamp(stamp):
+    """
+    Normalize a versionStamp so AXL ({...}, upper case) and SQL values compare equal.
+
+    Args:
+        stamp (str): versionStamp as returned by AXL or SQL.
+
+    Returns:
+        str: Lower-case stamp without braces.
+    """
+    return (stamp or "").strip("{}").lower()
+
+
+def load_previous(directory, dtype):
+    """
+    Read the previous export of a data type.
+
+    Args:
+        directory (str): Export directory, e.g. ConfigExports/<siteCode>.
+        dtype (str): Data type, e.g. "Phone".
+
+    Returns:
+        list: Previously exported records, empty if there is no export yet.
+    """
+    path = os.path.join(directory, dtype + ".json")
+    if not os.path.exists(path):
+        return []
+    with open(path, "r") as jsonFile:
+        return json.load(jsonFile)
+
+
+def phone_owners(phone):
+    owner = phone.get("ownerUserName")
+    return {owner} if owner else set()
+
+
+def phone_lines(phone):
+    combinations = set()
+    lines = phone["lines"].get("line", []) if phone.get("lines") else []
+    for line in lines:
+        pattern = (line.get("dirn") or {}).get("pattern")
+        partition = (line.get("dirn") or {}).get("routePartitionName")
+        if pattern and partition:
+            combinations.add((pattern, partition))
+    return combinations
+
+
+def fetch(ucm_source, method, keys, build_args, response_key, label, workers):
+    """
+    Fetch records concurrently and clean them.
+
+    Returns:
+        dict: {key: cleaned record} for every key that was fetched successfully.
+    """
+    records = {}
+    outcomes = fan_out(
+        lambda key: getattr(ucm_source.client, method)(**build_args(key)),
+        sorted(keys),
+        workers=workers,
+        desc=f"Fetching changed {label} configurations",
+    )
+    for key, resp, error in outcomes:
+        if error:
+            print(f"Error pulling {label} {key}: {str(error)}")
+        elif resp and resp["return"]:
+            records[key] = cleanObject(resp["return"][response_key])
+    return records
+
+
+def pull_incremental(ucm_source, configList, directory, workers=1, page_size=SQL_PAGE_SIZE):
+    """
+    Re-sync Phones, Users and Lines against the previous export.
+
+    Args:
+        ucm_source: CUCM source object.
+        configList (dict): Configuration list for different entities.
+        directory (str): Export directory holding the previous export.
+        workers (int): Number of concurrent get* requests.
+        page_size (int): Rows requested per executeSQLQuery call.
+
+    Returns:
+        dict: {"Phone": [...], "User": [...], "Line": [...]} ready for
+        write_results, or None if a full collection is needed instead.
+    """
+    where = build_device_filter(configList["Phone"][0])
+    stamps = query_version_stamps(ucm_source, where, page_size) if where else None
+    if stamps is None:
+        print("\nversionStamp listing not available. Falling back to a full collection.")
+        return None
+
+    previousPhones = {phone["name"]: phone for phone in load_previous(directory, "Phone")}
+    changedNames = {
+        name for name, stamp in stamps.items()
+        if name not in previousPhones
+        or normalize_stamp(previousPhones[name].get("versionStamp")) != normalize_stamp(stamp)
+    }
+    deletedNames = set(previousPhones) - set(stamps)
+    print(f"\nPhones: {len(stamps)} listed, {len(changedNames)} new or changed, "
+          f"{len(deletedNames)} deleted.")
+
+    fetchedPhones = fetch(
+        ucm_source, "getPhone", changedNames, lambda name: {"name": name},
+        "phone", "phone", workers,
+    )
+    phones = [
+        fetchedPhones[name] if name in fetchedPhones else previousPhones[name]
+        for name in stamps
+        if name in fetchedPhones or name in previousPhones
+    ]
+    changedPhones = [fetchedPhones[name] for name in fetchedPhones]
+
+    previousUsers = {user["userid"]: user for user in load_previous(directory, "User")}
+    wantedUsers = set().union(*(phone_owners(phone) for phone in phones))
+    staleUsers = set().union(*(phone_owners(phone) for phone in changedPhones))
+    refreshUsers = {userid for userid in wantedUsers if userid not in previousUsers or userid in staleUsers}
+    fetchedUsers = fetch(
+        ucm_source, "getUser", refreshUsers, lambda userid: {"userid": userid},
+        "user", "user", workers,
+    )
+    users = [
+        fetchedUsers.get(userid, previousUsers.get(userid))
+        for userid in sorted(wantedUsers)
+        if userid in fetchedUsers or userid in previousUsers
+    ]
+
+    previousLines = {
+        (line["pattern"], line.get("routePartitionName")): line
+        for line in load_previous(directory, "Line")
+    }
+    wantedLines = set().union(*(phone_lines(phone) for phone in phones))
+    staleLines = set().union(*(phone_lines(phone) for phone in changedPhones))
+    refreshLines = {key for key in wantedLines if key not in previousLines or key in staleLines}
+    fetchedLines = fetch(
+        ucm_source, "getLine", refreshLines,
+        lambda key: {"pattern": key[0], "routePartitionName": key[1]},
+        "line", "line", workers,
+    )
+    lines = [
+        fetchedLines.get(key, previousLines.get(key))
+        for key in sorted(wantedLines)
+        if key in fetchedLines or key in previousLines
+    ]
+
+    print(f"Users: {len(users)} kept, {len(fetchedUsers)} fetched, "
+          f"{len(set(previousUsers) - wantedUsers)} pruned.")
+    print(f"Lines: {len(lines)} kept, {len(fetchedLines)} fetched, "
+          f"{len(set(previousLines) - wantedLines)} pruned.")
+    return {"Phone": phones, "User": users, "Line": lines}
@@ -30,6 +30,9 @@ from zeep.cache import SqliteCache
 from zeep.plugins import HistoryPlugin
 from zeep.exceptions import Fault
 from lxml import etree
+from .throttle import AdaptiveThrottle, ThrottledService
+from .wsdl_cache import load_document
+from .session import PooledAdapter, SessionCookieAuth
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 
 
@@ -40,12 +43,30 @@ class axl(object):
     Python 3.6
     """
 
-    def __init__(self, username, password, cucm, cucm_version):
+    def __init__(
+        self,
+        username,
+        password,
+        cucm,
+        cucm_version,
+        throttle=None,
+        wsdl_cache=True,
+        pool_connections=10,
+        pool_maxsize=10,
+        session_cookies=True,
+    ):
         """
         :param username: axl username
         :param password: axl password
         :param cucm: UCM IP address
         :param cucm_version: UCM version
+        :param throttle: AdaptiveThrottle shared by all requests of this client,
+                         a default one is created if not given
+        :param wsdl_cache: load the parsed schema from the on-disk cache (see wsdl_cache.py)
+        :param pool_connections: number of host pools kept by the HTTP adapter
+        :param pool_maxsize: keep-alive connections per host, size it to the request concurrency
+        :param session_cookies: reuse CUCM JSESSIONIDSSO/JSESSIONID cookies instead of
+                                sending Basic auth on every request
 
         example usage:
         >>> from axl import AXL
@@ -61,15 +82,26 @@ class axl(object):
 
         session = Session()
         session.verify = False
-        session.auth = HTTPBasicAuth(username, password)
+        self.http_adapter = PooledAdapter(
+            pool_connections=pool_connections, pool_maxsize=pool_maxsize
+        )
+        session.mount("https://", self.http_adapter)
+        session.headers["Connection"] = "keep-alive"
+        if session_cookies:
+            session.auth = SessionCookieAuth(username, password, session)
+        else:
+            session.auth = HTTPBasicAuth(username, password)
         settings = Settings(
             strict=False, xml_huge_tree=True, xsd_ignore_sequence_order=True
         )
         self.history = HistoryPlugin()
         transport = Transport(session=session, timeout=20, cache=SqliteCache())
         try:
+            schema_dir = f"{cwd}/schema/{cucm_version}"
             axl_client = Client(
-                wsdl, settings=settings, transport=transport, plugins=[
+                load_document(wsdl, schema_dir, cucm_version, transport, settings)
+                if wsdl_cache else wsdl,
+                settings=settings, transport=transport, plugins=[
                     self.history]
             )
         #For Pyinstaller Exe file
@@ -80,8 +112,11 @@ class axl(object):
             else:
                 wsdl = str(
                     Path(f"./schema/{cucm_version}/AXLAPI.wsdl").absolute())
+            schema_dir = f"./schema/{cucm_version}"
             axl_client = Client(
-                wsdl, settings=settings, transport=transport, plugins=[
+                load_document(wsdl, schema_dir, cucm_version, transport, settings)
+                if wsdl_cache else wsdl,
+                settings=settings, transport=transport, plugins=[
                     self.history]
             )
 
@@ -94,12 +129,34 @@ class axl(object):
         self.UUID_PATTERN = re.compile(
             r"^[\da-f]{8}-([\da-f]{4}-){3}[\da-f]{12}$", re.IGNORECASE
         )
-        self.client = axl_client.create_service(
-            "{http://www.cisco.com/AXLAPIService/}AXLAPIBinding",
-            f"https://{cucm}:8443/axl/",
+        self.throttle = throttle if throttle is not None else AdaptiveThrottle()
+        self.client = ThrottledService(
+            axl_client.create_service(
+                "{http://www.cisco.com/AXLAPIService/}AXLAPIBinding",
+                f"https://{cucm}:8443/axl/",
+            ),
+            self.throttle,
         )
         self.axl_client = axl_client
 
+    def transport_stats(self):
+        """
+        Get HTTP connection reuse and authentication statistics
+        :return: result dictionary
+        """
+        stats = self.http_adapter.stats()
+        auth = self.axl_client.transport.session.auth
+        if isinstance(auth, SessionCookieAuth):
+            stats.update(auth.stats())
+        return stats
+
+    def throttle_stats(self):
+        """
+        Get adaptive throttle state
+        :return: dictionary with current concurrency limit, in-flight requests and reject counts
+        """
+        return self.throttle.stats()
+
     def get_locations(
         self,
         tagfilter={
@@ -0,0 +1,129 @@
+"""
+HTTP session plumbing for the AXL transport.
+
+PooledAdapter sizes the urllib3 connection pool for concurrent requests and
+counts how often each keep-alive connection is reused. SessionCookieAuth
+sends HTTP Basic credentials only until CUCM hands out its JSESSIONIDSSO /
+JSESSIONID session cookies; later requests ride the session and skip the
+authentication cost on the publisher. A 401 on a cookie request drops the
+stale session and replays the request with Basic credentials.
+"""
+
+import threading
+import weakref
+from requests.adapters import HTTPAdapter
+from requests.auth import AuthBase, HTTPBasicAuth
+
+SESSION_COOKIES = ("JSESSIONIDSSO", "JSESSIONID")
+
+
+class PooledAdapter(HTTPAdapter):
+    """
+    HTTPAdapter that records requests per pooled connection.
+    """
+
+    def __init__(self, *args, **kwargs):
+        self._stats_lock = threading.Lock()
+        self._connections = weakref.WeakKeyDictionary()
+        self.requests = 0
+        self.connections_opened = 0
+        super().__init__(*args, **kwargs)
+
+    def build_response(self, req, resp):
+        connection = getattr(resp, "connection", None) or getattr(resp, "_connection", None)
+        with self._stats_lock:
+            self.requests += 1
+            if connection is not None:
+                count = self._connections.get(connection)
+                if count is None:
+                    self.connections_opened += 1
+                    self._connections[connection] = 1
+                else:
+                    self._connections[connection] = count + 1
+        return super().build_response(req, resp)
+
+    def stats(self):
+        """
+        Connection reuse statistics
+        :return: dictionary with request, connection and per-connection counts
+        """
+        with self._stats_lock:
+            per_connection = sorted(self._connections.values(), reverse=True)
+            return {
+                "requests": self.requests,
+                "connections_opened": self.connections_opened,
+                "reused_requests": self.requests - self.connections_opened,
+                "open_connections": len(per_connection),
+                "requests_per_open_connection": per_connection,
+            }
+
+
+class SessionCookieAuth(AuthBase):
+    """
+    HTTP Basic auth that steps aside once CUCM session cookies are present.
+    """
+
+    def __init__(self, username, password, session):
+        """
+        :param username: axl username
+        :param password: axl password
+        :param session: requests Session holding the cookie jar
+        """
+        self.basic = HTTPBasicAuth(username, password)
+        self.session = session
+        self._stats_lock = threading.Lock()
+        self.basic_auth_requests = 0
+        self.cookie_auth_requests = 0
+        self.session_renewals = 0
+
+    def __call__(self, request):
+        cookie_header = request.headers.get("Cookie", "")
+        if any(f"{name}=" in cookie_header for name in SESSION_COOKIES):
+            with self._stats_lock:
+                self.cookie_auth_requests += 1
+            request.register_hook("response", self.handle_401)
+            return request
+        with self._stats_lock:
+            self.basic_auth_requests += 1
+        return self.basic(request)
+
+    def handle_401(self, response, **kwargs):
+        """
+        Replay a request with Basic credentials when the CUCM session expired
+        :param response: response to a cookie-authenticated request
+        :return: original response, or the response of the replayed request
+        """
+        if response.status_code != 401:
+            return response
+        stale = [
+            (cookie.domain, cookie.path, cookie.name)
+            for cookie in self.session.cookies
+            if cookie.name in SESSION_COOKIES
+        ]
+        for domain, path, name in stale:
+            self.session.cookies.clear(domain, path, name)
+
+        with self._stats_lock:
+            self.session_renewals += 1
+            self.basic_auth_requests += 1
+        response.content
+        response.close()
+        request = response.request.copy()
+        request.headers.pop("Cookie", None)
+        request = self.basic(request)
+        replay = response.connection.send(request, **kwargs)
+        replay.history.append(response)
+        replay.request = request
+        return replay
+
+    def stats(self):
+        """
+        Authentication statistics
+        :return: dictionary with basic, cookie and renewal counts
+        """
+        with self._stats_lock:
+            return {
+                "basic_auth_requests": self.basic_auth_requests,
+                "cookie_auth_requests": self.cookie_auth_requests,
+                "session_renewals": self.session_renewals,
+            }
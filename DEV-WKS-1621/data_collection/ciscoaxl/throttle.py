@@ -0,0 +1,188 @@
+"""
+Adaptive concurrency control for AXL requests.
+
+CUCM protects the AXL service by rejecting requests with HTTP 503 or
+"Maximum AXL Memory Allocation Consumed" style faults once the publisher
+is saturated. AdaptiveThrottle keeps an AIMD (additive increase,
+multiplicative decrease) limit on in-flight requests: every healthy response
+nudges the limit up, every throttle reject halves it and pauses new requests
+for a cooldown, so the client settles at the highest rate the publisher
+sustains.
+"""
+
+import re
+import threading
+import time
+from zeep.exceptions import Fault, TransportError
+from requests.exceptions import HTTPError
+
+THROTTLE_STATUS_CODES = (429, 503)
+THROTTLE_FAULT_PATTERN = re.compile(
+    r"memory allocation|throttl|too many requests|service unavailable|request limit",
+    re.IGNORECASE,
+)
+
+
+def is_throttle_error(error):
+    """
+    Check whether an exception is CUCM pushing back rather than a real failure
+    :param error: exception raised by a zeep service call
+    :return: True for HTTP 429/503 and AXL throttle faults
+    """
+    if isinstance(error, TransportError):
+        return error.status_code in THROTTLE_STATUS_CODES
+    if isinstance(error, HTTPError) and error.response is not None:
+        return error.response.status_code in THROTTLE_STATUS_CODES
+    if isinstance(error, Fault):
+        return bool(THROTTLE_FAULT_PATTERN.search(str(error.message)))
+    return False
+
+
+class AdaptiveThrottle(object):
+    """
+    AIMD limiter for concurrent AXL requests, safe to share between threads.
+    """
+
+    def __init__(
+        self,
+        initial_limit=4,
+        min_limit=1,
+        max_limit=32,
+        target_latency=2.0,
+        backoff_factor=0.5,
+        cooldown=1.0,
+        max_cooldown=30.0,
+        max_retries=5,
+    ):
+        """
+        :param initial_limit: concurrent requests allowed at start
+        :param min_limit: floor for the limit
+        :param max_limit: ceiling for the limit
+        :param target_latency: responses slower than this (seconds) do not raise the limit
+        :param backoff_factor: multiplier applied to the limit on a throttle reject
+        :param cooldown: pause (seconds) after a reject, doubled on consecutive rejects
+        :param max_cooldown: upper bound for the pause
+        :param max_retries: retries of a throttled request before the error is raised
+        """
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.target_latency = target_latency
+        self.backoff_factor = backoff_factor
+        self.cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self.max_retries = max_retries
+
+        self.limit = float(initial_limit)
+        self.in_flight = 0
+        self.requests = 0
+        self.rejects = 0
+        self.retries = 0
+        self.throttled_seconds = 0.0
+
+        self._condition = threading.Condition()
+        self._resume_at = 0.0
+        self._last_decrease = 0.0
+        self._consecutive_rejects = 0
+
+    def acquire(self):
+        """
+        Block until a request slot is free and no cooldown is active
+        """
+        with self._condition:
+            while True:
+                wait_for = self._resume_at - time.monotonic()
+                if wait_for <= 0 and self.in_flight < int(self.limit):
+                    break
+                self._condition.wait(timeout=wait_for if wait_for > 0 else None)
+            self.in_flight += 1
+            self.requests += 1
+
+    def release(self, latency=None, throttled=False):
+        """
+        Return a request slot and adjust the limit
+        :param latency: response time in seconds of a completed request
+        :param throttled: True if CUCM rejected the request
+        """
+        with self._condition:
+            self.in_flight -= 1
+            now = time.monotonic()
+            if throttled:
+                self.rejects += 1
+                # One decrease per cooldown window, however many requests
+                # were already in flight when the publisher pushed back.
+                if now >= self._last_decrease + self.cooldown:
+                    self.limit = max(self.min_limit, self.limit * self.backoff_factor)
+                    self._last_decrease = now
+                    self._consecutive_rejects += 1
+                pause = min(
+                    self.max_cooldown,
+                    self.cooldown * 2 ** (self._consecutive_rejects - 1),
+                )
+                self._resume_at = max(self._resume_at, now + pause)
+            elif latency is not None:
+                self._consecutive_rejects = 0
+                if latency <= self.target_latency:
+                    self.limit = min(self.max_limit, self.limit + 1.0 / self.limit)
+            self._condition.notify_all()
+
+    def call(self, func, *args, **kwargs):
+        """
+        Run func under the limiter, retrying throttle rejects
+        :param func: zeep operation to call
+        :return: result of func
+        """
+        for attempt in range(self.max_retries + 1):
+            self.acquire()
+            start = time.monotonic()
+            try:
+                result = func(*args, **kwargs)
+            except Exception as e:
+                throttled = is_throttle_error(e)
+                self.release(throttled=throttled)
+                if not throttled or attempt == self.max_retries:
+                    raise
+                with self._condition:
+                    self.retries += 1
+                    wait_for = max(0.0, self._resume_at - time.monotonic())
+                    self.throttled_seconds += wait_for
+                continue
+            self.release(latency=time.monotonic() - start)
+            return result
+
+    def stats(self):
+        """
+        Current limiter state
+        :return: dictionary with limit, in-flight, request, reject and retry counts
+        """
+        with self._condition:
+            return {
+                "limit": int(self.limit),
+                "in_flight": self.in_flight,
+                "requests": self.requests,
+                "rejects": self.rejects,
+                "retries": self.retries,
+                "throttled_seconds": round(self.throttled_seconds, 2),
+            }
+
+
+class ThrottledService(object):
+    """
+    Proxy for a zeep ServiceProxy that runs every operation through an AdaptiveThrottle.
+    """
+
+    def __init__(self, service, throttle):
+        self._service = service
+        self._throttle = throttle
+
+    def __getattr__(self, name):
+        operation = getattr(self._service, name)
+        if not callable(operation):
+            return operation
+
+        def throttled_operation(*args, **kwargs):
+            return self._throttle.call(operation, *args, **kwargs)
+
+        return throttled_operation
+
+    def __getitem__(self, name):
+        return self.__getattr__(name)
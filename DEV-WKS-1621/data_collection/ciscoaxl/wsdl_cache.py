@@ -0,0 +1,191 @@
+"""
+On-disk cache of parsed AXL service definitions.
+
+Parsing schema/<version>/AXLAPI.wsdl and its ~3.7 MB AXLSoap.xsd takes
+about a second on every process start. The parsed zeep Document is pickled
+once per schema version and reused. The cache file is named after the zeep
+version and a hash of the WSDL and xsd files (which also covers the Python
+version), so editing a schema or upgrading either invalidates the entry.
+
+The cache directory comes from platformdirs (declared in requirements.txt)
+unless AXL_WSDL_CACHE_DIR is set. Unpickling runs arbitrary code, so cache
+files are created readable by their owner only, and a file owned by another
+user is never loaded.
+"""
+
+import gc
+import hashlib
+import io
+import os
+import pickle
+import sys
+import zeep
+from collections import OrderedDict
+from contextlib import contextmanager
+from lxml import etree
+from platformdirs import user_cache_dir
+from zeep.wsdl import Document
+
+CACHE_DIR = os.environ.get("AXL_WSDL_CACHE_DIR", user_cache_dir("ciscoaxl", False))
+
+# Dynamic xsd classes are created by zeep at parse time and cannot be
+# pickled by reference, they are rebuilt from their class attributes.
+DYNAMIC_MODULES = ("zeep.xsd.dynamic_types", "zeep.objects")
+VIEW_TYPES = tuple(
+    type(view)
+    for mapping in ({}, OrderedDict())
+    for view in (mapping.keys(), mapping.values(), mapping.items())
+)
+
+# The xsd type graph is deeply nested, pickle recurses once per level.
+PICKLE_RECURSION_LIMIT = 100000
+
+
+@contextmanager
+def _pickle_recursion_limit():
+    """
+    Raise the recursion limit to PICKLE_RECURSION_LIMIT for one pickle call,
+    restoring the previous limit afterwards
+    """
+    previous = sys.getrecursionlimit()
+    sys.setrecursionlimit(max(previous, PICKLE_RECURSION_LIMIT))
+    try:
+        yield
+    finally:
+        sys.setrecursionlimit(previous)
+
+
+def _make_class(name, bases, attrs):
+    return type(name, bases, attrs)
+
+
+class _DocumentPickler(pickle.Pickler):
+    def __init__(self, file, shared):
+        super().__init__(file, protocol=pickle.HIGHEST_PROTOCOL)
+        self.shared = shared
+
+    def persistent_id(self, obj):
+        for key, value in self.shared.items():
+            if obj is value:
+                return key
+        return None
+
+    def reducer_override(self, obj):
+        if isinstance(obj, type) and obj.__module__ in DYNAMIC_MODULES:
+            attrs = {
+                key: value
+                for key, value in vars(obj).items()
+                if key not in ("__dict__", "__weakref__", "__doc__")
+            }
+            return _make_class, (obj.__name__, obj.__bases__, attrs)
+        if isinstance(obj, etree.QName):
+            return etree.QName, (obj.text,)
+        if isinstance(obj, etree._Element):
+            return etree.fromstring, (etree.tostring(obj),)
+        if isinstance(obj, VIEW_TYPES):
+            return list, (list(obj),)
+        return NotImplemented
+
+
+class _DocumentUnpickler(pickle.Unpickler):
+    def __init__(self, file, shared):
+        super().__init__(file)
+        self.shared = shared
+
+    def persistent_load(self, pid):
+        return self.shared[pid]
+
+
+def schema_fingerprint(schema_dir):
+    """
+    Hash the schema files of one AXL version
+    :param schema_dir: directory holding AXLAPI.wsdl and the xsd files
+    :return: hex digest
+    """
+    digest = hashlib.sha256()
+    digest.update(f"zeep={zeep.__version__};python={sys.version_info[:2]}".encode())
+    for name in sorted(os.listdir(schema_dir)):
+        if name.endswith((".wsdl", ".xsd")):
+            digest.update(name.encode())
+            with open(os.path.join(schema_dir, name), "rb") as schema_file:
+                digest.update(schema_file.read())
+    return digest.hexdigest()
+
+
+def cache_path(schema_dir, cucm_version):
+    """
+    Cache file for a schema directory, keyed on the zeep version and the hash
+    of the schema files
+    :param schema_dir: directory holding AXLAPI.wsdl and the xsd files
+    :param cucm_version: UCM version, used to keep file names readable
+    :return: path of the pickled Document
+    """
+    fingerprint = schema_fingerprint(schema_dir)[:16]
+    return os.path.join(CACHE_DIR, f"axl-{cucm_version}-zeep{zeep.__version__}-{fingerprint}.pickle")
+
+
+def is_trusted(path):
+    """
+    Check that a cache file belongs to the current user, where the platform
+    has user ids
+    :param path: cache file
+    :return: True if the file may be unpickled
+    """
+    if not hasattr(os, "getuid"):
+        return True
+    return os.stat(path).st_uid == os.getuid()
+
+
+def write_private(path, data):
+    """
+    Write a file readable and writable by its owner only (0600), through a
+    temporary file so readers never see a partial cache
+    :param path: destination file
+    :param data: bytes to write
+    """
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    fd = os.open(temp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC | getattr(os, "O_BINARY", 0), 0o600)
+    with os.fdopen(fd, "wb") as cache_file:
+        cache_file.write(data)
+    os.replace(temp_path, path)
+
+
+def load_document(wsdl, schema_dir, cucm_version, transport, settings):
+    """
+    Load a parsed WSDL Document from the cache, parsing and storing it on a miss
+    :param wsdl: WSDL location passed to zeep
+    :param schema_dir: directory holding AXLAPI.wsdl and the xsd files
+    :param cucm_version: UCM version
+    :param transport: zeep Transport the Document should use
+    :param settings: zeep Settings the Document should use
+    :return: zeep Document
+    """
+    shared = {"transport": transport, "settings": settings}
+    path = cache_path(schema_dir, cucm_version)
+
+    if os.path.exists(path) and not is_trusted(path):
+        print("Ignoring cached AXL schema not owned by the current user- ", path)
+    elif os.path.exists(path):
+        # Unpickling creates ~10^6 objects, the cyclic GC would otherwise
+        # rescan them repeatedly and triple the load time.
+        gc_enabled = gc.isenabled()
+        gc.disable()
+        try:
+            with open(path, "rb") as cache_file, _pickle_recursion_limit():
+                return _DocumentUnpickler(cache_file, shared).load()
+        except Exception as e:
+            print("Error in loading cached AXL schema- ", str(e))
+        finally:
+            if gc_enabled:
+                gc.enable()
+
+    document = Document(wsdl, transport, settings=settings)
+    try:
+        os.makedirs(CACHE_DIR, mode=0o700, exist_ok=True)
+        buffer = io.BytesIO()
+        with _pickle_recursion_limit():
+            _DocumentPickler(buffer, shared).dump(document)
+        write_private(path, buffer.getvalue())
+    except Exception as e:
+        print("Error in caching AXL schema- ", str(e))
+    return document
@@ -7,14 +7,30 @@ Created on Tue Nov 25 14:18:34 2021
 
 import sys
 import time
+from sys import exit
 import os
 import json
 import traceback
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
 from tqdm import tqdm
 from adapter.appcore import *
+from adapter.concurrency import fan_out, iter_fan_out, prefetch
+from adapter.bulk_sql import pull_sql
+from adapter.incremental import pull_incremental
 
 sys.path.append("../")
 
+# Directory holding one <siteCode>/ export directory per cluster
+EXPORT_DIR = "ConfigExports"
+
+# Define configuration list for different entities
+CONFIG_LIST = {
+    "Phone": [{"devicePoolName": "Test_DP"}, {"name": ""}, "phone"],
+    "User": [{"userid": "ad"}, {"userid": "", "firstName": "", "lastName": ""}, "user"],
+    "Line": [{"pattern": "1111"}, {"pattern": ""}, "line"],
+}
+
 def create_directory(directory):
     """
     Create directory if it doesn't exist.
@@ -40,72 +56,116 @@ def check_cucm_connectivity(ucm_source):
         return False
     return True
 
-def pull_phones(ucm_source, configList):
+def iter_phone_pages(ucm_source, configList, page_size=1000):
     """
-    Pull phones using listPhone and getPhone methods.
+    Yield listPhone results one page at a time using first/skip.
     
     Args:
         ucm_source: CUCM source object.
         configList (dict): Configuration list for different entities.
+        page_size (int): Number of phones requested per listPhone call.
         
-    Returns:
-        list: List of phone configurations.
-    """
-    start = time.time()
-    listPhones = ucm_source.client.listPhone(configList["Phone"][0], returnedTags=configList["Phone"][1])
-    if listPhones and listPhones["return"]:
-        phones = listPhones["return"]["phone"]
-    else:
-        print("\nNo Phones found.")
-        phones = []
-    phones = [cleanObject(phone) for phone in phones]
-
-    phone_configs = []
-    for phone in tqdm(phones, desc="Fetching full phone configurations"):
-        try:
-            phone_resp = ucm_source.client.getPhone(name=phone["name"])
-            if phone_resp and phone_resp["return"]:
-                phone_configs.append(phone_resp["return"]["phone"])
-        except Exception as e:
-            print(f"Error fetching phone {phone['name']}: {str(e)}")
-
-    end = time.time()
-    print(f"\nFound {len(phone_configs)} Phones in {round(end - start, 2)} seconds. Processing...")
-    return phone_configs
-
-def pull_users(ucm_source, phone_configs, directory):
+    Yields:
+        list: Cleaned phones of one listPhone page.
+    """
+    skip = 0
+    while True:
+        listPhones = ucm_source.client.listPhone(
+            configList["Phone"][0], returnedTags=configList["Phone"][1], first=page_size, skip=skip
+        )
+        if not (listPhones and listPhones["return"] and listPhones["return"]["phone"]):
+            return
+        page = listPhones["return"]["phone"]
+        yield [cleanObject(phone) for phone in page]
+        if len(page) < page_size:
+            return
+        skip += page_size
+
+def iter_phones(ucm_source, configList, workers=1, page_size=1000):
+    """
+    Yield full phone configurations as the getPhone responses arrive.
+    
+    listPhone is paginated and the next page is loaded in the background while
+    getPhone requests for the current page are in flight, so memory held for
+    the phone list is bounded by the page size.
+    
+    Args:
+        ucm_source: CUCM source object.
+        configList (dict): Configuration list for different entities.
+        workers (int): Number of concurrent getPhone requests.
+        page_size (int): Number of phones requested per listPhone call.
+        
+    Yields:
+        Phone configuration returned by getPhone.
+    """
+    pages = prefetch(iter_phone_pages(ucm_source, configList, page_size))
+    names = (phone["name"] for page in pages for phone in page)
+
+    outcomes = iter_fan_out(
+        lambda name: ucm_source.client.getPhone(name=name),
+        names,
+        workers=workers,
+    )
+    for name, phone_resp, error in outcomes:
+        if error:
+            print(f"Error fetching phone {name}: {str(error)}")
+        elif phone_resp and phone_resp["return"]:
+            yield phone_resp["return"]["phone"]
+
+def phone_references(phones, references):
+    """
+    Clean phones as they stream past, keeping the ownerUserName and lines of
+    each in references for pull_users and pull_lines.
+
+    Args:
+        phones (iterable): Phones returned by getPhone.
+        references (list): Receives one {"ownerUserName", "lines"} dict per phone.
+
+    Yields:
+        dict: Cleaned phone.
+    """
+    for phone in phones:
+        phone = cleanObject(phone)
+        references.append({"ownerUserName": phone.get("ownerUserName"), "lines": phone.get("lines")})
+        yield phone
+
+def pull_users(ucm_source, phone_configs, workers=1):
     """
     Extract ownerUserName from phone configurations and pull users using getUser.
     
     Args:
         ucm_source: CUCM source object.
-        phone_configs (list): List of phone configurations.
-        directory (str): Directory to save the results.
+        phone_configs (list): Cleaned phones, or their phone_references.
+        workers (int): Number of concurrent getUser requests.
         
     Returns:
         list: List of user configurations.
     """
-    phone_configs = json.loads(open(f"{directory}/Phone.json").read())
     owner_usernames = set(phone_data.get("ownerUserName") for phone_data in phone_configs if phone_data.get("ownerUserName"))
     print(f"\nFound {len(owner_usernames)} unique ownerUserNames. Pulling Users...")
 
     users = []
-    for username in tqdm(owner_usernames, desc="Fetching user configurations"):
-        try:
-            user_resp = ucm_source.client.getUser(userid=username)
-            if user_resp and user_resp["return"]:
-                users.append(user_resp["return"]["user"])
-        except Exception as e:
-            print(f"Error pulling user {username}: {str(e)}")
+    outcomes = fan_out(
+        lambda username: ucm_source.client.getUser(userid=username),
+        list(owner_usernames),
+        workers=workers,
+        desc="Fetching user configurations",
+    )
+    for username, user_resp, error in outcomes:
+        if error:
+            print(f"Error pulling user {username}: {str(error)}")
+        elif user_resp and user_resp["return"]:
+            users.append(user_resp["return"]["user"])
     return users
 
-def pull_lines(ucm_source, phone_configs):
+def pull_lines(ucm_source, phone_configs, workers=1):
     """
     Extract unique line + partition combinations from phone configurations and pull lines using getLine.
     
     Args:
         ucm_source: CUCM source object.
-        phone_configs (list): List of phone configurations.
+        phone_configs (list): Cleaned phones, or their phone_references.
+        workers (int): Number of concurrent getLine requests.
         
     Returns:
         list: List of line configurations.
@@ -124,54 +184,228 @@ def pull_lines(ucm_source, phone_configs):
     print(f"\nFound {len(line_partition_combinations)} unique line + partition combinations. Pulling Lines...")
 
     lines = []
-    for pattern, partition in tqdm(line_partition_combinations, desc="Fetching line configurations"):
-        try:
-            line_resp = ucm_source.client.getLine(pattern=pattern, routePartitionName=partition)
-            if line_resp and line_resp["return"]:
-                lines.append(line_resp["return"]["line"])
-        except Exception as e:
-            print(f"Error pulling line {pattern} in partition {partition}: {str(e)}")
+    outcomes = fan_out(
+        lambda combination: ucm_source.client.getLine(
+            pattern=combination[0], routePartitionName=combination[1]
+        ),
+        list(line_partition_combinations),
+        workers=workers,
+        desc="Fetching line configurations",
+    )
+    for (pattern, partition), line_resp, error in outcomes:
+        if error:
+            print(f"Error pulling line {pattern} in partition {partition}: {str(error)}")
+        elif line_resp and line_resp["return"]:
+            lines.append(line_resp["return"]["line"])
     return lines
 
-def main():
+def collect_data(ucmSourceContent, export_dir=EXPORT_DIR):
     """
-    Main function to execute the data collection process.
+    Collect Phones, Users and Lines of one CUCM cluster into <export_dir>/<siteCode>.
+
+    Records are cleaned and written as they arrive; only the owner and lines
+    of each phone are kept to pull the users and lines.
+
+    Args:
+        ucmSourceContent (dict): Cluster definition from load_clusters().
+        export_dir (str): Directory the cluster's export directory is created in.
+            Incremental mode always diffs against ConfigExports/<siteCode>.
+
+    Returns:
+        tuple: ({"Phone", "User", "Line"} -> path of the written export,
+        timing report with siteCode, directory, status, total and per-stage
+        seconds and record counts).
     """
+    # Get site code from the source content
+    siteCode = ucmSourceContent["siteCode"]
+    directory = os.path.join(export_dir, siteCode)
+    report = {
+        "siteCode": siteCode,
+        "sourceCUCM": ucmSourceContent["sourceCUCM"],
+        "directory": directory,
+        "status": "failed",
+        "seconds": 0.0,
+        "stages": {},
+        "counts": {},
+    }
+    paths = {}
+    start = time.perf_counter()
+
+    # Write exports without indentation to keep large files small
+    compactJson = ucmSourceContent.get("compactJson", False)
+
+    def save(dtype, data, stageStart, cleaned=False):
+        count = 0
+
+        def counted():
+            nonlocal count
+            for entry in data or []:
+                count += 1
+                yield entry
+
+        write_results(directory, counted(), dtype, compact=compactJson, atomic=True, cleaned=cleaned)
+        paths[dtype] = os.path.join(directory, f"{dtype}.json")
+        report["stages"][dtype] = round(time.perf_counter() - stageStart, 2)
+        report["counts"][dtype] = count
+
     try:
-        # Get site code from the source content
-        siteCode = ucmSourceContent["siteCode"]
+        # Connect to the cluster (clients are created lazily and memoized)
+        ucm_source = get_ucm_source(ucmSourceContent)
 
-        # Define directory for saving configuration exports
-        directory = f"ConfigExports/{siteCode}"
+        # Number of concurrent AXL requests per pull stage (1 = sequential)
+        workers = ucmSourceContent.get("workers", 1)
+
+        # Number of phones requested per listPhone page
+        pageSize = ucmSourceContent.get("pageSize", 1000)
 
         # Create directory if it doesn't exist
         create_directory(directory)
 
         # Check CUCM connectivity
         if not check_cucm_connectivity(ucm_source):
-            exit()
+            report["error"] = "CUCM AXL connectivity check failed"
+            return paths, report
+
+        configList = CONFIG_LIST
+        collectionMode = ucmSourceContent.get("collectionMode", "axl")
+
+        # SQL / incremental modes return all three data types at once
+        bulkResults = None
+        stageStart = time.perf_counter()
+        if collectionMode == "sql":
+            # Pull Phones, Lines and Users with bulk executeSQLQuery calls.
+            # phoneFields/lineFields/userFields list extra fields to fetch per
+            # record; by default only the fields the transformation reads.
+            fields = {
+                "Phone": ucmSourceContent.get("phoneFields"),
+                "Line": ucmSourceContent.get("lineFields"),
+                "User": ucmSourceContent.get("userFields"),
+            }
+            bulkResults = pull_sql(ucm_source, configList, fields=fields, workers=workers)
+        elif collectionMode == "incremental":
+            # Re-sync only records whose phone versionStamp changed
+            bulkResults = pull_incremental(
+                ucm_source, configList, os.path.join(EXPORT_DIR, siteCode), workers=workers
+            )
 
-        # Define configuration list for different entities
-        configList = {
-            "Phone": [{"devicePoolName": "Test_DP"}, {"name": ""}, "phone"],
-            "User": [{"userid": "ad"}, {"userid": "", "firstName": "", "lastName": ""}, "user"],
-            "Line": [{"pattern": "1111"}, {"pattern": ""}, "line"],
-        }
+        if bulkResults is not None:
+            report["stages"]["pull"] = round(time.perf_counter() - stageStart, 2)
+            for dtype in ["Phone", "User", "Line"]:
+                save(dtype, bulkResults.pop(dtype), time.perf_counter())
+        else:
+            # Step 1: Pull Phones using list and get methods, writing each as it arrives
+            stageStart = time.perf_counter()
+            phones = []
+            save("Phone", phone_references(tqdm(
+                iter_phones(ucm_source, configList, workers=workers, page_size=pageSize),
+                desc="Fetching full phone configurations",
+            ), phones), stageStart, cleaned=True)
+            print(f"\nFound {len(phones)} Phones in {report['stages']['Phone']} seconds. Processing...")
 
-        # Step 1: Pull Phones using list and get methods
-        phone_configs = pull_phones(ucm_source, configList)
-        write_results(directory, phone_configs, "Phone")
+            # Step 2: Extract ownerUserName and pull Users
+            stageStart = time.perf_counter()
+            users = pull_users(ucm_source, phones, workers=workers)
+            save("User", users, stageStart)
+            # The users are on disk, drop them before pulling the lines
+            del users
 
-        # Step 2: Extract ownerUserName and pull Users
-        phone_configs_dict = json.loads(open(f"{directory}/Phone.json").read())
-        users = pull_users(ucm_source, phone_configs_dict, directory)
-        write_results(directory, users, "User")
+            # Step 3: Extract unique line + partition combinations and pull Lines
+            stageStart = time.perf_counter()
+            lines = pull_lines(ucm_source, phones, workers=workers)
+            save("Line", lines, stageStart)
+
+        print(f"\n[{siteCode}] AXL throttle: {ucm_source.throttle_stats()}")
+        print(f"[{siteCode}] AXL transport: {ucm_source.transport_stats()}")
+        report["status"] = "ok"
+
+    except Exception as e:
+        print(f"[{siteCode}] Error Occurred:", str(e))
+        traceback.print_exc()
+        report["error"] = str(e)
+
+    report["seconds"] = round(time.perf_counter() - start, 2)
+    return paths, report
+
+
+def collect_cluster(ucmSourceContent, export_dir=EXPORT_DIR):
+    """
+    Collect one CUCM cluster into <export_dir>/<siteCode>.
+
+    Args:
+        ucmSourceContent (dict): Cluster definition from load_clusters().
+        export_dir (str): Directory the cluster's export directory is created in.
+
+    Returns:
+        dict: Timing report of the cluster, see collect_data.
+    """
+    return collect_data(ucmSourceContent, export_dir)[1]
+
+
+def collect_clusters(clusters, export_dir=EXPORT_DIR):
+    """
+    Collect every cluster, each in its own process, at most clusterWorkers at a time.
+
+    Args:
+        clusters (list): Cluster definitions from load_clusters().
+        export_dir (str): Directory the export directories are created in.
+
+    Returns:
+        list: Reports returned by collect_cluster, in cluster order.
+    """
+    if len(clusters) == 1:
+        return [collect_cluster(clusters[0], export_dir)]
+    # Number of clusters collected in parallel
+    clusterWorkers = clusters[0].get("clusterWorkers", len(clusters))
+    with ProcessPoolExecutor(max_workers=min(clusterWorkers, len(clusters))) as pool:
+        return list(pool.map(partial(collect_cluster, export_dir=export_dir), clusters))
+
+
+def print_report(reports, seconds):
+    """
+    Print the consolidated timing report and save it to ConfigExports/collection_report.json.
+
+    Args:
+        reports (list): Reports returned by collect_cluster.
+        seconds (float): Wall time of the whole run.
+    """
+    print("\nCollection report")
+    print(f"{'Site':<16} {'Status':<8} {'Total (s)':>10} {'Phones':>8} {'Users':>8} {'Lines':>8}")
+    for report in reports:
+        counts = report["counts"]
+        print(
+            f"{report['siteCode']:<16} {report['status']:<8} {report['seconds']:>10.2f} "
+            f"{counts.get('Phone', 0):>8} {counts.get('User', 0):>8} {counts.get('Line', 0):>8}"
+        )
+    busy = sum(report["seconds"] for report in reports)
+    print(f"Wall time: {seconds:.2f} s (sum of cluster times: {busy:.2f} s)")
+
+    create_directory(EXPORT_DIR)
+    with open(os.path.join(EXPORT_DIR, "collection_report.json"), "w") as reportFile:
+        json.dump({"seconds": round(seconds, 2), "clusters": reports}, reportFile, indent=4)
+
+
+def main():
+    """
+    Main function to execute the data collection process.
+
+    Every cluster listed in source.json is collected in its own process,
+    at most clusterWorkers at a time.
+    """
+    try:
+        # Load the source definition, one entry per cluster
+        ucmSourceContent = load_source_content()
+        clusters = load_clusters(ucmSourceContent)
+        siteCodes = [cluster["siteCode"] for cluster in clusters]
+        if len(set(siteCodes)) != len(siteCodes):
+            print("Every cluster in source.json needs its own siteCode.")
+            exit()
 
-        # Step 3: Extract unique line + partition combinations and pull Lines
-        lines = pull_lines(ucm_source, phone_configs_dict)
-        write_results(directory, lines, "Line")
+        start = time.perf_counter()
+        reports = collect_clusters(clusters)
 
-        print("\nData extraction completed successfully.")
+        print_report(reports, time.perf_counter() - start)
+        if all(report["status"] == "ok" for report in reports):
+            print("\nData extraction completed successfully.")
 
     except Exception as e:
         print("Error Occurred:", str(e))
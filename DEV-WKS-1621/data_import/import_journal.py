@@ -0,0 +1,142 @@
+# -*- coding: utf-8 -*-
+"""
+@description: Append-only journal of the records a Webex import has completed. Each
+              line is a JSON object {"key": ..., "id": ...} (email for users, MAC
+              for devices, plus the returned Webex id). Lines are flushed as they
+              are written and fsynced every `fsync_every` records, so a crash
+              loses at most one batch of journal entries.
+
+              On restart the journal is read back and journaled records are
+              skipped, so a rerun only pushes the remaining work. The first line
+              holds the org ID; a journal written for another org is discarded.
+
+@usage: Used by webex_user_import.py and webex_device_import.py. Delete the journal
+        file to import everything again.
+"""
+
+import json
+import os
+import threading
+
+DEFAULT_FSYNC_EVERY = 100
+
+
+class ImportJournal(object):
+    """
+    Journal of completed import keys. Safe to share between threads.
+    """
+
+    def __init__(self, path, org_id, fsync_every=DEFAULT_FSYNC_EVERY):
+        """
+        Args:
+            path (str): Journal file.
+            org_id (str): Organization ID the import runs against.
+            fsync_every (int): Records written between two fsyncs.
+        """
+        self.path = path
+        self.org_id = org_id
+        self.fsync_every = max(1, fsync_every)
+        self._lock = threading.Lock()
+        self._entries = self._load()
+        self._unsynced = 0
+        self._file = self._open()
+
+    def _load(self):
+        """
+        Reads the completed keys of a previous run.
+
+        Returns:
+            dict: {key: id}, None if the journal belongs to another org or is unreadable.
+        """
+        entries = {}
+        if not os.path.exists(self.path):
+            return entries
+        try:
+            with open(self.path, "r", encoding="utf-8") as file:
+                header = json.loads(file.readline() or "{}")
+                if header.get("orgId") != self.org_id:
+                    print(f"Ignoring import journal {self.path} written for another org")
+                    return None
+                for line in file:
+                    try:
+                        entry = json.loads(line)
+                        entries[entry["key"]] = entry["id"]
+                    except (ValueError, KeyError, TypeError):
+                        # Partial last line of a run that died mid-write.
+                        continue
+        except Exception as e:
+            print(f"Error reading import journal {self.path}: {e}")
+            return None
+        return entries
+
+    def _open(self):
+        """
+        Opens the journal for appending, starting a new one if the previous
+        journal could not be used.
+        """
+        if self._entries is None:
+            self._entries = {}
+            file = open(self.path, "w", encoding="utf-8")
+        else:
+            ends_with_newline = True
+            if os.path.exists(self.path) and os.path.getsize(self.path):
+                with open(self.path, "rb") as previous:
+                    previous.seek(-1, os.SEEK_END)
+                    ends_with_newline = previous.read(1) == b"\n"
+            file = open(self.path, "a", encoding="utf-8")
+            if not ends_with_newline:
+                file.write("\n")
+        if file.tell() == 0:
+            file.write(json.dumps({"orgId": self.org_id}) + "\n")
+            file.flush()
+            os.fsync(file.fileno())
+        return file
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        """
+        Returns:
+            str: Webex id journaled for key, None if the key is not journaled.
+        """
+        return self._entries.get(key)
+
+    def record(self, key, webex_id):
+        """
+        Appends a completed record. Keys already journaled are not written again.
+
+        Args:
+            key (str): Record key.
+            webex_id (str): Id returned by Webex.
+        """
+        with self._lock:
+            if key in self._entries:
+                return
+            self._entries[key] = webex_id
+            self._file.write(json.dumps({"key": key, "id": webex_id}) + "\n")
+            self._file.flush()
+            self._unsynced += 1
+            if self._unsynced >= self.fsync_every:
+                os.fsync(self._file.fileno())
+                self._unsynced = 0
+
+    def close(self):
+        """
+        Syncs the last batch and closes the journal.
+        """
+        with self._lock:
+            if self._file.closed:
+                return
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,116 @@
+# -*- coding: utf-8 -*-
+"""
+@description: Per-record results of a Webex import, streamed to a JSON-lines file as
+              each push completes instead of being collected in the summary. Only
+              the aggregate counts are kept in memory, so memory stays flat however
+              many records are imported, and the results of a run that crashes are
+              on disk up to its last completed record.
+
+              Each line is {<key>: ..., "status": "success"|"failed"|"skipped",
+              "id": ..., "error": ..., "response": ...}. In compact mode the full
+              Webex response is left out and only the id, status and error are kept.
+
+@usage: Used by webex_user_import.py and webex_device_import.py.
+"""
+
+import json
+
+SUCCESS = "success"
+FAILED = "failed"
+SKIPPED = "skipped"
+
+
+def error_message(response):
+    """
+    Extracts a short error message from a failed Webex or SCIM response.
+
+    Args:
+        response (dict): Response of the failed push.
+
+    Returns:
+        str: Error message, the whole response as JSON if none is found.
+    """
+    if response.get("error"):
+        return str(response["error"])
+    errors = response.get("errors") or []
+    if errors and isinstance(errors[0], dict) and errors[0].get("description"):
+        return errors[0]["description"]
+    return response.get("message") or response.get("detail") or json.dumps(response)
+
+
+class ImportResults(object):
+    """
+    Streams import results to a JSON-lines file and counts them by status.
+    """
+
+    def __init__(self, path, key_name, compact=False):
+        """
+        Args:
+            path (str): Results file, overwritten by each run.
+            key_name (str): Name of the record key in each line, e.g. "email" or "mac".
+            compact (bool): Keep only id, status and error for each record.
+        """
+        self.path = path
+        self.key_name = key_name
+        self.compact = compact
+        self.counts = {SUCCESS: 0, FAILED: 0, SKIPPED: 0}
+        self._file = open(path, "w", encoding="utf-8")
+
+    def add(self, key, response):
+        """
+        Writes the result of one record and updates the counts.
+
+        Args:
+            key (str): Record key (email or MAC address).
+            response (dict): Response of the push. A response with "skipped" is a
+                skipped record, one with "id" a success, anything else a failure.
+
+        Returns:
+            str: Status of the record.
+        """
+        if "skipped" in response:
+            status = SKIPPED
+        elif "id" in response:  # Successful response contains an 'id'
+            status = SUCCESS
+        else:
+            status = FAILED
+        self.counts[status] += 1
+
+        line = {self.key_name: key, "status": status}
+        if "id" in response:
+            line["id"] = response["id"]
+        if status == SKIPPED:
+            line["reason"] = response["skipped"]
+        elif status == FAILED:
+            line["error"] = error_message(response)
+        if not self.compact and status != SKIPPED:
+            line["response"] = response
+        # One line per record, flushed so a crash keeps everything before it.
+        self._file.write(json.dumps(line) + "\n")
+        self._file.flush()
+        return status
+
+    def summary(self, total_name):
+        """
+        Args:
+            total_name (str): Name of the total count, e.g. "total_users".
+
+        Returns:
+            dict: Aggregate counts and the path of the results file.
+        """
+        return {
+            total_name: sum(self.counts.values()),
+            "success_count": self.counts[SUCCESS],
+            "failure_count": self.counts[FAILED],
+            "skipped_count": self.counts[SKIPPED],
+            "results_file": self.path,
+        }
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
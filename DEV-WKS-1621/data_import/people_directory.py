@@ -0,0 +1,230 @@
+# -*- coding: utf-8 -*-
+"""
+@description: Snapshot of the Webex org's people, indexed by email. The snapshot is
+              taken once per run with the paginated People API (1000 people per
+              request) instead of one GET /v1/people?email= per record, and can be
+              persisted to a JSON file that is reused until its TTL expires.
+
+              The device import resolves personId from the index, the user import
+              skips people that already exist, and people created during the run
+              are added to the index so later lookups see them. People created
+              with SCIM Bulk have no People API id in the Bulk response, so the
+              index is refreshed with one more listing after a Bulk import.
+
+@usage: Used by webex_user_import.py and webex_device_import.py through shared_directory().
+"""
+
+import asyncio
+import json
+import os
+import threading
+import time
+
+from webex_client import WebexClient
+
+WEBEX_API_URL_PEOPLE = "https://webexapis.com/v1/people"
+PAGE_SIZE = 1000
+
+_directories = {}
+_directories_lock = threading.Lock()
+
+
+class PeopleDirectory(object):
+    """
+    In-memory index of people by lower-cased email. Safe to share between threads.
+    """
+
+    def __init__(self, people, taken_at=None, complete=True):
+        """
+        Args:
+            people (list): People as returned by the People API (id, emails, ...).
+            taken_at (float): Epoch time the snapshot was taken.
+            complete (bool): False if the listing failed and the index only
+                holds people seen during the run; such a directory is not persisted.
+        """
+        self.taken_at = taken_at or time.time()
+        self.complete = complete
+        self._lock = threading.Lock()
+        self._by_email = {}
+        # Emails looked up during the run without a match; never persisted
+        self._missing = set()
+        for person in people:
+            self.add(person)
+
+    def add(self, person):
+        """
+        Indexes a person under each of their emails.
+
+        Args:
+            person (dict): Person with at least "id" and "emails".
+        """
+        entry = {"id": person["id"], "emails": person.get("emails", [])}
+        with self._lock:
+            for email in entry["emails"]:
+                self._by_email[email.lower()] = entry
+                self._missing.discard(email.lower())
+
+    def add_missing(self, email):
+        """
+        Records that a lookup found nobody with this email.
+
+        Args:
+            email (str): Email address.
+        """
+        with self._lock:
+            if (email or "").lower() not in self._by_email:
+                self._missing.add((email or "").lower())
+
+    def is_missing(self, email):
+        """
+        Returns:
+            bool: True if a lookup during the run found nobody with this email.
+        """
+        return (email or "").lower() in self._missing
+
+    def person_id(self, email):
+        """
+        Args:
+            email (str): Email address.
+
+        Returns:
+            str: Person ID, empty string if nobody in the snapshot has this email.
+        """
+        entry = self._by_email.get((email or "").lower())
+        return entry["id"] if entry else ""
+
+    def __contains__(self, email):
+        return (email or "").lower() in self._by_email
+
+    def __len__(self):
+        with self._lock:
+            return len({entry["id"] for entry in self._by_email.values()})
+
+    def people(self):
+        """
+        Returns:
+            list: Distinct indexed people.
+        """
+        with self._lock:
+            return list({entry["id"]: entry for entry in self._by_email.values()}.values())
+
+
+def fetch_people(headers, org_id, scheduler=None):
+    """
+    Takes a snapshot of all people in the org with the paginated People API.
+
+    Args:
+        headers (dict): Webex request headers.
+        org_id (str): Organization ID, omitted from the query if empty.
+        scheduler (RateScheduler): Token bucket shared with the imports.
+
+    Returns:
+        list: People of the org.
+    """
+    params = {"max": PAGE_SIZE}
+    if org_id:
+        params["orgId"] = org_id
+
+    async def main():
+        async with WebexClient(headers, max_in_flight=1, scheduler=scheduler) as client:
+            return await client.get_all("list people", WEBEX_API_URL_PEOPLE, params)
+
+    return asyncio.run(main())
+
+
+def refresh_directory(directory, headers, org_id, scheduler=None):
+    """
+    Lists the org's people again and adds them to a directory, so people
+    created outside the People API (SCIM Bulk) can be resolved by email.
+
+    Args:
+        directory (PeopleDirectory): Directory to update.
+        headers (dict): Webex request headers.
+        org_id (str): Organization ID.
+        scheduler (RateScheduler): Token bucket shared with the imports.
+
+    Returns:
+        bool: True if the listing succeeded.
+    """
+    start = time.perf_counter()
+    try:
+        people = fetch_people(headers, org_id, scheduler)
+    except Exception as e:
+        print(f"Error refreshing people snapshot: {e}")
+        return False
+    for person in people:
+        directory.add(person)
+    directory.taken_at = time.time()
+    directory.complete = True
+    print(f"People snapshot refreshed: {len(directory)} people in {time.perf_counter() - start:.2f} s")
+    return True
+
+
+def load_snapshot(snapshot_file, org_id, ttl):
+    """
+    Reads a persisted snapshot if it belongs to the org and is younger than ttl.
+
+    Returns:
+        PeopleDirectory: Directory from the file, None if missing, stale or unreadable.
+    """
+    if not ttl or not snapshot_file or not os.path.exists(snapshot_file):
+        return None
+    try:
+        with open(snapshot_file, "r", encoding="utf-8") as file:
+            snapshot = json.load(file)
+    except Exception as e:
+        print(f"Error reading people snapshot {snapshot_file}: {e}")
+        return None
+    if snapshot.get("orgId") != org_id or time.time() - snapshot.get("taken_at", 0) > ttl:
+        return None
+    return PeopleDirectory(snapshot["people"], snapshot["taken_at"])
+
+
+def save_snapshot(directory, snapshot_file, org_id):
+    """
+    Persists a directory so later runs within the TTL can skip the listing.
+    """
+    if not directory.complete:
+        return
+    try:
+        temp_file = f"{snapshot_file}.tmp"
+        with open(temp_file, "w", encoding="utf-8") as file:
+            json.dump({"orgId": org_id, "taken_at": directory.taken_at, "people": directory.people()}, file)
+        os.replace(temp_file, snapshot_file)
+    except Exception as e:
+        print(f"Error writing people snapshot {snapshot_file}: {e}")
+
+
+def shared_directory(headers, org_id, snapshot_file=None, ttl=0, scheduler=None):
+    """
+    Returns the process-wide people directory of an org, taking the snapshot on first use.
+
+    Args:
+        headers (dict): Webex request headers.
+        org_id (str): Organization ID.
+        snapshot_file (str): JSON file the snapshot is persisted to.
+        ttl (int): Seconds a persisted snapshot stays valid, 0 disables persistence.
+        scheduler (RateScheduler): Token bucket shared with the imports.
+
+    Returns:
+        PeopleDirectory: Directory shared by every import of the process.
+    """
+    with _directories_lock:
+        directory = _directories.get(org_id)
+        if directory is None:
+            directory = load_snapshot(snapshot_file, org_id, ttl)
+            if directory is not None:
+                print(f"Loaded {len(directory)} people from {snapshot_file}")
+            else:
+                start = time.perf_counter()
+                try:
+                    directory = PeopleDirectory(fetch_people(headers, org_id, scheduler))
+                    print(f"People snapshot: {len(directory)} people in {time.perf_counter() - start:.2f} s")
+                    if ttl and snapshot_file:
+                        save_snapshot(directory, snapshot_file, org_id)
+                except Exception as e:
+                    # Imports fall back to per-record lookups with an empty index.
+                    print(f"Error taking people snapshot: {e}")
+                    directory = PeopleDirectory([], complete=False)
+            _directories[org_id] = directory
+        return directory
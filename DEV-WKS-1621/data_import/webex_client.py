@@ -0,0 +1,418 @@
+# -*- coding: utf-8 -*-
+"""
+@description: Asyncio client for the Webex people and devices APIs. All requests of
+              an import share one aiohttp session, so connections are pooled and
+              kept alive, and at most `max_in_flight` requests are outstanding at a
+              time. Request latencies are summarized per operation for the import
+              summary, from a bounded sample so long imports use constant memory.
+
+              Requests are paced by a token bucket shared by every import in the
+              process. A 429 (or 503) response pauses the bucket for the
+              Retry-After period and the request is queued again, so throttled
+              records are retried instead of being reported as failed. A throttled
+              request gives up its in-flight slot while it waits out the pause.
+
+@usage: Used by webex_user_import.py and webex_device_import.py through run_import().
+"""
+
+import asyncio
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from functools import lru_cache
+
+import aiohttp
+
+DEFAULT_MAX_IN_FLIGHT = 10
+DEFAULT_TIMEOUT = 30
+DEFAULT_MAX_RETRIES = 5
+THROTTLE_STATUS_CODES = (429, 503)
+MAX_RETRY_AFTER = 300
+LATENCY_SAMPLES = 1024
+
+
+def parse_retry_after(value, attempt):
+    """
+    Reads a Retry-After header.
+
+    Args:
+        value (str): Header value, either seconds or an HTTP date. None if absent.
+        attempt (int): Retry attempt, used for exponential backoff without a header.
+
+    Returns:
+        float: Seconds to wait before the next request.
+    """
+    if value:
+        try:
+            return min(MAX_RETRY_AFTER, max(0.0, float(value)))
+        except ValueError:
+            pass
+        try:
+            return min(MAX_RETRY_AFTER, max(0.0, parsedate_to_datetime(value).timestamp() - time.time()))
+        except (TypeError, ValueError):
+            pass
+    return min(MAX_RETRY_AFTER, 2.0 ** attempt)
+
+
+class RateScheduler(object):
+    """
+    Token bucket (GCRA) spacing requests at `rate` per second with bursts of
+    up to `burst` requests. Thread-safe, so imports running in different
+    threads and event loops can share one bucket.
+    """
+
+    def __init__(self, rate=None, burst=1):
+        """
+        Args:
+            rate (float): Allowed requests per second, None for no pacing.
+            burst (int): Requests allowed back to back after an idle period.
+        """
+        self.interval = 1.0 / rate if rate else 0.0
+        self.allowance = (max(1, burst) - 1) * self.interval
+        self._lock = threading.Lock()
+        self._tat = 0.0
+        self._paused_until = 0.0
+        self.throttled = 0
+        self.throttle_seconds = 0.0
+
+    def reserve(self):
+        """
+        Reserves the next send slot.
+
+        Returns:
+            float: time.monotonic() value at which the request may be sent.
+        """
+        with self._lock:
+            earliest = max(time.monotonic(), self._paused_until)
+            at = max(earliest, self._tat - self.allowance)
+            self._tat = max(self._tat, at) + self.interval
+            return at
+
+    async def wait(self):
+        """
+        Waits for a send slot, including any Retry-After pause that starts while waiting.
+        """
+        at = self.reserve()
+        while True:
+            delay = max(at, self._paused_until) - time.monotonic()
+            if delay <= 0:
+                return
+            await asyncio.sleep(delay)
+
+    async def wait_pause(self):
+        """
+        Waits until a running Retry-After pause is over, without reserving a slot.
+        """
+        while True:
+            delay = self._paused_until - time.monotonic()
+            if delay <= 0:
+                return
+            await asyncio.sleep(delay)
+
+    def pause(self, seconds):
+        """
+        Holds back every request for `seconds`, as asked by a Retry-After header.
+
+        Args:
+            seconds (float): Pause length.
+        """
+        with self._lock:
+            now = time.monotonic()
+            until = now + seconds
+            self.throttled += 1
+            if until > self._paused_until:
+                # Only the part not already covered by a running pause is throttle time.
+                self.throttle_seconds += until - max(now, self._paused_until)
+                self._paused_until = until
+                self._tat = max(self._tat, until)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "throttled_responses": self.throttled,
+                "throttle_seconds": round(self.throttle_seconds, 2),
+            }
+
+
+class LatencyStats(object):
+    """
+    Count, total and maximum of the latencies of one operation, with a
+    reservoir of at most `size` samples for the percentiles.
+    """
+
+    def __init__(self, size=LATENCY_SAMPLES, seed=None):
+        self.size = size
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.samples = []
+        self._random = random.Random(seed)
+
+    def add(self, seconds):
+        """
+        Records one latency. Once the reservoir is full, the n-th sample
+        replaces a random one with probability size/n, so the reservoir stays a
+        uniform sample of every latency recorded.
+        """
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+        if len(self.samples) < self.size:
+            self.samples.append(seconds)
+        else:
+            index = self._random.randrange(self.count)
+            if index < self.size:
+                self.samples[index] = seconds
+
+    def summary(self):
+        """
+        Returns:
+            dict: {"requests", "mean_ms", "p50_ms", "p95_ms", "max_ms"}
+        """
+        samples = sorted(self.samples)
+        return {
+            "requests": self.count,
+            "mean_ms": round(self.total / self.count * 1000, 1),
+            "p50_ms": round(samples[len(samples) // 2] * 1000, 1),
+            "p95_ms": round(samples[min(len(samples) - 1, int(len(samples) * 0.95))] * 1000, 1),
+            "max_ms": round(self.max * 1000, 1),
+        }
+
+
+@lru_cache(maxsize=None)
+def shared_scheduler(rate=None, burst=1):
+    """
+    Returns the process-wide RateScheduler for a rate, so the user and device
+    imports draw from the same bucket.
+    """
+    return RateScheduler(rate, burst)
+
+
+class WebexClient(object):
+    """
+    Async context manager wrapping a pooled aiohttp session.
+    """
+
+    def __init__(
+        self,
+        headers,
+        max_in_flight=DEFAULT_MAX_IN_FLIGHT,
+        timeout=DEFAULT_TIMEOUT,
+        scheduler=None,
+        max_retries=DEFAULT_MAX_RETRIES,
+    ):
+        """
+        Args:
+            headers (dict): Headers sent with every request (Authorization, Content-Type).
+            max_in_flight (int): Maximum number of concurrent requests.
+            timeout (int): Total timeout of a single request in seconds.
+            scheduler (RateScheduler): Token bucket pacing the requests, unpaced if None.
+            max_retries (int): Retries of a throttled request before its response is returned.
+        """
+        self.headers = headers
+        self.max_in_flight = max(1, max_in_flight)
+        self.timeout = timeout
+        self.scheduler = scheduler or RateScheduler()
+        self.max_retries = max_retries
+        self.retries = 0
+        self.latencies = {}
+        self.session = None
+        self.semaphore = None
+
+    async def __aenter__(self):
+        self.semaphore = asyncio.Semaphore(self.max_in_flight)
+        self.session = aiohttp.ClientSession(
+            headers=self.headers,
+            connector=aiohttp.TCPConnector(limit=self.max_in_flight),
+            timeout=aiohttp.ClientTimeout(total=self.timeout),
+        )
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.session.close()
+
+    async def request(self, operation, method, url, payload=None, params=None):
+        """
+        Sends one request and records its latency.
+
+        Throttled responses pause the scheduler for the Retry-After period and
+        the request is sent again, up to max_retries times.
+
+        Args:
+            operation (str): Name the latency is recorded under, e.g. "create person".
+            method (str): HTTP method.
+            url (str): Request URL.
+            payload (dict): JSON body.
+            params (dict): Query parameters.
+
+        Returns:
+            dict: Decoded JSON response.
+        """
+        _, data, _ = await self._send(operation, method, url, payload, params)
+        return data
+
+    async def _send(self, operation, method, url, payload=None, params=None):
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                # Wait out the pause without an in-flight slot, so requests of
+                # other callers can be queued behind it.
+                await self.scheduler.wait_pause()
+            result = await self._attempt(operation, method, url, payload, params, attempt)
+            if result is not None:
+                return result
+
+    async def _attempt(self, operation, method, url, payload, params, attempt):
+        """
+        Sends a request once, holding an in-flight slot.
+
+        Returns:
+            tuple: (status, decoded JSON, links), None if the response was
+            throttled and the request is to be retried.
+        """
+        async with self.semaphore:
+            await self.scheduler.wait()
+            start = time.perf_counter()
+            try:
+                async with self.session.request(method, url, json=payload, params=params) as response:
+                    status = response.status
+                    if status in THROTTLE_STATUS_CODES and attempt < self.max_retries:
+                        retry_after = response.headers.get("Retry-After")
+                        if status == 429 or retry_after:
+                            self.scheduler.pause(parse_retry_after(retry_after, attempt))
+                            self.retries += 1
+                            return None
+                    return status, await response.json(content_type=None), response.links
+            finally:
+                self.record_latency(operation, time.perf_counter() - start)
+
+    def record_latency(self, operation, seconds):
+        if operation not in self.latencies:
+            self.latencies[operation] = LatencyStats()
+        self.latencies[operation].add(seconds)
+
+    async def get_all(self, operation, url, params=None):
+        """
+        Reads every page of a Webex list call by following its Link rel="next" headers.
+
+        Args:
+            operation (str): Name the latency is recorded under.
+            url (str): URL of the first page.
+            params (dict): Query parameters of the first page.
+
+        Returns:
+            list: Items of all pages.
+        """
+        items = []
+        while url:
+            status, data, links = await self._send(operation, "GET", url, params=params)
+            if status >= 400:
+                raise RuntimeError(f"{operation} failed with HTTP {status}: {data}")
+            items.extend(data.get("items", []))
+            # The next link already carries the query string.
+            url = str(links["next"]["url"]) if "next" in links else None
+            params = None
+        return items
+
+    async def post(self, operation, url, payload):
+        return await self.request(operation, "POST", url, payload=payload)
+
+    async def get(self, operation, url, params=None):
+        return await self.request(operation, "GET", url, params=params)
+
+    def stats(self):
+        """
+        Summarizes the recorded latencies per operation, and the time spent
+        working (sum of request latencies) apart from the time spent throttled.
+
+        Returns:
+            dict: {"latency": {operation: {"requests", "mean_ms", "p50_ms", "p95_ms", "max_ms"}},
+            "throttle": {"retries", "work_seconds", "throttled_responses", "throttle_seconds"}}
+        """
+        latency = {operation: stats.summary() for operation, stats in self.latencies.items()}
+        throttle = {
+            "retries": self.retries,
+            "work_seconds": round(sum(stats.total for stats in self.latencies.values()), 2),
+        }
+        throttle.update(self.scheduler.stats())
+        return {"latency": latency, "throttle": throttle}
+
+
+def batched(rows, size):
+    """
+    Groups rows into lists of up to `size` rows.
+
+    Args:
+        rows (iterable): Rows to group.
+        size (int): Rows per batch.
+
+    Returns:
+        list/iterator: A list of batches for list input, otherwise a lazy iterator.
+    """
+    size = max(1, size)
+    if isinstance(rows, (list, tuple)):
+        return [list(rows[start:start + size]) for start in range(0, len(rows), size)]
+
+    def batches():
+        batch = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) == size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    return batches()
+
+
+def run_import(headers, rows, push, on_result, max_in_flight=DEFAULT_MAX_IN_FLIGHT, scheduler=None):
+    """
+    Pushes every row with a shared WebexClient and reports each response.
+
+    Rows are consumed lazily. A list is read directly; any other iterable (for
+    example a stream fed by another thread) is read from a worker thread, so a
+    blocking source does not stall requests that are already in flight.
+
+    Args:
+        headers (dict): Headers sent with every request.
+        rows (iterable): Rows to import.
+        push (coroutine function): push(client, row) returning the response dict.
+        on_result (callable): on_result(row, response), called as each push completes.
+        max_in_flight (int): Maximum number of concurrent requests.
+        scheduler (RateScheduler): Token bucket shared with other imports.
+
+    Returns:
+        dict: Latency and throttle statistics, see WebexClient.stats.
+    """
+    done = object()
+
+    async def push_one(client, row):
+        on_result(row, await push(client, row))
+
+    async def main():
+        loop = asyncio.get_running_loop()
+        iterator = iter(rows)
+        if isinstance(rows, (list, tuple)):
+            async def next_row():
+                return next(iterator, done)
+        else:
+            async def next_row():
+                return await loop.run_in_executor(None, next, iterator, done)
+
+        async with WebexClient(headers, max_in_flight, scheduler=scheduler) as client:
+            pending = set()
+            while True:
+                row = await next_row()
+                if row is done:
+                    break
+                pending.add(asyncio.ensure_future(push_one(client, row)))
+                if len(pending) >= 2 * client.max_in_flight:
+                    finished, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                    for task in finished:
+                        task.result()
+            for task in pending:
+                await task
+            return client.stats()
+
+    return asyncio.run(main())
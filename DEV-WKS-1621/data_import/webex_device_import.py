@@ -10,13 +10,26 @@ Created on Tue Jan 28, 2025
 
 import csv
 import json
+import os
 import requests
+import sys
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "data_transformation"))
+from webex_client import DEFAULT_MAX_IN_FLIGHT, run_import, shared_scheduler
+from people_directory import shared_directory
+from import_journal import DEFAULT_FSYNC_EVERY, ImportJournal
+from import_results import ImportResults
+from transform_state import mark_imported, row_fingerprint
 
 # Define constants
 DEVICE_CSV_FILE = "./OutputCSV/Phone.csv"  # Path to the Device.csv file
+DEVICE_DELTA_CSV_FILE = "./OutputCSV/Phone.changed.csv"  # Rows not imported in their current form by the last import
 WEBEX_API_URL = "https://webexapis.com/v1/devices"  # Webex API endpoint for adding devices
 WEBEX_API_URL_PEOPLE = "https://webexapis.com/v1/people"  # Webex API endpoint for people
 OUTPUT_SUMMARY_FILE = "./device_import_summary.json"  # Path to save the summary
+PEOPLE_SNAPSHOT_FILE = "./people_snapshot.json"  # Path of the persisted people snapshot
+JOURNAL_FILE = "./device_import_journal.jsonl"  # Journal of imported devices, read back on restart
+RESULTS_FILE = "./device_import_results.jsonl"  # Per-device results, one JSON line per device
 
 with open("./data_import/config.json", "r") as file:
     config = json.load(file)
@@ -24,6 +37,13 @@ with open("./data_import/config.json", "r") as file:
     ORGANIZATION_ID = config["ORGANIZATION_ID"]
     DOMAIN = config["DOMAIN"]
     WORKSPACE_ID = config["WORKSPACE_ID"]
+    MAX_IN_FLIGHT = config.get("MAX_IN_FLIGHT", DEFAULT_MAX_IN_FLIGHT)
+    REQUESTS_PER_SECOND = config.get("REQUESTS_PER_SECOND")
+    BURST = config.get("BURST", 1)
+    PEOPLE_SNAPSHOT_TTL = config.get("PEOPLE_SNAPSHOT_TTL", 0)
+    DELTA_IMPORT = config.get("DELTA_IMPORT", False)
+    JOURNAL_FSYNC_EVERY = config.get("JOURNAL_FSYNC_EVERY", DEFAULT_FSYNC_EVERY)
+    COMPACT_RESULTS = config.get("COMPACT_RESULTS", False)
 
 WEBEX_API_URL = f"{WEBEX_API_URL}?orgId={ORGANIZATION_ID}"
 
@@ -51,6 +71,14 @@ def read_csv(file_path):
         print(f"Error reading CSV file {file_path}: {e}")
         return []
 
+def device_key(device):
+    """
+    Returns the journal key of a device row: its MAC address, upper-cased
+    and without separators.
+    """
+    mac = device.get("MAC Address", "") or ""
+    return "".join(char for char in mac.upper() if char.isalnum())
+
 def get_person_id(email):
     """
     Retrieves the person ID for a given email address.
@@ -72,27 +100,33 @@ def get_person_id(email):
     except Exception as e:
         print(f"Error retrieving person ID for {email}: {e}")
 
-def push_device_to_webex(device):
+def owner_email(device):
     """
-    Pushes a single device to Webex using the Webex API.
+    Returns the email address of the device owner.
 
     Args:
-        device (dict): Device data to push.
+        device (dict): Device data.
 
     Returns:
-        dict: Response from the Webex API.
+        str: Owner email, None if the device has no owner.
     """
     email = device.get("Username", None)
-    if email:
-        if "@" not in email:
-            email = f"{email}@{DOMAIN}"
-            person_id = get_person_id(email)
-            # print(person_id)
-        else:
-            person_id = get_person_id(email)
-    else:
-        person_id = None
-    print(person_id)
+    if email and "@" not in email:
+        email = f"{email}@{DOMAIN}"
+    return email or None
+
+def build_device_payload(device, person_id):
+    """
+    Builds the Webex devices payload for a device row.
+
+    Args:
+        device (dict): Device data to push.
+        person_id (str): Webex person ID of the owner, the device goes to
+            WORKSPACE_ID when empty.
+
+    Returns:
+        dict: Request body for the devices API.
+    """
     if person_id:
         payload = {
             "mac": device.get("MAC Address", ""),
@@ -108,7 +142,22 @@ def push_device_to_webex(device):
         }
 
     # Remove empty fields from the payload
-    payload = {key: value for key, value in payload.items() if value}
+    return {key: value for key, value in payload.items() if value}
+
+def push_device_to_webex(device):
+    """
+    Pushes a single device to Webex using the Webex API.
+
+    Args:
+        device (dict): Device data to push.
+
+    Returns:
+        dict: Response from the Webex API.
+    """
+    email = owner_email(device)
+    person_id = get_person_id(email) if email else None
+    print(person_id)
+    payload = build_device_payload(device, person_id)
 
     try:
         response = requests.post(WEBEX_API_URL, headers=HEADERS, data=json.dumps(payload))
@@ -117,39 +166,136 @@ def push_device_to_webex(device):
         print(f"Error pushing device {device.get('MAC Address', '')} to Webex: {e}")
         return {"error": str(e)}
 
-def import_devices_to_webex(device_data):
+async def get_person_id_async(client, email):
+    """
+    Retrieves the person ID for a given email address through the shared async client.
+
+    Args:
+        client (WebexClient): Client of the running import.
+        email (str): Email address of the user.
+
+    Returns:
+        str: Person ID if found, an empty string if the lookup succeeded and
+        nobody has this email, None if the lookup failed (including an error
+        status or a request still throttled after its retries).
+    """
+    try:
+        status, data, _ = await client._send("find person", "GET", WEBEX_API_URL_PEOPLE, params={"email": email})
+        if status >= 400:
+            print(f"Error retrieving person ID for {email}: HTTP {status}: {data}")
+            return None
+        if data.get("items"):
+            return data["items"][0]["id"]
+        return ""
+    except Exception as e:
+        print(f"Error retrieving person ID for {email}: {e}")
+        return None
+
+async def resolve_person_id(client, email, directory=None):
+    """
+    Resolves the owner's personId from the people snapshot, looking it up only
+    for people that are not in the snapshot. Lookups that find nobody are
+    remembered for the rest of the run, so devices of the same unknown owner
+    do not repeat them. Failed lookups are not remembered and are tried again
+    for the owner's next device.
+
+    Args:
+        client (WebexClient): Client of the running import.
+        email (str): Owner email address.
+        directory (PeopleDirectory): People snapshot.
+
+    Returns:
+        str: Person ID if found, otherwise an empty string.
+    """
+    if directory is not None:
+        if email in directory:
+            return directory.person_id(email)
+        if directory.is_missing(email):
+            return ""
+    person_id = await get_person_id_async(client, email)
+    if directory is not None:
+        if person_id:
+            directory.add({"id": person_id, "emails": [email]})
+        elif person_id == "":
+            directory.add_missing(email)
+    return person_id or ""
+
+async def push_device_async(client, device, directory=None):
+    """
+    Pushes a single device to Webex through the shared async client.
+
+    Args:
+        client (WebexClient): Client of the running import.
+        device (dict): Device data to push.
+        directory (PeopleDirectory): People snapshot used to resolve the owner.
+
+    Returns:
+        dict: Response from the Webex API.
+    """
+    email = owner_email(device)
+    person_id = await resolve_person_id(client, email, directory) if email else None
+    try:
+        return await client.post("create device", WEBEX_API_URL, build_device_payload(device, person_id))
+    except Exception as e:
+        print(f"Error pushing device {device.get('MAC Address', '')} to Webex: {e}")
+        return {"error": str(e)}
+
+def import_devices_to_webex(device_data, on_pushed=None, csv_file=None):
     """
     Imports all devices from the provided device data to Webex.
 
+    Owners are resolved from the org's people snapshot. Up to MAX_IN_FLIGHT
+    requests run concurrently over one pooled session. Imported devices are
+    written to JOURNAL_FILE, and devices journaled by an earlier run are
+    skipped, so an interrupted import resumes where it stopped. The result of
+    each device is streamed to RESULTS_FILE as it completes. Once the import
+    is done, the devices imported successfully are marked in the transform
+    state of csv_file, so the next Phone.changed.csv leaves them out.
+
     Args:
-        device_data (list): List of device data dictionaries.
+        device_data (iterable): Device data dictionaries, a list or a stream of rows.
+        on_pushed (callable): Optional on_pushed(device, response), called as each push completes.
+        csv_file (str): Full Phone.csv the rows come from, None to leave the
+            transform state as it is.
 
     Returns:
-        dict: Summary of the import operation.
-    """
-    summary = {
-        "total_devices": len(device_data),
-        "success_count": 0,
-        "failure_count": 0,
-        "success_devices": [],
-        "failed_devices": []
-    }
-
-    for device in device_data:
-        response = push_device_to_webex(device)
-        if "id" in response:  # Successful response contains an 'id'
-            summary["success_count"] += 1
-            summary["success_devices"].append({
-                "mac": device.get("MAC Address", ""),
-                "response": response
-            })
-        else:
-            summary["failure_count"] += 1
-            summary["failed_devices"].append({
-                "mac": device.get("MAC Address", ""),
-                "response": response
-            })
+        dict: Counts of the import operation, the results file, and latency and
+        throttle statistics.
+    """
+    scheduler = shared_scheduler(REQUESTS_PER_SECOND, BURST)
+    directory = shared_directory(
+        HEADERS, ORGANIZATION_ID, PEOPLE_SNAPSHOT_FILE, PEOPLE_SNAPSHOT_TTL, scheduler
+    )
+
+    journal = ImportJournal(JOURNAL_FILE, ORGANIZATION_ID, JOURNAL_FSYNC_EVERY)
+    if len(journal):
+        print(f"Resuming: {len(journal)} devices already imported according to {JOURNAL_FILE}")
+
+    async def push(client, device):
+        key = device_key(device)
+        if key and key in journal:
+            return {"id": journal.get(key), "skipped": "Already in import journal"}
+        return await push_device_async(client, device, directory)
+
+    results = ImportResults(RESULTS_FILE, "mac", COMPACT_RESULTS)
+
+    imported = set()
+
+    def record(device, response):
+        if "id" in response and device_key(device):
+            journal.record(device_key(device), response["id"])
+        if "id" in response and csv_file:
+            imported.add(row_fingerprint(tuple(device.values())))
+        results.add(device.get("MAC Address", ""), response)
+        if on_pushed:
+            on_pushed(device, response)
 
+    with journal, results:
+        stats = run_import(HEADERS, device_data, push, record, MAX_IN_FLIGHT, scheduler=scheduler)
+    summary = results.summary("total_devices")
+    summary.update(stats)
+    if csv_file:
+        mark_imported(csv_file, imported)
     return summary
 
 def write_summary_to_file(summary, file_path):
@@ -172,15 +318,15 @@ def main():
     Main function to execute the Webex device import process.
     """
     try:
-        # Read device data from Device.csv
-        device_data = read_csv(DEVICE_CSV_FILE)
+        # Read device data from Device.csv, or only the changed devices for a delta import
+        device_data = read_csv(DEVICE_DELTA_CSV_FILE if DELTA_IMPORT else DEVICE_CSV_FILE)
         if not device_data:
             print("No device data found. Exiting.")
             return
 
         # Import devices to Webex
         print("Importing devices to Webex...")
-        summary = import_devices_to_webex(device_data)
+        summary = import_devices_to_webex(device_data, csv_file=DEVICE_CSV_FILE)
 
         # Write summary to file
         write_summary_to_file(summary, OUTPUT_SUMMARY_FILE)
@@ -189,7 +335,11 @@ def main():
         print("\nImport Summary:")
         print(f"Total Devices: {summary['total_devices']}")
         print(f"Successfully Imported: {summary['success_count']}")
+        print(f"Already Imported: {summary['skipped_count']}")
         print(f"Failed Imports: {summary['failure_count']}")
+        print(f"Per-device results: {summary['results_file']}")
+        print(f"Latency: {summary['latency']}")
+        print(f"Throttle: {summary['throttle']}")
 
     except Exception as e:
         print("Error occurred during Webex device import:", str(e))
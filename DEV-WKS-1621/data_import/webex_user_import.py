@@ -8,22 +8,45 @@ Created on Tue Jan 28, 2025
 @usage: Place this script in the `Data_import` folder and run it to import users to Webex.
 """
 
+import asyncio
 import csv
 import json
+import os
 import requests
 import sys
 sys.path.append("../")
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "data_transformation"))
+from webex_client import DEFAULT_MAX_IN_FLIGHT, batched, run_import, shared_scheduler
+from people_directory import refresh_directory, save_snapshot, shared_directory
+from import_journal import DEFAULT_FSYNC_EVERY, ImportJournal
+from import_results import ImportResults
+from transform_state import mark_imported, row_fingerprint
 
 # Define constants
 USER_CSV_FILE = "./OutputCSV/User.csv"  # Path to the User.csv file
+USER_DELTA_CSV_FILE = "./OutputCSV/User.changed.csv"  # Rows not imported in their current form by the last import
 WEBEX_API_URL = "https://webexapis.com/v1/people"  # Webex API endpoint
 OUTPUT_SUMMARY_FILE = "./import_summary.json"  # Path to save the summary
+PEOPLE_SNAPSHOT_FILE = "./people_snapshot.json"  # Path of the persisted people snapshot
+SCIM_BULK_URL = "https://webexapis.com/identity/scim/{orgId}/v2/Bulk"  # SCIM 2.0 Bulk endpoint
+JOURNAL_FILE = "./user_import_journal.jsonl"  # Journal of imported users, read back on restart
+RESULTS_FILE = "./user_import_results.jsonl"  # Per-user results, one JSON line per user
 
 with open("./data_import/config.json", "r") as file:
     config = json.load(file)
     WEBEX_ACCESS_TOKEN = config["WEBEX_ACCESS_TOKEN"]
     ORGANIZATION_ID = config["ORGANIZATION_ID"]
     DOMAIN = config["DOMAIN"]
+    MAX_IN_FLIGHT = config.get("MAX_IN_FLIGHT", DEFAULT_MAX_IN_FLIGHT)
+    REQUESTS_PER_SECOND = config.get("REQUESTS_PER_SECOND")
+    BURST = config.get("BURST", 1)
+    PEOPLE_SNAPSHOT_TTL = config.get("PEOPLE_SNAPSHOT_TTL", 0)
+    DELTA_IMPORT = config.get("DELTA_IMPORT", False)
+    SCIM_BULK = config.get("SCIM_BULK", False)
+    SCIM_BULK_SIZE = config.get("SCIM_BULK_SIZE", 100)
+    JOURNAL_FSYNC_EVERY = config.get("JOURNAL_FSYNC_EVERY", DEFAULT_FSYNC_EVERY)
+    COMPACT_RESULTS = config.get("COMPACT_RESULTS", False)
 
 # Headers for Webex API requests
 HEADERS = {
@@ -49,28 +72,51 @@ def read_csv(file_path):
         print(f"Error reading CSV file {file_path}: {e}")
         return []
 
-def push_user_to_webex(user):
+def user_email(user):
     """
-    Pushes a single user to Webex using the Webex API.
+    Returns the Webex email address of a user row.
 
     Args:
-        user (dict): User data to push.
+        user (dict): User data.
 
     Returns:
-        dict: Response from the Webex API.
+        str: Email address, DOMAIN is appended to bare user IDs.
     """
     email = user.get("User ID/Email (Required)", "")
     if "@" not in email:
         email = f"{email}@{DOMAIN}"
+    return email
+
+def build_user_payload(user):
+    """
+    Builds the Webex people payload for a user row.
+
+    Args:
+        user (dict): User data to push.
 
-    payload = {
-        "emails": [email],
+    Returns:
+        dict: Request body for the people API.
+    """
+    return {
+        "emails": [user_email(user)],
         "firstName": user.get("First Name", ""),
         "lastName": user.get("Last Name", ""),
         "displayName": user.get("Display Name", ""),
         "orgId": ORGANIZATION_ID,
     }
 
+def push_user_to_webex(user):
+    """
+    Pushes a single user to Webex using the Webex API.
+
+    Args:
+        user (dict): User data to push.
+
+    Returns:
+        dict: Response from the Webex API.
+    """
+    payload = build_user_payload(user)
+
     try:
         response = requests.post(WEBEX_API_URL, headers=HEADERS, data=json.dumps(payload))
         return response.json()
@@ -78,39 +124,212 @@ def push_user_to_webex(user):
         print(f"Error pushing user {user.get('User ID/Email (Required)', '')} to Webex: {e}")
         return {"error": str(e)}
 
-def import_users_to_webex(user_data):
+async def push_user_async(client, user, directory=None):
     """
-    Imports all users from the provided user data to Webex.
+    Pushes a single user to Webex through the shared async client.
 
     Args:
-        user_data (list): List of user data dictionaries.
+        client (WebexClient): Client of the running import.
+        user (dict): User data to push.
+        directory (PeopleDirectory): People snapshot. Users already in it are
+            not pushed again, created users are added to it.
 
     Returns:
-        dict: Summary of the import operation.
-    """
-    summary = {
-        "total_users": len(user_data),
-        "success_count": 0,
-        "failure_count": 0,
-        "success_users": [],
-        "failed_users": []
+        dict: Response from the Webex API, or {"id", "skipped"} for an existing person.
+    """
+    email = user_email(user)
+    if directory is not None and email in directory:
+        return {"id": directory.person_id(email), "skipped": "Person already exists"}
+    try:
+        response = await client.post("create person", WEBEX_API_URL, build_user_payload(user))
+        if directory is not None and "id" in response:
+            directory.add(response)
+        return response
+    except Exception as e:
+        print(f"Error pushing user {user.get('User ID/Email (Required)', '')} to Webex: {e}")
+        return {"error": str(e)}
+
+def build_scim_user(user):
+    """
+    Builds the SCIM 2.0 User resource for a user row.
+
+    Args:
+        user (dict): User data to push.
+
+    Returns:
+        dict: SCIM User resource.
+    """
+    email = user_email(user)
+    return {
+        "schemas": ["urn:ietf:params:scim:schemas:core:2.0:User"],
+        "userName": email,
+        "name": {
+            "givenName": user.get("First Name", ""),
+            "familyName": user.get("Last Name", ""),
+        },
+        "displayName": user.get("Display Name", ""),
+        "emails": [{"value": email, "type": "work", "primary": True}],
+        "active": True,
     }
 
-    for user in user_data:
-        response = push_user_to_webex(user)
-        if "id" in response:  # Successful response contains an 'id'
-            summary["success_count"] += 1
-            summary["success_users"].append({
-                "email": user.get("User ID/Email (Required)", ""),
-                "response": response
-            })
-        else:
-            summary["failure_count"] += 1
-            summary["failed_users"].append({
-                "email": user.get("User ID/Email (Required)", ""),
-                "response": response
-            })
+def scim_status(operation):
+    """
+    Returns the HTTP status of a SCIM Bulk response operation as an int.
+    """
+    status = operation.get("status")
+    if isinstance(status, dict):
+        status = status.get("code")
+    try:
+        return int(status)
+    except (TypeError, ValueError):
+        return 0
+
+async def push_users_bulk_async(client, users, directory=None):
+    """
+    Creates a batch of users with one SCIM /Bulk request.
+
+    Operations that fail, or the whole batch if the Bulk request itself fails,
+    are retried as single POSTs to the people API.
+
+    Args:
+        client (WebexClient): Client of the running import.
+        users (list): User rows of the batch.
+        directory (PeopleDirectory): People snapshot, existing people are skipped.
+
+    Returns:
+        list: One response per user, in the order of users.
+    """
+    responses = [None] * len(users)
+    operations = []
+    for index, user in enumerate(users):
+        email = user_email(user)
+        if directory is not None and email in directory:
+            responses[index] = {"id": directory.person_id(email), "skipped": "Person already exists"}
+            continue
+        operations.append({
+            "method": "POST",
+            "path": "/Users",
+            "bulkId": str(index),
+            "data": build_scim_user(user),
+        })
+
+    if operations:
+        payload = {
+            "schemas": ["urn:ietf:params:scim:api:messages:2.0:BulkRequest"],
+            "Operations": operations,
+        }
+        try:
+            result = await client.post(
+                "bulk create people", SCIM_BULK_URL.format(orgId=ORGANIZATION_ID), payload
+            )
+            results = result.get("Operations", [])
+        except Exception as e:
+            print(f"Error pushing a SCIM bulk request of {len(operations)} users: {e}")
+            results = []
+
+        for operation in results:
+            index = int(operation.get("bulkId", -1))
+            if 0 <= index < len(users) and scim_status(operation) in (200, 201):
+                location = operation.get("location", "")
+                scim_id = (operation.get("response") or {}).get("id") or location.rsplit("/", 1)[-1]
+                responses[index] = {"id": scim_id, "location": location, "status": scim_status(operation)}
+
+    # Single POSTs for every operation the Bulk request did not create.
+    fallback = [index for index, response in enumerate(responses) if response is None]
+    singles = await asyncio.gather(*(push_user_async(client, users[index], directory) for index in fallback))
+    for index, response in zip(fallback, singles):
+        responses[index] = response
+    return responses
+
+def import_users_to_webex(user_data, on_pushed=None, bulk=None, csv_file=None):
+    """
+    Imports all users from the provided user data to Webex.
+
+    Up to MAX_IN_FLIGHT requests run concurrently over one pooled session.
+    People already present in the org's people snapshot are skipped. In bulk
+    mode, users are created SCIM_BULK_SIZE at a time through the SCIM /Bulk
+    endpoint, and the people snapshot is listed again once the import is done,
+    so the device import can resolve the people it created.
+    Imported users are written to JOURNAL_FILE, and users journaled by an
+    earlier run are skipped, so an interrupted import resumes where it stopped.
+    The result of each user is streamed to RESULTS_FILE as it completes.
+    Once the import is done, the users imported successfully are marked in the
+    transform state of csv_file, so the next User.changed.csv leaves them out.
+
+    Args:
+        user_data (iterable): User data dictionaries, a list or a stream of rows.
+        on_pushed (callable): Optional on_pushed(user, response), called as each push completes.
+        bulk (bool): Use SCIM /Bulk requests, defaults to SCIM_BULK from config.json.
+        csv_file (str): Full User.csv the rows come from, None to leave the
+            transform state as it is.
+
+    Returns:
+        dict: Counts of the import operation, the results file, and latency and
+        throttle statistics.
+    """
+    scheduler = shared_scheduler(REQUESTS_PER_SECOND, BURST)
+    directory = shared_directory(
+        HEADERS, ORGANIZATION_ID, PEOPLE_SNAPSHOT_FILE, PEOPLE_SNAPSHOT_TTL, scheduler
+    )
+
+    journal = ImportJournal(JOURNAL_FILE, ORGANIZATION_ID, JOURNAL_FSYNC_EVERY)
+    if len(journal):
+        print(f"Resuming: {len(journal)} users already imported according to {JOURNAL_FILE}")
+
+    def journaled(user):
+        key = user_email(user).lower()
+        if key in journal:
+            return {"id": journal.get(key), "skipped": "Already in import journal"}
+        return None
+
+    async def push(client, user):
+        return journaled(user) or await push_user_async(client, user, directory)
+
+    results = ImportResults(RESULTS_FILE, "email", COMPACT_RESULTS)
+
+    bulk_created = []
+    imported = set()
+
+    def record(user, response):
+        if "location" in response:
+            bulk_created.append(user_email(user))
+        if "id" in response:
+            journal.record(user_email(user).lower(), response["id"])
+            if csv_file:
+                imported.add(row_fingerprint(tuple(user.values())))
+        results.add(user.get("User ID/Email (Required)", ""), response)
+        if on_pushed:
+            on_pushed(user, response)
+
+    if bulk is None:
+        bulk = SCIM_BULK
+    if bulk:
+        async def push_batch(client, users):
+            responses = [journaled(user) for user in users]
+            remaining = [index for index, response in enumerate(responses) if response is None]
+            if remaining:
+                pushed = await push_users_bulk_async(client, [users[index] for index in remaining], directory)
+                for index, response in zip(remaining, pushed):
+                    responses[index] = response
+            return responses
+
+        def record_batch(users, responses):
+            for user, response in zip(users, responses):
+                record(user, response)
 
+        rows, push_rows, record_rows = batched(user_data, SCIM_BULK_SIZE), push_batch, record_batch
+    else:
+        rows, push_rows, record_rows = user_data, push, record
+    with journal, results:
+        stats = run_import(HEADERS, rows, push_rows, record_rows, MAX_IN_FLIGHT, scheduler=scheduler)
+    summary = results.summary("total_users")
+    summary.update(stats)
+    if csv_file:
+        mark_imported(csv_file, imported)
+    if bulk_created:
+        refresh_directory(directory, HEADERS, ORGANIZATION_ID, scheduler)
+    if PEOPLE_SNAPSHOT_TTL:
+        save_snapshot(directory, PEOPLE_SNAPSHOT_FILE, ORGANIZATION_ID)
     return summary
 
 def write_summary_to_file(summary, file_path):
@@ -133,15 +352,15 @@ def main():
     Main function to execute the Webex user import process.
     """
     try:
-        # Read user data from User.csv
-        user_data = read_csv(USER_CSV_FILE)
+        # Read user data from User.csv, or only the changed users for a delta import
+        user_data = read_csv(USER_DELTA_CSV_FILE if DELTA_IMPORT else USER_CSV_FILE)
         if not user_data:
             print("No user data found. Exiting.")
             return
 
         # Import users to Webex
         print("Importing users to Webex...")
-        summary = import_users_to_webex(user_data)
+        summary = import_users_to_webex(user_data, csv_file=USER_CSV_FILE)
 
         # Write summary to file
         write_summary_to_file(summary, OUTPUT_SUMMARY_FILE)
@@ -150,7 +369,11 @@ def main():
         print("\nImport Summary:")
         print(f"Total Users: {summary['total_users']}")
         print(f"Successfully Imported: {summary['success_count']}")
+        print(f"Already in Webex: {summary['skipped_count']}")
         print(f"Failed Imports: {summary['failure_count']}")
+        print(f"Per-user results: {summary['results_file']}")
+        print(f"Latency: {summary['latency']}")
+        print(f"Throttle: {summary['throttle']}")
 
     except Exception as e:
         print("Error occurred during Webex user import:", str(e))
@@ -0,0 +1,164 @@
+# -*- coding: utf-8 -*-
+"""
+@description: Declarative field mapping for the CSV transformation. A spec is a list
+              of fields, one per CSV column:
+
+                {"header": "Extension", "path": "lines.line.0.dirn.pattern"}
+                {"header": "Type", "path": "type", "default": "USER"}
+                {"header": "MAC Address", "path": "name", "derive": mac_from_name}
+                {"header": "Location", "context": "site_code"}
+                {"header": "Extension", "path": "primaryExtension", "join": user_extension}
+
+              "path" is a dotted path into the record (digits index lists),
+              "default" is used when the path is missing (empty string if not
+              given), "derive" is applied to the value (or to the whole record
+              when there is no path) and "context" takes the value from the
+              keyword arguments of the call instead of the record. "join" is
+              called as join(index, value) with the "index" context value (a
+              SiteIndex, or None when no index was given) before "derive".
+              "key": True marks the column identifying a row across runs.
+
+              compile_spec() turns a spec into one generated Python function that
+              builds a row tuple, looking up each distinct path once, so no
+              per-field dispatch happens while rows are produced.
+
+@usage: Used by transformation.py.
+"""
+
+
+def lookup(record, steps, default=""):
+    """
+    Follows a path into a nested record.
+
+    Args:
+        record (dict): Record to read.
+        steps (tuple): Keys, and int indexes into lists.
+        default: Value returned when a step is missing or not a dict/list.
+
+    Returns:
+        Value at the end of the path, or default.
+    """
+    value = record
+    for step in steps:
+        if type(step) is int:
+            if not isinstance(value, list) or step >= len(value):
+                return default
+        elif not isinstance(value, dict) or step not in value:
+            return default
+        value = value[step]
+    return value
+
+
+class CompiledSpec(object):
+    """
+    Row extractor compiled from a field spec.
+    """
+
+    def __init__(self, fields):
+        """
+        Args:
+            fields (list): Field definitions, see the module description.
+        """
+        self.fields = fields
+        self.headers = [field["header"] for field in fields]
+        self.keys = source_keys(fields)
+        self.key_index = next((index for index, field in enumerate(fields) if field.get("key")), 0)
+        self.extract = compile_spec(fields)
+
+    def row(self, record, **context):
+        """
+        Returns:
+            tuple: Values of one record, in header order.
+        """
+        return self.extract(record, context)
+
+    def rows(self, records, **context):
+        """
+        Lazily extracts the rows of an iterable of records.
+
+        Yields:
+            tuple: Values of each record, in header order.
+        """
+        extract = self.extract
+        for record in records:
+            yield extract(record, context)
+
+    def dicts(self, records, **context):
+        """
+        Returns:
+            list: Rows of the records as dicts keyed by header.
+        """
+        headers = self.headers
+        extract = self.extract
+        return [dict(zip(headers, extract(record, context))) for record in records]
+
+
+def source_keys(fields):
+    """
+    Returns the top-level record keys a spec reads, so readers can drop the rest.
+
+    Args:
+        fields (list): Field definitions.
+
+    Returns:
+        list: Keys in first-use order, None if a field derives from the whole record.
+    """
+    keys = []
+    for field in fields:
+        if "path" in field:
+            key = field["path"].split(".")[0]
+            if key not in keys:
+                keys.append(key)
+        elif "context" not in field:
+            return None
+    return keys
+
+
+def compile_spec(fields):
+    """
+    Generates the extractor function of a field spec.
+
+    Args:
+        fields (list): Field definitions, see the module description.
+
+    Returns:
+        callable: extract(record, context) returning the row tuple.
+    """
+    namespace = {"lookup": lookup}
+    lines = []
+    lookups = {}
+    expressions = []
+    for index, field in enumerate(fields):
+        if "context" in field:
+            expression = f"context[{field['context']!r}]"
+        elif "path" in field:
+            default = field.get("default", "")
+            key = (field["path"], repr(default))
+            if key not in lookups:
+                name = f"value_{len(lookups)}"
+                namespace[f"default_{index}"] = default
+                steps = tuple(int(step) if step.isdigit() else step for step in field["path"].split("."))
+                if len(steps) == 1:
+                    lines.append(f"{name} = record.get({steps[0]!r}, default_{index})")
+                else:
+                    namespace[f"steps_{index}"] = steps
+                    lines.append(f"{name} = lookup(record, steps_{index}, default_{index})")
+                lookups[key] = name
+            expression = lookups[key]
+        else:
+            expression = "record"
+        if field.get("join"):
+            namespace[f"join_{index}"] = field["join"]
+            expression = f"join_{index}(site_index, {expression})"
+        if field.get("derive"):
+            namespace[f"derive_{index}"] = field["derive"]
+            expression = f"derive_{index}({expression})"
+        expressions.append(expression)
+
+    source = "def extract(record, context):\n"
+    if any(field.get("join") for field in fields):
+        source += "    site_index = context.get('index')\n"
+    source += "".join(f"    {line}\n" for line in lines)
+    source += f"    return ({''.join(f'{expression}, ' for expression in expressions)})\n"
+    exec(compile(source, "<field spec>", "exec"), namespace)
+    return namespace["extract"]
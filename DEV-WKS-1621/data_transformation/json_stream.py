@@ -0,0 +1,113 @@
+# -*- coding: utf-8 -*-
+"""
+@description: Incremental reader for the ConfigExports JSON arrays. The file is read
+              in chunks and the top-level array is decoded one element at a time
+              with json.JSONDecoder.raw_decode, so only the current record and one
+              chunk of text are held in memory, whatever the size of the export.
+              An optional projection keeps only the top-level keys a caller uses
+              and drops the rest of the record as soon as it is decoded.
+
+@usage: Used by transformation.py through iter_array().
+"""
+
+import json
+
+CHUNK_SIZE = 1 << 20
+
+_decoder = json.JSONDecoder()
+_WHITESPACE = " \t\n\r"
+
+
+def iter_array(file_path, fields=None, chunk_size=CHUNK_SIZE):
+    """
+    Yields the elements of a JSON file holding a top-level array.
+
+    Args:
+        file_path (str): Path to the JSON file.
+        fields (iterable): Top-level keys kept in each record, None keeps the whole record.
+        chunk_size (int): Characters read from the file at a time.
+
+    Yields:
+        Each element of the array, projected to `fields` when given.
+
+    Raises:
+        ValueError: If the file does not hold exactly one well-formed JSON array.
+    """
+    fields = tuple(fields) if fields is not None else None
+    with open(file_path, "r", encoding="utf-8") as file:
+        buffer = ""
+        pos = 0
+        eof = False
+        read_size = chunk_size
+
+        def refill():
+            nonlocal buffer, pos, eof, read_size
+            chunk = file.read(read_size)
+            if not chunk:
+                eof = True
+            # Drop the consumed text before appending, so the buffer stays one record plus one chunk.
+            buffer = buffer[pos:] + chunk
+            pos = 0
+
+        def skip(characters):
+            # Skips the given characters, refilling as needed.
+            nonlocal pos
+            while True:
+                while pos < len(buffer) and buffer[pos] in characters:
+                    pos += 1
+                if pos < len(buffer) or eof:
+                    return
+                refill()
+
+        def check_end():
+            # Only whitespace may follow the closing "]".
+            skip(_WHITESPACE)
+            if pos < len(buffer):
+                raise ValueError(f"Extra data after the array in {file_path}")
+
+        skip(_WHITESPACE)
+        if buffer[pos:pos + 1] != "[":
+            raise ValueError(f"{file_path} does not hold a JSON array")
+        pos += 1
+        skip(_WHITESPACE)
+        if buffer[pos:pos + 1] == "]":
+            pos += 1
+            check_end()
+            return
+
+        while True:
+            # pos is at the start of an element: right after "[" or ","
+            if pos >= len(buffer):
+                raise ValueError(f"Unexpected end of {file_path}")
+            if buffer[pos] in ",]":
+                raise ValueError(f"Expecting a value at character {pos} of {file_path}")
+            try:
+                value, end = _decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+                # The element continues past the buffer; read more, growing
+                # the read size so a very large element is not re-parsed per chunk.
+                refill()
+                read_size *= 2
+                continue
+            # The element must be followed by "," or "]"; otherwise a number
+            # (e.g. "-7." of "-7.5e3") may continue in the next chunk.
+            after = end
+            while after < len(buffer) and buffer[after] in _WHITESPACE:
+                after += 1
+            if after == len(buffer) or buffer[after] not in ",]":
+                if not eof:
+                    refill()
+                    continue
+                raise ValueError(f"Expecting ',' or ']' after an element of {file_path}")
+            read_size = chunk_size
+            delimiter = buffer[after]
+            pos = after + 1
+            if fields is not None and isinstance(value, dict):
+                value = {key: value[key] for key in fields if key in value}
+            yield value
+            if delimiter == "]":
+                check_end()
+                return
+            skip(_WHITESPACE)
@@ -0,0 +1,146 @@
+# -*- coding: utf-8 -*-
+"""
+@description: In-memory index of one site's Phone, User and Line exports, so the
+              transforms can join the three without scanning them. It is built
+              once per site and passed to every transform as the "index" context
+              value of the field specs.
+
+                users             userid -> user
+                phones            device name -> phone
+                lines             (pattern, partition) -> line
+                missing_lines     (pattern, partition) of the numbers checked by
+                                  check_line that are not in Line.json
+
+              When the index is built from files, only the keys it needs are
+              kept from each record (INDEX_KEYS).
+
+@usage: Used by transformation.py and main.py.
+"""
+
+import os
+
+from json_stream import iter_array
+
+INDEX_KEYS = {
+    "Phone": ["name", "ownerUserName"],
+    "User": ["userid", "primaryExtension"],
+    "Line": ["pattern", "routePartitionName"],
+}
+
+
+def line_key(dirn):
+    """
+    Returns the index key of a directory number.
+
+    Args:
+        dirn (dict): Line record, phone line "dirn" or user "primaryExtension",
+            with "pattern" and "routePartitionName".
+
+    Returns:
+        tuple: (pattern, partition), partition is "" for the null partition.
+    """
+    return (dirn.get("pattern") or "", dirn.get("routePartitionName") or "")
+
+
+class SiteIndex(object):
+    """
+    Hash maps joining the Phone, User and Line records of a site.
+    """
+
+    def __init__(self, phones=(), users=(), lines=()):
+        """
+        Args:
+            phones (iterable): Phone records.
+            users (iterable): User records.
+            lines (iterable): Line records.
+        """
+        self.users = {}
+        self.phones = {}
+        self.lines = {}
+        self.missing_lines = set()
+        for line in lines:
+            self.lines[line_key(line)] = line
+        for user in users:
+            self.add_user(user)
+        for phone in phones:
+            self.add_phone(phone)
+
+    def add_user(self, user):
+        """
+        Indexes a user.
+        """
+        userid = user.get("userid")
+        if userid:
+            self.users[userid] = user
+
+    def add_phone(self, phone):
+        """
+        Indexes a phone.
+        """
+        name = phone.get("name")
+        if name:
+            self.phones[name] = phone
+
+    def user(self, userid):
+        return self.users.get(userid)
+
+    def phone(self, name):
+        return self.phones.get(name)
+
+    def line(self, pattern, partition=None):
+        """
+        Returns:
+            dict: Line record of the directory number, None if it is not in Line.json.
+        """
+        return self.lines.get((pattern or "", partition or ""))
+
+    def has_line(self, dirn):
+        """
+        Checks a directory number against Line.json. Every number passes when
+        no Line records were indexed, so a missing Line.json is not reported
+        as missing numbers.
+
+        Args:
+            dirn (dict): Directory number with "pattern" and "routePartitionName".
+
+        Returns:
+            bool: True if the number is known or nothing can be checked.
+        """
+        return not self.lines or line_key(dirn) in self.lines
+
+    def check_line(self, dirn):
+        """
+        Checks a directory number like has_line, and adds it to missing_lines
+        if it is not in Line.json.
+
+        Returns:
+            bool: True if the number is known or nothing can be checked.
+        """
+        if self.has_line(dirn):
+            return True
+        self.missing_lines.add(line_key(dirn))
+        return False
+
+
+def load_site_index(input_dir):
+    """
+    Builds the index of a ConfigExports/<siteCode>/ directory, reading each
+    export once and keeping only INDEX_KEYS of each record.
+
+    Args:
+        input_dir (str): Site export directory.
+
+    Returns:
+        SiteIndex: Index of the site, empty for missing exports.
+    """
+    records = {}
+    for dtype, keys in INDEX_KEYS.items():
+        path = os.path.join(input_dir, f"{dtype}.json")
+        records[dtype] = []
+        if not os.path.exists(path):
+            continue
+        try:
+            records[dtype] = list(iter_array(path, keys))
+        except Exception as e:
+            print(f"Error indexing JSON file {path}: {e}")
+    return SiteIndex(records["Phone"], records["User"], records["Line"])
@@ -0,0 +1,295 @@
+# -*- coding: utf-8 -*-
+"""
+@description: Memo of the last transformation, stored as transform_state.json in the
+              CSV output directory. For every output CSV it keeps:
+
+                signature     hash of the field spec, its context and the content
+                              of every input file the CSV depends on
+                base          the same, without the exported records themselves
+                output        hash of the CSV as written, so a CSV overwritten
+                              since (e.g. by --merge or main.py) is regenerated
+                rows          number of rows written
+                records       source record key (e.g. phone name, or pattern and
+                              partition of a line) -> [hash of the record, hash of
+                              its row], in CSV row order
+                imported      source record key -> hash of its row at the last
+                              successful Webex import
+                changed       rows new or different since the last import
+                removed       record keys imported before that are gone
+
+              A rerun skips a CSV whose signature is unchanged without reading its
+              inputs. Otherwise the CSV is rewritten; while the base is unchanged,
+              records whose hash is unchanged keep their previous row instead of
+              being extracted again. Rows that differ from the last import are
+              written to <name>.changed.csv, which the Webex import can push
+              instead of the full CSV. The imports call mark_imported() with the
+              rows they pushed, which moves the baseline forward.
+
+@usage: Used by transformation.py, webex_user_import.py and webex_device_import.py.
+"""
+
+import csv
+import hashlib
+import json
+import os
+
+STATE_FILE = "transform_state.json"
+STATE_VERSION = 3
+HASH_CHUNK_SIZE = 1 << 20
+
+
+def file_hash(path):
+    """
+    Returns:
+        str: SHA-256 of the file content, None if the file does not exist.
+    """
+    if not os.path.exists(path):
+        return None
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        for chunk in iter(lambda: file.read(HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def function_hash(func):
+    """
+    Identifies a derive/join function by its name and code, so editing one
+    invalidates the CSVs that use it.
+    """
+    code = getattr(func, "__code__", None)
+    if code is None:
+        return getattr(func, "__qualname__", repr(func))
+    return f"{func.__qualname__}:{code.co_code.hex()}:{code.co_consts!r}"
+
+
+def spec_hash(spec):
+    """
+    Returns:
+        str: Hash of the field definitions of a CompiledSpec.
+    """
+    fields = [
+        {key: function_hash(value) if callable(value) else value for key, value in field.items()}
+        for field in spec.fields
+    ]
+    return hashlib.sha256(json.dumps(fields, sort_keys=True, default=repr).encode("utf-8")).hexdigest()
+
+
+def row_fingerprint(row):
+    """
+    Returns:
+        str: Short hash of a row tuple, the same for the row as extracted and
+        as read back from the CSV.
+    """
+    values = tuple("" if value is None else str(value) for value in row)
+    return hashlib.blake2b(repr(values).encode("utf-8"), digest_size=8).hexdigest()
+
+
+def record_fingerprint(record):
+    """
+    Returns:
+        str: Short hash of a source record.
+    """
+    text = json.dumps(record, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=8).hexdigest()
+
+
+def record_key(record, fields):
+    """
+    Returns:
+        str: Key of a source record from its key fields, e.g. "1000@Internal_PT"
+        for the pattern and partition of a line.
+    """
+    return "@".join(str(record.get(field) or "") for field in fields)
+
+
+def changed_path(output_file):
+    """
+    Returns:
+        str: Path of the changed-rows CSV of an output CSV, e.g. Phone.changed.csv.
+    """
+    root, extension = os.path.splitext(output_file)
+    return f"{root}.changed{extension}"
+
+
+class TransformState(object):
+    """
+    Transformation memo of one output directory.
+    """
+
+    def __init__(self, directory, force=False):
+        """
+        Args:
+            directory (str): CSV output directory the state file lives in.
+            force (bool): Regenerate every CSV; changed rows are still tracked.
+        """
+        self.path = os.path.join(directory, STATE_FILE)
+        self.force = force
+        self.outputs = {}
+        if os.path.exists(self.path):
+            try:
+                with open(self.path, "r", encoding="utf-8") as file:
+                    state = json.load(file)
+                if state.get("version") == STATE_VERSION:
+                    self.outputs = state.get("outputs", {})
+            except Exception as e:
+                print(f"Error reading transformation state {self.path}: {e}")
+
+    def signature(self, spec, input_files, context):
+        """
+        Computes the signature an output CSV is regenerated from.
+
+        Args:
+            spec (CompiledSpec): Fields of the CSV.
+            input_files (list): Every file the CSV depends on.
+            context (dict): Context values of the spec; the site index is left
+                out, it is covered by the input files.
+
+        Returns:
+            str: Signature hash.
+        """
+        values = {
+            "spec": spec_hash(spec),
+            "context": {key: value for key, value in context.items() if key != "index"},
+            "inputs": [[path, file_hash(path)] for path in input_files],
+        }
+        return hashlib.sha256(json.dumps(values, sort_keys=True, default=repr).encode("utf-8")).hexdigest()
+
+    def is_current(self, name, signature, output_file):
+        """
+        Returns:
+            bool: True if output_file was written from the same signature and
+            still holds what was written then.
+        """
+        entry = self.outputs.get(name)
+        if self.force or entry is None or entry["signature"] != signature:
+            return False
+        return file_hash(output_file) == entry["output"]
+
+    def entry(self, name):
+        return self.outputs.get(name, {})
+
+    def previous_rows(self, name, base, output_file):
+        """
+        Reads back the rows of the previous run that can be reused: only if the
+        base is unchanged and the CSV still holds what was written.
+
+        Returns:
+            dict: Record key -> row as read from the CSV, empty if nothing can be reused.
+        """
+        entry = self.entry(name)
+        if self.force or entry.get("base") != base or file_hash(output_file) != entry.get("output"):
+            return {}
+        with open(output_file, "r", newline="", encoding="utf-8") as file:
+            reader = csv.reader(file)
+            next(reader, None)
+            rows = list(reader)
+        if len(rows) != entry.get("rows") or len(rows) != len(entry.get("records", {})):
+            return {}
+        return dict(zip(entry["records"], rows))
+
+    def update(self, name, signature, base, output_file, rows, records):
+        """
+        Records a regenerated output CSV.
+
+        Args:
+            rows (int): Number of rows written.
+            records (dict): Record key -> [record hash, row hash], in row order.
+        """
+        imported = self.entry(name).get("imported", {})
+        self.outputs[name] = {
+            "signature": signature,
+            "base": base,
+            "output": file_hash(output_file),
+            "rows": rows,
+            "records": records,
+            "imported": imported,
+        }
+        self.count_changes(name)
+
+    def count_changes(self, name):
+        """
+        Updates "changed" and "removed" of an output against its import baseline.
+        """
+        entry = self.outputs[name]
+        imported = entry["imported"]
+        entry["changed"] = sum(1 for key, (_, row) in entry["records"].items() if imported.get(key) != row)
+        entry["removed"] = [key for key in imported if key not in entry["records"]]
+
+    def is_changed(self, name, key, row_hash):
+        """
+        Returns:
+            bool: True if the row of a record differs from its last import.
+        """
+        return self.entry(name).get("imported", {}).get(key) != row_hash
+
+    def rows(self, name):
+        return self.entry(name).get("rows", 0)
+
+    def mark_imported(self, name, row_hashes):
+        """
+        Moves the import baseline of an output CSV to the given rows.
+
+        Args:
+            name (str): Output CSV name, e.g. "User.csv".
+            row_hashes (set): row_fingerprint of every row imported successfully.
+
+        Returns:
+            int: Records marked as imported.
+        """
+        entry = self.outputs.get(name)
+        if entry is None:
+            return 0
+        marked = 0
+        imported = {key: row for key, row in entry["imported"].items() if key in entry["records"]}
+        for key, (_, row) in entry["records"].items():
+            if row in row_hashes:
+                imported[key] = row
+                marked += 1
+        entry["imported"] = imported
+        self.count_changes(name)
+        return marked
+
+    def save(self):
+        """
+        Writes the state file atomically.
+        """
+        try:
+            temp_file = f"{self.path}.tmp"
+            with open(temp_file, "w", encoding="utf-8") as file:
+                json.dump({"version": STATE_VERSION, "outputs": self.outputs}, file)
+            os.replace(temp_file, self.path)
+        except Exception as e:
+            print(f"Error writing transformation state {self.path}: {e}")
+
+
+def mark_imported(csv_file, row_hashes):
+    """
+    Moves the import baseline forward after a Webex import, so the next
+    <name>.changed.csv only holds rows that were not imported in their
+    current form. A merged CSV is matched against the state of every site
+    directory next to it.
+
+    Args:
+        csv_file (str): Full CSV the rows come from, e.g. ./OutputCSV/User.csv.
+        row_hashes (set): row_fingerprint(tuple(row.values())) of every row
+            imported successfully, the row being a dict in header order.
+
+    Returns:
+        int: Records marked as imported.
+    """
+    directory = os.path.dirname(csv_file) or "."
+    name = os.path.basename(csv_file)
+    directories = [directory]
+    if os.path.isdir(directory):
+        directories.extend(
+            os.path.join(directory, entry) for entry in sorted(os.listdir(directory))
+            if os.path.isfile(os.path.join(directory, entry, STATE_FILE))
+        )
+    marked = 0
+    for state_dir in directories:
+        state = TransformState(state_dir)
+        if name in state.outputs:
+            marked += state.mark_imported(name, row_hashes)
+            state.save()
+    return marked
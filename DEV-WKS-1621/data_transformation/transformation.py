@@ -4,21 +4,55 @@ Created on Tue Jan 28, 2025
 
 @description: This script transforms JSON files (Phone, User, DirectoryNumber) into CSV files
               by extracting specific fields and saving them in a structured format.
+              The fields of each CSV are declared in USER_FIELDS, PHONE_FIELDS and
+              DIRECTORY_NUMBER_FIELDS (see field_spec.py), compiled once, and rows
+              are written to the CSV as they are produced.
+
+              The exported JSON arrays are read one record at a time (see
+              json_stream.py), keeping only the keys the fields use, so memory
+              does not grow with the size of the export.
+
+              Each site's exports are indexed once (site_index.py) and the index
+              is shared by the transforms for cross-entity lookups, e.g. user
+              extensions are checked against Line.json.
+
+              A rerun skips every CSV whose inputs and fields are unchanged, and
+              only extracts the records that changed since the last run. The
+              rows not imported to Webex in their current form are written to
+              <name>.changed.csv for a delta import (see transform_state.py);
+              --full rewrites everything.
+
+              With --all-sites, every site directory under ConfigExports/ is
+              transformed in its own process into OutputCSV/<site>/, and --merge
+              also writes one CSV set of all sites, in site name order.
 
 @usage: Place this script in the `data_transformation` folder and run it to generate CSV files.
+        python data_transformation/transformation.py [--all-sites [--merge] [--workers N]] [--full]
 """
 
+import argparse
 import os
 import json
 import csv
+import itertools
 import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache, partial
 sys.path.append("../")
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from field_spec import CompiledSpec
+from json_stream import iter_array
+from site_index import SiteIndex, load_site_index
+from transform_state import TransformState, changed_path, record_fingerprint, record_key, row_fingerprint
 
 
 # Define input and output directories
 file_path = "./data_collection/adapter/source.json"
-siteCode = json.load(open(file_path, "r"))["siteCode"]
-INPUT_DIR = f"./ConfigExports/{siteCode}/"
+source = json.load(open(file_path, "r"))
+siteCode = source.get("siteCode") or source["clusters"][0]["siteCode"]
+EXPORT_DIR = "./ConfigExports/"
+INPUT_DIR = f"{EXPORT_DIR}{siteCode}/"
 OUTPUT_DIR = "./OutputCSV/"
 
 # Ensure the output directory exists
@@ -42,6 +76,23 @@ def read_json(file_path):
         print(f"Error reading JSON file {file_path}: {e}")
         return None
 
+def iter_records(file_path, fields=None):
+    """
+    Reads the records of a JSON array file one at a time.
+
+    Args:
+        file_path (str): Path to the JSON file.
+        fields (list): Top-level keys kept in each record, None keeps whole records.
+
+    Yields:
+        dict: Records of the file. Reading stops with an error message if the
+        file is missing or malformed.
+    """
+    try:
+        yield from iter_array(file_path, fields)
+    except Exception as e:
+        print(f"Error reading JSON file {file_path}: {e}")
+
 def write_csv(file_path, data, headers):
     """
     Writes data to a CSV file.
@@ -60,125 +111,473 @@ def write_csv(file_path, data, headers):
     except Exception as e:
         print(f"Error writing CSV file {file_path}: {e}")
 
-def transform_users(input_file, output_file):
+def write_rows(file_path, rows, headers):
+    """
+    Writes row tuples to a CSV file as they are produced.
+
+    Args:
+        file_path (str): Path to the CSV file.
+        rows (iterable): Row tuples in header order, for example a generator.
+        headers (list): List of column headers for the CSV file.
+
+    Returns:
+        int: Number of rows written.
+    """
+    count = 0
+    try:
+        with open(file_path, "w", newline="", encoding="utf-8") as file:
+            writer = csv.writer(file)
+            writer.writerow(headers)
+            for row in rows:
+                writer.writerow(row)
+                count += 1
+        print(f"CSV file created: {file_path}")
+    except Exception as e:
+        print(f"Error writing CSV file {file_path}: {e}")
+    return count
+
+def mac_from_name(name):
+    """
+    Returns the MAC address of a device name, e.g. SEP0011223344AA -> 0011223344AA.
+    """
+    name = name or ""
+    return name[3:] if name.upper().startswith("SEP") else name
+
+def user_extension(index, primary_extension):
+    """
+    Returns the pattern of a user's primaryExtension. A directory number that
+    Line.json does not hold is still written, and is counted in the
+    missing_lines of the index (see report_missing_lines).
+
+    Args:
+        index (SiteIndex): Index of the site, None to skip the Line.json check.
+        primary_extension (dict): primaryExtension of the user record.
+    """
+    if not primary_extension:
+        return ""
+    if not isinstance(primary_extension, dict):
+        return primary_extension
+    if index is not None:
+        index.check_line(primary_extension)
+    return primary_extension.get("pattern") or ""
+
+def report_missing_lines(index, limit=10):
+    """
+    Prints the user extensions that were not found in the site's Line.json.
+
+    Args:
+        index (SiteIndex): Index the users were extracted with.
+        limit (int): Number of directory numbers listed.
+
+    Returns:
+        int: Number of missing directory numbers.
+    """
+    missing = sorted(index.missing_lines)
+    if missing:
+        listed = ", ".join(f"{pattern}@{partition}" if partition else pattern for pattern, partition in missing[:limit])
+        more = f" and {len(missing) - limit} more" if len(missing) > limit else ""
+        print(f"{len(missing)} user extensions are not in Line.json, written as is: {listed}{more}")
+    return len(missing)
+
+# Define CSV fields
+USER_FIELDS = [
+    {"header": "First Name", "path": "firstName"},
+    {"header": "Last Name", "path": "lastName"},
+    {"header": "Display Name", "path": "displayName", "derive": str},
+    {"header": "User ID/Email (Required)", "path": "userid", "key": True},
+    {"header": "Extension", "path": "primaryExtension", "join": user_extension},
+    {"header": "Phone Number", "path": "primaryExtension", "join": user_extension},
+    {"header": "Caller ID Number", "path": "primaryExtension", "join": user_extension},
+    {"header": "Caller ID First Name", "path": "firstName"},
+    {"header": "Caller ID Last Name", "path": "lastName"},
+    {"header": "Location", "context": "site_code"},
+]
+PHONE_FIELDS = [
+    {"header": "Username", "path": "ownerUserName"},
+    {"header": "Type", "path": "type", "default": "USER"},
+    {"header": "Extension", "path": "lines.line.0.dirn.pattern"},
+    {"header": "Phone Number", "path": "lines.line.0.dirn.pattern"},
+    {"header": "Device Type", "path": "deviceType", "default": "IP"},
+    {"header": "Model", "path": "model"},
+    {"header": "MAC Address", "path": "name", "derive": mac_from_name, "key": True},
+    {"header": "Location", "path": "devicePoolName"},
+]
+DIRECTORY_NUMBER_FIELDS = [
+    {"header": "Number", "path": "pattern", "key": True},
+]
+
+USER_SPEC = CompiledSpec(USER_FIELDS)
+PHONE_SPEC = CompiledSpec(PHONE_FIELDS)
+DIRECTORY_NUMBER_SPEC = CompiledSpec(DIRECTORY_NUMBER_FIELDS)
+
+# Define CSV headers
+USER_HEADERS = USER_SPEC.headers
+PHONE_HEADERS = PHONE_SPEC.headers
+DIRECTORY_NUMBER_HEADERS = DIRECTORY_NUMBER_SPEC.headers
+
+def user_rows(data, site_code=None, index=None):
+    """
+    Extracts the User CSV fields from User records.
+
+    Args:
+        data (list): User records as exported to User.json.
+        site_code (str): Location written to every row, defaults to siteCode.
+        index (SiteIndex): Index of the site, used to check extensions against Line.json.
+
+    Returns:
+        list: CSV rows keyed by USER_HEADERS.
+    """
+    return USER_SPEC.dicts(data, site_code=site_code or siteCode, index=index)
+
+def phone_rows(data, index=None):
+    """
+    Extracts the Phone CSV fields from Phone records.
+
+    Args:
+        data (list): Phone records as exported to Phone.json.
+        index (SiteIndex): Index of the site.
+
+    Returns:
+        list: CSV rows keyed by PHONE_HEADERS.
+    """
+    return PHONE_SPEC.dicts(data, index=index)
+
+def directory_number_rows(data, index=None):
+    """
+    Extracts the DirectoryNumber CSV fields from Line records.
+
+    Args:
+        data (list): Line records as exported to Line.json.
+        index (SiteIndex): Index of the site.
+
+    Returns:
+        list: CSV rows keyed by DIRECTORY_NUMBER_HEADERS.
+    """
+    return DIRECTORY_NUMBER_SPEC.dicts(data, index=index)
+
+def write_changes(output_file, spec, state):
+    """
+    Writes <name>.changed.csv of a CSV that was not regenerated: its rows that
+    differ from the last import, read back from the CSV.
+    """
+    name = os.path.basename(output_file)
+    keys = list(state.entry(name).get("records", {}).items())
+    with open(output_file, "r", newline="", encoding="utf-8") as file:
+        reader = csv.reader(file)
+        next(reader, None)
+        changes = (
+            row for row, (key, (_, row_hash)) in zip(reader, keys) if state.is_changed(name, key, row_hash)
+        )
+        write_rows(changed_path(output_file), changes, spec.headers)
+
+def transform_file(input_file, output_file, spec, state=None, depends=(), key_fields=None, **context):
+    """
+    Streams the records of a JSON export through a field spec into a CSV file.
+    Nothing is written if the export is missing or empty.
+
+    With a TransformState, the CSV is skipped if its inputs and fields are
+    unchanged since the last run. Otherwise only the records that changed are
+    extracted again, and the rows that differ from the last Webex import are
+    also written to <name>.changed.csv.
+
+    Args:
+        input_file (str): Path to the JSON file.
+        output_file (str): Path to the output CSV file.
+        spec (CompiledSpec): Fields of the CSV.
+        state (TransformState): Memo of the last run, None to always rewrite.
+        depends (list): Other files the rows depend on, e.g. Line.json for joins.
+        key_fields (list): Top-level fields identifying a source record,
+            defaults to the first key of the spec's key field path.
+        **context: Context values of the spec, e.g. site_code. An "index" given
+            as a callable is only called when a record has to be extracted.
+
+    Returns:
+        int: Number of rows in the CSV.
+    """
+    name = os.path.basename(output_file)
+    signature = None
+    if state is not None:
+        signature = state.signature(spec, [input_file, *depends], context)
+        if state.is_current(name, signature, output_file):
+            print(f"Unchanged, skipped: {output_file}")
+            write_changes(output_file, spec, state)
+            return state.rows(name)
+
+    def extract(record):
+        if callable(context.get("index")):
+            context["index"] = context["index"]()
+        return spec.row(record, **context)
+
+    if key_fields is None:
+        key_fields = [spec.fields[spec.key_index].get("path", "").split(".")[0]]
+    fields = spec.keys
+    if fields is not None:
+        fields = fields + [field for field in key_fields if field not in fields]
+    records = iter_records(input_file, fields)
+    first = next(records, None)
+    if first is None:
+        if state is not None:
+            # No stale delta from an earlier run
+            write_rows(changed_path(output_file), [], spec.headers)
+        return 0
+    records = itertools.chain([first], records)
+    if state is None:
+        if callable(context.get("index")):
+            context["index"] = context["index"]()
+        return write_rows(output_file, spec.rows(records, **context), spec.headers)
+
+    base = state.signature(spec, depends, context)
+    previous_rows = state.previous_rows(name, base, output_file)
+    previous = state.entry(name).get("records", {})
+    hashes = {}
+    changed = reused = 0
+    with open(changed_path(output_file), "w", newline="", encoding="utf-8") as file:
+        changes = csv.writer(file)
+        changes.writerow(spec.headers)
+
+        def tracked(records):
+            nonlocal changed, reused
+            for record in records:
+                key = record_key(record, key_fields)
+                record_hash = record_fingerprint(record)
+                known = previous.get(key)
+                if known is not None and known[0] == record_hash and key in previous_rows:
+                    row, row_hash = previous_rows[key], known[1]
+                    reused += 1
+                else:
+                    row = extract(record)
+                    row_hash = row_fingerprint(row)
+                hashes[key] = [record_hash, row_hash]
+                if state.is_changed(name, key, row_hash):
+                    changes.writerow(row)
+                    changed += 1
+                yield row
+
+        count = write_rows(output_file, tracked(records), spec.headers)
+    state.update(name, signature, base, output_file, count, hashes)
+    print(
+        f"{output_file}: {count - reused} of {count} records extracted, {changed} rows not imported yet, "
+        f"{len(state.entry(name)['removed'])} removed"
+    )
+    return count
+
+def transform_users(input_file, output_file, site_code=None, index=None, state=None):
     """
     Transforms User JSON data into a CSV file with specific fields.
 
     Args:
         input_file (str): Path to the User JSON file.
         output_file (str): Path to the output CSV file.
+        site_code (str): Location written to every row, defaults to siteCode.
+        index (SiteIndex): Index of the site.
+        state (TransformState): Memo of the last run.
+
+    Returns:
+        int: Number of rows written.
     """
-    data = read_json(input_file)
-    if not data:
-        return
-
-    # Extract specific fields
-    transformed_data = []
-    for user in data:
-        transformed_data.append({
-            "First Name": user.get("firstName", ""),
-            "Last Name": user.get("lastName", ""),
-            "Display Name": f"{user.get('displayName', '')}",
-            "User ID/Email (Required)": user.get("userid", ""),
-            "Extension": user.get("primaryExtension", ""),
-            "Phone Number": user.get("primaryExtension", ""),
-            "Caller ID Number": user.get("primaryExtension", ""),
-            "Caller ID First Name": user.get("firstName", ""),
-            "Caller ID Last Name": user.get("lastName", ""),
-            "Location": siteCode
-        })
-
-    # Define CSV headers
-    headers = [
-        "First Name", "Last Name", "Display Name", "User ID/Email (Required)",
-        "Extension", "Phone Number", "Caller ID Number", "Caller ID First Name",
-        "Caller ID Last Name", "Location"
-    ]
-
-    # Write to CSV
-    write_csv(output_file, transformed_data, headers)
-
-def transform_phones(input_file, output_file):
+    # Extensions are checked against the site's Line.json
+    line_json = os.path.join(os.path.dirname(input_file), "Line.json")
+    return transform_file(
+        input_file, output_file, USER_SPEC, state, [line_json], ["userid"],
+        site_code=site_code or siteCode, index=index,
+    )
+
+def transform_phones(input_file, output_file, index=None, state=None):
     """
     Transforms Phone JSON data into a CSV file with specific fields.
 
     Args:
         input_file (str): Path to the Phone JSON file.
         output_file (str): Path to the output CSV file.
+        index (SiteIndex): Index of the site.
+        state (TransformState): Memo of the last run.
+
+    Returns:
+        int: Number of rows written.
     """
-    data = read_json(input_file)
-    if not data:
-        return
-
-    # Extract specific fields
-    transformed_data = []
-    for phone in data:
-        if phone.get("lines"):
-            lines = phone.get("lines", {}).get("line", [{}])[0].get("dirn", {}).get("pattern", "")
-        transformed_data.append({
-            "Username": phone.get("ownerUserName", ""),
-            "Type": phone.get("type", "USER"),
-            "Extension": lines,
-            "Phone Number": lines,
-            "Device Type": phone.get("deviceType", "IP"),
-            "Model": phone.get("model", ""),
-            "MAC Address": phone.get("name", "").strip("SEP"),
-            "Location": phone.get("devicePoolName", "")
-        })
-
-    # Define CSV headers
-    headers = [
-        "Username", "Type", "Extension", "Phone Number", "Device Type",
-        "Model", "MAC Address", "Location"
-    ]
-
-    # Write to CSV
-    write_csv(output_file, transformed_data, headers)
-
-def transform_directory_numbers(input_file, output_file):
+    return transform_file(input_file, output_file, PHONE_SPEC, state, key_fields=["name"], index=index)
+
+def transform_directory_numbers(input_file, output_file, index=None, state=None):
     """
     Transforms DirectoryNumber JSON data into a CSV file with specific fields.
 
     Args:
         input_file (str): Path to the DirectoryNumber JSON file.
         output_file (str): Path to the output CSV file.
+        index (SiteIndex): Index of the site.
+        state (TransformState): Memo of the last run.
+
+    Returns:
+        int: Number of rows written.
+    """
+    # The same pattern can exist in several partitions
+    return transform_file(
+        input_file, output_file, DIRECTORY_NUMBER_SPEC, state, key_fields=["pattern", "routePartitionName"], index=index
+    )
+
+def transform_directory(input_dir, output_dir, site_code=None, full=False):
+    """
+    Transforms the exports of one site directory into the three CSVs.
+
+    The site index is built once, and only if a CSV has to be regenerated.
+
+    Args:
+        input_dir (str): Directory holding Phone.json, User.json and Line.json.
+        output_dir (str): Directory the CSVs are written to.
+        site_code (str): Location of the users, defaults to siteCode.
+        full (bool): Rewrite every CSV, even if its inputs are unchanged.
+
+    Returns:
+        dict: Rows of each CSV, {"User", "Phone", "DirectoryNumber"}.
     """
-    data = read_json(input_file)
-    if not data:
-        return
+    os.makedirs(output_dir, exist_ok=True)
+    state = TransformState(output_dir, force=full)
+    index = lru_cache(maxsize=None)(partial(load_site_index, input_dir))
+    print("Transforming User JSON to CSV...")
+    users = transform_users(
+        os.path.join(input_dir, "User.json"), os.path.join(output_dir, "User.csv"), site_code, index, state
+    )
+    print("Transforming Phone JSON to CSV...")
+    phones = transform_phones(
+        os.path.join(input_dir, "Phone.json"), os.path.join(output_dir, "Phone.csv"), index, state
+    )
+    print("Transforming DirectoryNumber JSON to CSV...")
+    numbers = transform_directory_numbers(
+        os.path.join(input_dir, "Line.json"), os.path.join(output_dir, "DirectoryNumber.csv"), index, state
+    )
+    # Only if the index was built, i.e. some records were extracted
+    if index.cache_info().currsize:
+        report_missing_lines(index())
+    state.save()
+    return {"User": users, "Phone": phones, "DirectoryNumber": numbers}
+
+def discover_sites(export_dir=EXPORT_DIR):
+    """
+    Lists the site directories of an export directory.
+
+    Args:
+        export_dir (str): Directory holding one <siteCode>/ directory per site.
 
-    # Extract specific fields
-    transformed_data = [{"Number": dn.get("pattern", "")} for dn in data]
+    Returns:
+        list: Site codes with at least one exported JSON file, sorted by name.
+    """
+    return sorted(
+        name for name in os.listdir(export_dir)
+        if any(os.path.isfile(os.path.join(export_dir, name, f"{dtype}.json")) for dtype in ["Phone", "User", "Line"])
+    )
 
-    # Define CSV headers
-    headers = ["Number"]
+def transform_site(site_code, output_dir=OUTPUT_DIR, full=False):
+    """
+    Transforms ConfigExports/<site_code>/ into <output_dir>/<site_code>/*.csv.
 
-    # Write to CSV
-    write_csv(output_file, transformed_data, headers)
+    Args:
+        site_code (str): Site to transform.
+        output_dir (str): Directory the site's CSV directory is created in.
+        full (bool): Rewrite every CSV, even if its inputs are unchanged.
+
+    Returns:
+        dict: {"siteCode", "seconds", "rows": {"User", "Phone", "DirectoryNumber"}}
+    """
+    start = time.perf_counter()
+    site_dir = os.path.join(output_dir, site_code)
+    rows = transform_directory(os.path.join(EXPORT_DIR, site_code), site_dir, site_code, full)
+    return {"siteCode": site_code, "seconds": round(time.perf_counter() - start, 2), "rows": rows}
+
+def merge_sites(site_codes, output_dir=OUTPUT_DIR):
+    """
+    Concatenates the per-site CSVs, and their changed-rows CSVs, into one CSV
+    set, sites in the given order.
+
+    Args:
+        site_codes (list): Sites to merge.
+        output_dir (str): Directory holding the <siteCode>/ CSV directories.
+    """
+    headers = {"User": USER_HEADERS, "Phone": PHONE_HEADERS, "DirectoryNumber": DIRECTORY_NUMBER_HEADERS}
+    names = [(file_name, header) for name, header in headers.items() for file_name in [name, f"{name}.changed"]]
+    for name, header in names:
+        output_file = os.path.join(output_dir, f"{name}.csv")
+        try:
+            with open(output_file, "w", newline="", encoding="utf-8") as file:
+                writer = csv.writer(file)
+                writer.writerow(header)
+                for site_code in site_codes:
+                    site_file = os.path.join(output_dir, site_code, f"{name}.csv")
+                    if not os.path.exists(site_file):
+                        continue
+                    with open(site_file, "r", newline="", encoding="utf-8") as site:
+                        reader = csv.reader(site)
+                        next(reader, None)
+                        writer.writerows(reader)
+            print(f"CSV file created: {output_file}")
+        except Exception as e:
+            print(f"Error writing CSV file {output_file}: {e}")
+
+def transform_all_sites(workers=None, merge=False, full=False):
+    """
+    Transforms every site under ConfigExports/, one process per site.
+
+    Args:
+        workers (int): Processes used, defaults to the number of CPUs.
+        merge (bool): Also write merged CSVs of all sites to OUTPUT_DIR.
+        full (bool): Rewrite every CSV, even if its inputs are unchanged.
+
+    Returns:
+        list: Reports returned by transform_site, in site name order.
+    """
+    site_codes = discover_sites()
+    if not site_codes:
+        print(f"No site directories found in {EXPORT_DIR}")
+        return []
+    workers = min(workers or os.cpu_count() or 1, len(site_codes))
+    transform = partial(transform_site, full=full)
+    if workers == 1:
+        reports = [transform(site_code) for site_code in site_codes]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            reports = list(pool.map(transform, site_codes))
+    if merge:
+        merge_sites(site_codes)
+    return reports
+
+def print_report(reports, seconds):
+    """
+    Prints the per-site row counts and times.
+
+    Args:
+        reports (list): Reports returned by transform_site.
+        seconds (float): Wall time of the whole run.
+    """
+    print(f"\n{'Site':<16} {'Time (s)':>9} {'Users':>8} {'Phones':>8} {'Numbers':>8}")
+    for report in reports:
+        rows = report["rows"]
+        print(
+            f"{report['siteCode']:<16} {report['seconds']:>9.2f} "
+            f"{rows['User']:>8} {rows['Phone']:>8} {rows['DirectoryNumber']:>8}"
+        )
+    busy = sum(report["seconds"] for report in reports)
+    print(f"Wall time: {seconds:.2f} s (sum of site times: {busy:.2f} s)")
 
 def main():
     """
     Main function to execute the transformation process.
     """
-    try:
-        # File paths
-        phone_json = os.path.join(INPUT_DIR, "phone.json")
-        user_json = os.path.join(INPUT_DIR, "user.json")
-        directory_number_json = os.path.join(INPUT_DIR, "line.json")
+    parser = argparse.ArgumentParser(description="Transform ConfigExports JSON into Webex import CSVs")
+    parser.add_argument("--all-sites", action="store_true", help="Transform every site directory under ConfigExports/")
+    parser.add_argument("--merge", action="store_true", help="With --all-sites, also write one merged CSV set")
+    parser.add_argument("--workers", type=int, default=None, help="Processes used by --all-sites (default: CPU count)")
+    parser.add_argument("--full", action="store_true", help="Rewrite every CSV, even if its inputs are unchanged")
+    args = parser.parse_args()
 
-        phone_csv = os.path.join(OUTPUT_DIR, "Phone.csv")
-        user_csv = os.path.join(OUTPUT_DIR, "User.csv")
-        directory_number_csv = os.path.join(OUTPUT_DIR, "DirectoryNumber.csv")
+    try:
+        if args.all_sites:
+            start = time.perf_counter()
+            reports = transform_all_sites(args.workers, args.merge, args.full)
+            print_report(reports, time.perf_counter() - start)
+            print("\nTransformation completed successfully!")
+            return
 
         # Transform JSON to CSV
-        print("Transforming User JSON to CSV...")
-        transform_users(user_json, user_csv)
-
-        print("Transforming Phone JSON to CSV...")
-        transform_phones(phone_json, phone_csv)
-
-        print("Transforming DirectoryNumber JSON to CSV...")
-        transform_directory_numbers(directory_number_json, directory_number_csv)
+        transform_directory(INPUT_DIR, OUTPUT_DIR, full=args.full)
 
         print("\nTransformation completed successfully!")
 
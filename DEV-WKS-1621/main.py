@@ -1,46 +1,303 @@
-import subprocess
+# -*- coding: utf-8 -*-
+"""
+@description: Runs the CUCM to Webex migration pipeline in one run. The stages
+              (collection, transformation, user import, device import) are imported
+              instead of chained as subprocesses. Clusters are collected in
+              parallel processes (getConfigs.collect_clusters), each writing its
+              exports as the records arrive, and the transform reads them back one
+              record at a time; the import rows are handed over in memory. The
+              ConfigExports JSON, OutputCSV files and import summaries are kept as
+              checkpoints unless --no-checkpoints is given, in which case the
+              exports go to a temporary directory. A stage left out of --stages
+              is replaced by reading its checkpoint. With --stream the stages run
+              concurrently over bounded queues (see streaming.py).
 
-def run_script(script_path):
+@usage: python main.py [--stages collect transform import_users import_devices] [--no-checkpoints]
+        python main.py --stream [--no-checkpoints]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+import traceback
+
+ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.join(ROOT_DIR, "data_collection"))
+
+STAGES = ["collect", "transform", "import_users", "import_devices"]
+DATA_TYPES = ["Phone", "User", "Line"]
+
+
+def run_stage(name, func, *args):
+    """
+    Runs one pipeline stage and records its wall time, item count and failures.
+
+    Args:
+        name (str): Stage name used in the report.
+        func (callable): Stage function returning (result, items, failures).
+        *args: Arguments passed to func.
+
+    Returns:
+        tuple: (stage result or None if the stage raised, stage report dict)
+    """
+    print(f"\n=== {name} ===")
+    report = {"stage": name, "status": "failed", "seconds": 0.0, "items": 0, "failures": 0}
+    start = time.perf_counter()
+    result = None
+    try:
+        result, items, failures = func(*args)
+        report.update(status="ok", items=items, failures=failures)
+    except Exception as e:
+        print(f"Error occurred in stage {name}: {e}")
+        traceback.print_exc()
+        report["error"] = str(e)
+    report["seconds"] = round(time.perf_counter() - start, 2)
+    return result, report
+
+
+def collect(clusters, export_dir):
+    """
+    Collects Phones, Users and Lines from every cluster, each cluster in its
+    own process (see getConfigs.collect_clusters).
+
+    Args:
+        clusters (list): Cluster definitions from load_clusters().
+        export_dir (str): Directory the <siteCode>/*.json exports are written to.
+
+    Returns:
+        tuple: ({siteCode: export directory}, items, failures)
+    """
+    import getConfigs
+
+    exports = {}
+    items = failures = 0
+    for report in getConfigs.collect_clusters(clusters, export_dir):
+        if report["status"] != "ok":
+            print(f"Collection failed for {report['siteCode']}: {report.get('error')}")
+            failures += 1
+            continue
+        exports[report["siteCode"]] = report["directory"]
+        items += sum(report["counts"].values())
+    if not exports:
+        raise RuntimeError("No cluster was collected")
+    return exports, items, failures
+
+
+def load_exports(clusters):
+    """
+    Locates the ConfigExports checkpoint of every cluster.
+
+    Args:
+        clusters (list): Cluster definitions from load_clusters().
+
+    Returns:
+        tuple: ({siteCode: export directory}, sites found, failures)
     """
-    Runs a Python script located at the given path.
+    import getConfigs
+
+    exports = {}
+    for cluster in clusters:
+        directory = os.path.join(getConfigs.EXPORT_DIR, cluster["siteCode"])
+        if any(os.path.exists(os.path.join(directory, f"{dtype}.json")) for dtype in DATA_TYPES):
+            exports[cluster["siteCode"]] = directory
+    return exports, len(exports), len(clusters) - len(exports)
+
+
+def transform(exports, checkpoint):
+    """
+    Turns the collected records of all clusters into Webex import rows. The
+    exports are read one record at a time, keeping only the keys the fields use.
 
     Args:
-        script_path (str): The file path to the Python script to be executed.
+        exports (dict): {siteCode: directory holding Phone.json, User.json and Line.json}.
+        checkpoint (bool): Write OutputCSV/*.csv.
+
+    Returns:
+        tuple: ({"User": [...], "Phone": [...], "DirectoryNumber": [...]}, items, failures)
+    """
+    from data_transformation import transformation
+
+    def records(directory, dtype, spec):
+        return transformation.iter_records(os.path.join(directory, f"{dtype}.json"), spec.keys)
+
+    rows = {"User": [], "Phone": [], "DirectoryNumber": []}
+    for siteCode, directory in exports.items():
+        # One index per site, shared by the three transforms
+        index = transformation.load_site_index(directory)
+        rows["User"].extend(transformation.user_rows(records(directory, "User", transformation.USER_SPEC), siteCode, index))
+        rows["Phone"].extend(transformation.phone_rows(records(directory, "Phone", transformation.PHONE_SPEC), index))
+        rows["DirectoryNumber"].extend(transformation.directory_number_rows(
+            records(directory, "Line", transformation.DIRECTORY_NUMBER_SPEC), index
+        ))
+        transformation.report_missing_lines(index)
+
+    if checkpoint:
+        headers = {
+            "User": transformation.USER_HEADERS,
+            "Phone": transformation.PHONE_HEADERS,
+            "DirectoryNumber": transformation.DIRECTORY_NUMBER_HEADERS,
+        }
+        for name, data in rows.items():
+            output_file = os.path.join(transformation.OUTPUT_DIR, f"{name}.csv")
+            transformation.write_csv(output_file, data, headers[name])
+    return rows, sum(len(data) for data in rows.values()), 0
+
+
+def load_rows():
+    """
+    Reads the OutputCSV checkpoint.
+
+    Returns:
+        tuple: ({"User": [...], "Phone": [...], "DirectoryNumber": [...]}, items, failures)
+    """
+    from data_transformation.transformation import OUTPUT_DIR
+    from data_import.webex_user_import import read_csv
+
+    rows = {
+        name: read_csv(os.path.join(OUTPUT_DIR, f"{name}.csv"))
+        for name in ["User", "Phone", "DirectoryNumber"]
+    }
+    return rows, sum(len(data) for data in rows.values()), 0
 
-    Prints:
-        A message indicating the script is being run.
-        A success message if the script runs successfully.
-        An error message if there is an issue running the script.
 
-    Raises:
-        subprocess.CalledProcessError: If the script execution fails.
+def import_users(rows, checkpoint):
     """
-    print(f"Running script: {script_path}")
+    Imports the User rows to Webex.
+
+    Returns:
+        tuple: (import summary, items, failures)
+    """
+    from data_import import webex_user_import
+
+    # The checkpoint rows come from OutputCSV, whose transform state tracks what was imported
+    csv_file = webex_user_import.USER_CSV_FILE if checkpoint else None
+    summary = webex_user_import.import_users_to_webex(rows["User"], csv_file=csv_file)
+    if checkpoint:
+        webex_user_import.write_summary_to_file(summary, webex_user_import.OUTPUT_SUMMARY_FILE)
+    return summary, summary["total_users"], summary["failure_count"]
+
+
+def import_devices(rows, checkpoint):
+    """
+    Imports the Phone rows to Webex as devices.
+
+    Returns:
+        tuple: (import summary, items, failures)
+    """
+    from data_import import webex_device_import
+
+    csv_file = webex_device_import.DEVICE_CSV_FILE if checkpoint else None
+    summary = webex_device_import.import_devices_to_webex(rows["Phone"], csv_file=csv_file)
+    if checkpoint:
+        webex_device_import.write_summary_to_file(summary, webex_device_import.OUTPUT_SUMMARY_FILE)
+    return summary, summary["total_devices"], summary["failure_count"]
+
+
+def print_summary(reports, total=None):
+    """
+    Prints the per-stage report.
+
+    Args:
+        reports (list): Stage reports returned by run_stage.
+        total (float): Wall time of the run, defaults to the sum of the stage times.
+    """
+    print("\nSummary:")
+    print(f"{'Stage':<16} {'Status':<8} {'Time (s)':>9} {'Items':>8} {'Failures':>9}")
+    for report in reports:
+        print(
+            f"{report['stage']:<16} {report['status']:<8} {report['seconds']:>9.2f} "
+            f"{report['items']:>8} {report['failures']:>9}"
+        )
+    if total is None:
+        total = sum(report["seconds"] for report in reports)
+    print(f"Total time: {total:.2f} s")
+
+
+def run_stream(clusters, checkpoint):
+    """
+    Runs the streaming pipeline and prints its report.
+
+    In the report, the time of each stage is when it finished, measured from the start of the run.
+
+    Args:
+        clusters (list): Cluster definitions from load_clusters().
+        checkpoint (bool): Write the intermediate files once the stream has drained.
+
+    Returns:
+        int: Process exit code, 1 if the stream failed or reported failed items.
+    """
+    import streaming
+
+    start = time.perf_counter()
     try:
-        subprocess.run(['python', script_path], check=True)
-        print(f"Successfully ran {script_path}")
-    except subprocess.CalledProcessError as e:
-        print(f"Error occurred while running {script_path}: {e}")
+        reports, _ = streaming.stream(clusters, checkpoint)
+    except Exception as e:
+        print(f"Error occurred in the streaming pipeline: {e}")
+        traceback.print_exc()
+        return 1
+
+    print_summary(reports, time.perf_counter() - start)
+    devices = next(report for report in reports if report["stage"] == "import devices")
+    if devices["items"]:
+        print(f"Time to first imported device: {devices['first_item_seconds']:.2f} s")
+    return 1 if any(report["failures"] for report in reports) else 0
+
+
+def main():
+    """
+    Runs the selected pipeline stages in order.
+
+    Returns:
+        int: Process exit code, 1 if a stage failed or reported failed items.
+    """
+    parser = argparse.ArgumentParser(description="CUCM to Webex migration pipeline")
+    parser.add_argument("--stages", nargs="+", choices=STAGES, default=STAGES, help="Stages to run")
+    parser.add_argument("--no-checkpoints", action="store_true", help="Do not write intermediate files")
+    parser.add_argument("--stream", action="store_true", help="Run all stages concurrently as one stream")
+    args = parser.parse_args()
+    checkpoint = not args.no_checkpoints
+
+    from adapter.appcore import load_clusters
+
+    if args.stream:
+        return run_stream(load_clusters(), checkpoint)
+
+    reports = []
+
+    def stage(name, func, *stage_args):
+        result, report = run_stage(name, func, *stage_args)
+        reports.append(report)
+        return result
+
+    clusters = load_clusters()
+    exports = rows = None
+    # Without checkpoints the exports only live until the transform has read them
+    with tempfile.TemporaryDirectory() as scratch_dir:
+        if "collect" in args.stages:
+            import getConfigs
+            export_dir = getConfigs.EXPORT_DIR if checkpoint else scratch_dir
+            exports = stage("collect", collect, clusters, export_dir)
+        elif "transform" in args.stages:
+            exports = stage("load exports", load_exports, clusters)
+
+        if "transform" in args.stages:
+            if exports is not None:
+                rows = stage("transform", transform, exports, checkpoint)
+        elif {"import_users", "import_devices"} & set(args.stages):
+            rows = stage("load csv", load_rows)
+
+    if rows is not None:
+        if "import_users" in args.stages:
+            stage("import_users", import_users, rows, checkpoint)
+        if "import_devices" in args.stages:
+            stage("import_devices", import_devices, rows, checkpoint)
+
+    print_summary(reports)
+    failed = any(report["status"] != "ok" or report["failures"] for report in reports)
+    return 1 if failed else 0
+
 
 if __name__ == "__main__":
-    scripts = [
-        'data_collection/get_configs.py',
-        'data_transformation/transformation.py',
-        'data_import/webex_user_import.py',
-        'webex_device_import.py'
-    ]
-
-    success_count = 0
-    failure_count = 0
-
-    for script in scripts:
-        try:
-            run_script(script)
-            success_count += 1
-        except Exception:
-            failure_count += 1
-
-    print(f"\nSummary:")
-    print(f"Total scripts: {len(scripts)}")
-    print(f"Successfully ran: {success_count}")
-    print(f"Failed to run: {failure_count}")
\ No newline at end of file
+    sys.exit(main())
@@ -0,0 +1,213 @@
+# -*- coding: utf-8 -*-
+"""
+@description: Streaming mode of the migration pipeline. Phones flow from the AXL
+              fetch through cleanObject and the transformation mapping into the
+              Webex device push over bounded in-memory queues, one thread per stage:
+
+                fetch phones -> clean + transform -> import devices
+                                     |
+                                     +-> fetch users -> import users
+
+              The owner of a phone is pushed to Webex before the phone itself,
+              so the device import can resolve the personId. Users are fetched
+              with up to `workers` concurrent getUser calls and pushed one by one
+              (no SCIM bulk batches), so an owner is never held back waiting for
+              a batch to fill. Lines are not needed by the Webex import; they
+              are only fetched for the checkpoint, once the stream has drained,
+              so ConfigExports holds complete Phone, User and Line exports and
+              OutputCSV is written by the regular transformation.
+
+@usage: python main.py --stream [--no-checkpoints]
+"""
+
+import os
+import queue
+import threading
+import time
+from collections import defaultdict
+
+from adapter.appcore import cleanObject, get_ucm_source, write_results
+from adapter.concurrency import iter_fan_out, prefetch
+from getConfigs import CONFIG_LIST, create_directory, iter_phones, pull_lines
+
+QUEUE_DEPTH = 100
+
+
+class StageStats(object):
+    """
+    Item count and first/last item times of one streaming stage.
+    """
+
+    def __init__(self, name, start):
+        self.name = name
+        self.start = start
+        self.items = 0
+        self.failures = 0
+        self.first = None
+        self.last = None
+
+    def tick(self, failed=False):
+        now = time.perf_counter() - self.start
+        self.items += 1
+        self.failures += int(failed)
+        if self.first is None:
+            self.first = now
+        self.last = now
+
+    def report(self):
+        return {
+            "stage": self.name,
+            "status": "ok",
+            "seconds": round(self.last or 0.0, 2),
+            "first_item_seconds": round(self.first or 0.0, 2),
+            "items": self.items,
+            "failures": self.failures,
+        }
+
+
+def stream(clusters, checkpoint=True, depth=QUEUE_DEPTH):
+    """
+    Runs collection, transformation and Webex import of all clusters as one stream.
+
+    Args:
+        clusters (list): Cluster definitions from load_clusters().
+        checkpoint (bool): Once the stream has drained, fetch the lines of the
+            streamed phones, write ConfigExports, transform them into OutputCSV
+            and write the import summaries.
+        depth (int): Capacity of every inter-stage queue.
+
+    Returns:
+        tuple: (stage reports as returned by StageStats.report, {"users": summary, "devices": summary})
+    """
+    from data_transformation import transformation
+    from data_import import webex_user_import, webex_device_import
+
+    start = time.perf_counter()
+    stats = {
+        name: StageStats(name, start)
+        for name in ["fetch phones", "transform", "fetch users", "import users", "import devices"]
+    }
+    user_queue = queue.Queue(maxsize=depth)
+    pushed = {}
+    collected = defaultdict(lambda: {"Phone": [], "User": []})
+    summaries = {}
+    users_drained = threading.Event()
+
+    def fetched_phones():
+        for cluster in clusters:
+            ucm_source = get_ucm_source(cluster)
+            phones = iter_phones(
+                ucm_source,
+                CONFIG_LIST,
+                workers=cluster.get("workers", 1),
+                page_size=cluster.get("pageSize", 1000),
+            )
+            for phone in phones:
+                stats["fetch phones"].tick()
+                yield cluster, phone
+
+    def device_rows():
+        # Owners are queued for the user branch before their phone row is
+        # released, so the user push always starts first.
+        try:
+            for cluster, phone in prefetch(fetched_phones(), depth):
+                siteCode = cluster["siteCode"]
+                phone = cleanObject(phone)
+                row = transformation.phone_rows([phone])[0]
+                if checkpoint:
+                    collected[siteCode]["Phone"].append(phone)
+                owner = (siteCode, phone.get("ownerUserName"))
+                if owner[1] and owner not in pushed:
+                    pushed[owner] = threading.Event()
+                    user_queue.put((cluster, owner[1]))
+                stats["transform"].tick()
+                yield owner, row
+        finally:
+            user_queue.put(None)
+
+    def queued_owners():
+        while True:
+            item = user_queue.get()
+            if item is None:
+                users_drained.set()
+                return
+            yield item
+
+    def fetch_user(item):
+        cluster, userid = item
+        return cleanObject(get_ucm_source(cluster).client.getUser(userid=userid)["return"]["user"])
+
+    def user_rows():
+        workers = max(cluster.get("workers", 1) for cluster in clusters)
+        for (cluster, userid), user, error in iter_fan_out(fetch_user, queued_owners(), workers=workers, ordered=False):
+            siteCode = cluster["siteCode"]
+            if error:
+                print(f"Error pulling user {userid}: {str(error)}")
+                stats["fetch users"].tick(failed=True)
+                pushed[(siteCode, userid)].set()
+                continue
+            stats["fetch users"].tick()
+            if checkpoint:
+                collected[siteCode]["User"].append(user)
+            yield transformation.user_rows([user], siteCode)[0]
+
+    def user_pushed(row, response):
+        stats["import users"].tick(failed="id" not in response)
+        pushed[(row["Location"], row["User ID/Email (Required)"])].set()
+
+    def device_pushed(row, response):
+        stats["import devices"].tick(failed="id" not in response)
+
+    def import_users():
+        try:
+            summaries["users"] = webex_user_import.import_users_to_webex(
+                user_rows(), user_pushed, bulk=False
+            )
+        finally:
+            for event in list(pushed.values()):
+                event.set()
+            # Keep the transform stage from blocking on a full queue if the
+            # user branch stopped early.
+            while not users_drained.is_set() and user_queue.get() is not None:
+                pass
+
+    def device_feed():
+        for owner, row in prefetch(device_rows(), depth):
+            event = pushed.get(owner)
+            while event is not None and not event.wait(1.0) and user_thread.is_alive():
+                pass
+            yield row
+
+    user_thread = threading.Thread(target=import_users, daemon=True)
+    user_thread.start()
+    summaries["devices"] = webex_device_import.import_devices_to_webex(device_feed(), device_pushed)
+    user_thread.join()
+    if "users" not in summaries:
+        raise RuntimeError("User import stream stopped early")
+
+    if checkpoint:
+        sites = {}
+        for cluster in clusters:
+            sites.setdefault(cluster["siteCode"], cluster)
+        for siteCode, cluster in sites.items():
+            data = collected[siteCode]
+            lines = pull_lines(get_ucm_source(cluster), data["Phone"], workers=cluster.get("workers", 1))
+            data["Line"] = [cleanObject(line) for line in lines]
+            directory = f"ConfigExports/{siteCode}"
+            create_directory(directory)
+            for dtype, records in data.items():
+                write_results(directory, records, dtype, atomic=True, cleaned=True)
+        # Same CSVs, transform state and changed-rows files as a batch run
+        site_codes = list(sites)
+        if len(site_codes) == 1:
+            transformation.transform_directory(
+                os.path.join(transformation.EXPORT_DIR, site_codes[0]), transformation.OUTPUT_DIR, site_codes[0]
+            )
+        else:
+            for siteCode in site_codes:
+                transformation.transform_site(siteCode)
+            transformation.merge_sites(site_codes)
+        webex_user_import.write_summary_to_file(summaries["users"], webex_user_import.OUTPUT_SUMMARY_FILE)
+        webex_device_import.write_summary_to_file(summaries["devices"], webex_device_import.OUTPUT_SUMMARY_FILE)
+
+    return [stage.report() for stage in stats.values()], summaries
@@ -0,0 +1,21 @@
+# -*- coding: utf-8 -*-
+"""
+@description: Puts the tool directories on sys.path the way each script does
+              for itself, so tests import the modules by the same names.
+
+@usage: python -m pytest -q tests
+"""
+
+import os
+import sys
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+for path in [
+    ROOT_DIR,
+    os.path.join(ROOT_DIR, "data_collection"),
+    os.path.join(ROOT_DIR, "data_import"),
+    os.path.join(ROOT_DIR, "data_transformation"),
+]:
+    if path not in sys.path:
+        sys.path.append(path)
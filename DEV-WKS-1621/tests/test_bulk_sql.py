@@ -0,0 +1,132 @@
+# -*- coding: utf-8 -*-
+"""
+@description: Tests of the SQL collection mode of adapter/bulk_sql.py: paging, and
+              completion of the records with the fields SQL does not cover.
+"""
+
+import xml.etree.ElementTree as ET
+
+import pytest
+
+from adapter import bulk_sql
+from conftest import ROOT_DIR
+
+
+def sql_row(**columns):
+    row = ET.Element("row")
+    for tag, text in columns.items():
+        ET.SubElement(row, tag).text = text
+    return row
+
+
+class FakeClient(object):
+    """
+    Answers getPhone/getLine/getUser with every requested tag set to "<tag> of <key>".
+    """
+
+    def __init__(self):
+        self.requests = []
+
+    def answer(self, dtype, key, returnedTags):
+        self.requests.append((dtype, key, sorted(returnedTags)))
+        return {"return": {dtype: {tag: f"{tag} of {key}" for tag in returnedTags}}}
+
+    def getPhone(self, name, returnedTags):
+        return self.answer("phone", name, returnedTags)
+
+    def getLine(self, pattern, routePartitionName, returnedTags):
+        return self.answer("line", (pattern, routePartitionName), returnedTags)
+
+    def getUser(self, userid, returnedTags):
+        return self.answer("user", userid, returnedTags)
+
+
+class FakeSource(object):
+
+    def __init__(self, pages=None):
+        self.client = FakeClient()
+        self.pages = pages or []
+        self.queries = []
+
+    def sql_query(self, query):
+        self.queries.append(query)
+        return {"row": self.pages.pop(0) if self.pages else []}
+
+
+def test_sql_rows_pages_until_a_short_page():
+    source = FakeSource([[sql_row(c0="a"), sql_row(c0="b")], [sql_row(c0="c")]])
+
+    assert bulk_sql.sql_rows(source, "d.name AS c0 FROM device d", page_size=2) == [{"c0": "a"}, {"c0": "b"}, {"c0": "c"}]
+    assert source.queries == [
+        "SELECT SKIP 0 FIRST 2 d.name AS c0 FROM device d",
+        "SELECT SKIP 2 FIRST 2 d.name AS c0 FROM device d",
+    ]
+
+
+def test_sql_rows_reports_a_failed_query():
+    class FailingSource(object):
+        def sql_query(self, query):
+            return "Fault: syntax error"
+
+    assert bulk_sql.sql_rows(FailingSource(), "x") is None
+
+
+@pytest.fixture
+def sql_records(monkeypatch):
+    records = {
+        "Phone": [{"name": "SEP001"}, {"name": "SEP002"}],
+        "Line": [{"pattern": "1000", "routePartitionName": "PT"}, {"pattern": "1001", "routePartitionName": None}],
+        "User": [{"userid": "alice"}],
+    }
+    monkeypatch.setattr(bulk_sql, "query_phones", lambda *args: records["Phone"])
+    monkeypatch.setattr(bulk_sql, "query_lines", lambda *args: records["Line"])
+    monkeypatch.setattr(bulk_sql, "query_users", lambda *args: records["User"])
+    return records
+
+
+def test_default_fields_send_no_per_record_request(sql_records):
+    source = FakeSource()
+
+    assert bulk_sql.pull_sql(source, {"Phone": [{"name": "%"}]}) == sql_records
+    assert source.client.requests == []
+
+
+def test_fields_not_covered_by_sql_are_fetched_for_every_type(sql_records):
+    source = FakeSource()
+    fields = {
+        "Phone": ["name", "model", "mlppIndicationStatus"],
+        "Line": ["pattern", "callForwardAll"],
+        "User": ["userid", "manager", "title"],
+    }
+
+    results = bulk_sql.pull_sql(source, {"Phone": [{"name": "%"}]}, fields=fields, workers=2)
+    assert sorted(source.client.requests) == [
+        ("line", ("1000", "PT"), ["callForwardAll"]),
+        ("line", ("1001", None), ["callForwardAll"]),
+        ("phone", "SEP001", ["mlppIndicationStatus"]),
+        ("phone", "SEP002", ["mlppIndicationStatus"]),
+        ("user", "alice", ["manager", "title"]),
+    ]
+    assert results["Phone"][1] == {"name": "SEP002", "mlppIndicationStatus": "mlppIndicationStatus of SEP002"}
+    assert results["Line"][0]["callForwardAll"] == "callForwardAll of ('1000', 'PT')"
+    assert results["User"][0] == {"userid": "alice", "manager": "manager of alice", "title": "title of alice"}
+
+
+def test_unsupported_search_criteria_fall_back_to_get_phone(sql_records):
+    assert bulk_sql.pull_sql(FakeSource(), {"Phone": [{"protocol": "SIP"}]}) is None
+
+
+def test_transform_fields_are_covered_by_sql_and_cover_the_transformation(monkeypatch):
+    # transformation reads ./data_collection/adapter/source.json when it is imported
+    monkeypatch.chdir(ROOT_DIR)
+    from data_transformation import transformation
+    from site_index import INDEX_KEYS
+
+    read = {
+        "Phone": set(transformation.PHONE_SPEC.keys) - {"type", "deviceType"},
+        "Line": set(transformation.DIRECTORY_NUMBER_SPEC.keys),
+        "User": set(transformation.USER_SPEC.keys),
+    }
+    for dtype, fields in bulk_sql.TRANSFORM_FIELDS.items():
+        assert read[dtype] | set(INDEX_KEYS[dtype]) <= set(fields)
+        assert set(fields) <= bulk_sql.SQL_FIELDS[dtype]
@@ -0,0 +1,111 @@
+# -*- coding: utf-8 -*-
+"""
+@description: Tests of the AXL collection of one cluster in getConfigs.py, against
+              a fake CUCM source.
+"""
+
+import json
+import os
+
+import getConfigs
+from adapter import appcore
+
+
+class FakeClient(object):
+
+    def __init__(self, phones):
+        self.phones = phones
+
+    def listPhone(self, criteria, returnedTags, first, skip):
+        return {"return": {"phone": [{"name": name} for name in sorted(self.phones)[skip:skip + first]]}}
+
+    def getPhone(self, name):
+        return {"return": {"phone": self.phones[name]}}
+
+    def getUser(self, userid):
+        return {"return": {"user": {"userid": userid, "firstName": userid.title()}}}
+
+    def getLine(self, pattern, routePartitionName):
+        return {"return": {"line": {"pattern": pattern, "routePartitionName": routePartitionName}}}
+
+
+class FakeSource(object):
+
+    def __init__(self, phones):
+        self.client = FakeClient(phones)
+
+    def check_cucm(self):
+        return True
+
+    def throttle_stats(self):
+        return {}
+
+    def transport_stats(self):
+        return {}
+
+
+def phone(name, owner, *patterns):
+    return {
+        "name": name,
+        "uuid": "{0}",
+        "ownerUserName": {"_value_1": owner, "uuid": "{1}"} if owner else None,
+        "lines": {"line": [
+            {"index": index, "dirn": {"pattern": pattern, "routePartitionName": "PT", "uuid": "{2}"}}
+            for index, pattern in enumerate(patterns, start=1)
+        ]},
+    }
+
+
+def read(path):
+    with open(path, "r") as file:
+        return json.load(file)
+
+
+def test_collect_data_writes_cleaned_exports_and_returns_their_paths(tmp_path, monkeypatch):
+    phones = {
+        "SEP000000000001": phone("SEP000000000001", "alice", "1000", "1001"),
+        "SEP000000000002": phone("SEP000000000002", "bob", "1001"),
+        "SEP000000000003": phone("SEP000000000003", None, "1002"),
+    }
+    monkeypatch.setattr(getConfigs, "get_ucm_source", lambda cluster: FakeSource(phones))
+    cleaned = []
+    clean_object = appcore.cleanObject
+
+    def spy(data):
+        cleaned.append(data)
+        return clean_object(data)
+
+    monkeypatch.setattr(getConfigs, "cleanObject", spy)
+    monkeypatch.setattr(appcore, "cleanObject", spy)
+
+    paths, report = getConfigs.collect_data(
+        {"siteCode": "Site1", "sourceCUCM": "cucm", "workers": 2, "pageSize": 2}, str(tmp_path)
+    )
+    directory = os.path.join(str(tmp_path), "Site1")
+    assert report["status"] == "ok" and report["directory"] == directory
+    assert report["counts"] == {"Phone": 3, "User": 2, "Line": 3}
+    assert paths == {dtype: os.path.join(directory, f"{dtype}.json") for dtype in ["Phone", "User", "Line"]}
+
+    exported = read(paths["Phone"])
+    assert exported[0] == {
+        "name": "SEP000000000001",
+        "ownerUserName": "alice",
+        "lines": {"line": [
+            {"index": 1, "dirn": {"pattern": "1000", "routePartitionName": "PT"}},
+            {"index": 2, "dirn": {"pattern": "1001", "routePartitionName": "PT"}},
+        ]},
+    }
+    # Each phone is cleaned once, by the stream, and written without cleaning it again
+    assert sorted(data["name"] for data in cleaned if "lines" in data) == sorted(phones)
+    assert sorted(user["userid"] for user in read(paths["User"])) == ["alice", "bob"]
+    assert sorted(line["pattern"] for line in read(paths["Line"])) == ["1000", "1001", "1002"]
+
+
+def test_collect_data_reports_a_failed_connectivity_check(tmp_path, monkeypatch):
+    source = FakeSource({})
+    source.check_cucm = lambda: False
+    monkeypatch.setattr(getConfigs, "get_ucm_source", lambda cluster: source)
+
+    paths, report = getConfigs.collect_data({"siteCode": "Site1", "sourceCUCM": "cucm"}, str(tmp_path))
+    assert paths == {}
+    assert report["status"] == "failed" and "connectivity" in report["error"]
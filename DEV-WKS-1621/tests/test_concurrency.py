@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+"""
+@description: Tests of the bounded thread pool helpers in adapter/concurrency.py.
+"""
+
+import threading
+import time
+
+import pytest
+
+from adapter.concurrency import fan_out, iter_fan_out, prefetch
+
+
+def test_fan_out_keeps_input_order_and_captures_errors():
+    def func(item):
+        if item == 3:
+            raise ValueError("bad item")
+        time.sleep(0.001 * (10 - item))
+        return item * 2
+
+    outcomes = fan_out(func, list(range(10)), workers=4)
+
+    assert [outcome.item for outcome in outcomes] == list(range(10))
+    assert outcomes[2].result == 4 and outcomes[2].error is None
+    assert outcomes[3].result is None and isinstance(outcomes[3].error, ValueError)
+
+
+def test_fan_out_sequential_runs_in_the_calling_thread():
+    threads = fan_out(lambda item: threading.get_ident(), [1, 2, 3], workers=1)
+
+    assert {outcome.result for outcome in threads} == {threading.get_ident()}
+
+
+def test_iter_fan_out_bounds_calls_in_flight():
+    lock = threading.Lock()
+    state = {"running": 0, "peak": 0}
+
+    def func(item):
+        with lock:
+            state["running"] += 1
+            state["peak"] = max(state["peak"], state["running"])
+        time.sleep(0.005)
+        with lock:
+            state["running"] -= 1
+        return item
+
+    outcomes = list(iter_fan_out(func, range(40), workers=3))
+
+    assert len(outcomes) == 40
+    assert state["peak"] <= 3
+
+
+def test_iter_fan_out_consumes_items_lazily():
+    pulled = []
+
+    def items():
+        for item in range(100):
+            pulled.append(item)
+            yield item
+
+    outcomes = iter_fan_out(lambda item: item, items(), workers=2, max_pending=4)
+    first = next(outcomes)
+
+    assert first.item == 0
+    assert len(pulled) <= 5
+    outcomes.close()
+
+
+def test_iter_fan_out_unordered_yields_every_item():
+    outcomes = iter_fan_out(lambda item: item, range(25), workers=4, ordered=False)
+
+    assert sorted(outcome.result for outcome in outcomes) == list(range(25))
+
+
+def test_iter_fan_out_empty_input():
+    assert list(iter_fan_out(lambda item: item, [], workers=4)) == []
+
+
+def test_prefetch_yields_in_order_and_reads_ahead_by_depth():
+    produced = []
+
+    def pages():
+        for page in range(5):
+            produced.append(page)
+            yield page
+
+    pages_iter = prefetch(pages(), depth=1)
+    assert next(pages_iter) == 0
+    time.sleep(0.05)
+    # One page buffered, one blocked on put: the producer is at most two ahead
+    assert len(produced) <= 3
+    assert list(pages_iter) == [1, 2, 3, 4]
+
+
+def test_prefetch_reraises_source_errors_in_the_consumer():
+    def pages():
+        yield 1
+        raise RuntimeError("page 2 failed")
+
+    pages_iter = prefetch(pages())
+
+    assert next(pages_iter) == 1
+    with pytest.raises(RuntimeError, match="page 2 failed"):
+        next(pages_iter)
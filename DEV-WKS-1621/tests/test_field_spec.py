@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+"""
+@description: Tests of the declarative field spec compiler in field_spec.py.
+"""
+
+import pytest
+
+from field_spec import CompiledSpec, compile_spec, lookup, source_keys
+
+RECORD = {
+    "name": "SEP0011AABBCCDD",
+    "type": None,
+    "lines": {"line": [{"dirn": {"pattern": "1001"}}, {"dirn": {"pattern": "1002"}}]},
+    "it's": "quoted",
+}
+
+
+def test_lookup_follows_keys_and_list_indexes():
+    assert lookup(RECORD, ("lines", "line", 1, "dirn", "pattern")) == "1002"
+    assert lookup(RECORD, ("lines", "line", 5, "dirn")) == ""
+    assert lookup(RECORD, ("name", "first")) == ""
+    assert lookup(RECORD, ("lines", 0), default=None) is None
+    assert lookup({"lines": None}, ("lines", "line", 0), default="-") == "-"
+
+
+def test_paths_defaults_and_missing_values():
+    spec = CompiledSpec([
+        {"header": "Name", "path": "name"},
+        {"header": "Type", "path": "type", "default": "USER"},
+        {"header": "Model", "path": "model", "default": "unknown"},
+        {"header": "First", "path": "lines.line.0.dirn.pattern"},
+        {"header": "Third", "path": "lines.line.2.dirn.pattern", "default": "none"},
+        {"header": "Quoted", "path": "it's"},
+    ])
+
+    # A present null is returned as is; only missing keys take the default
+    assert spec.row(RECORD) == ("SEP0011AABBCCDD", None, "unknown", "1001", "none", "quoted")
+    assert spec.row({}) == ("", "USER", "unknown", "", "none", "")
+
+
+def test_same_path_with_different_defaults_is_looked_up_separately():
+    spec = CompiledSpec([
+        {"header": "A", "path": "model"},
+        {"header": "B", "path": "model", "default": "X"},
+        {"header": "C", "path": "model"},
+    ])
+
+    assert spec.row({}) == ("", "X", "")
+    assert spec.row({"model": "8861"}) == ("8861", "8861", "8861")
+
+
+def test_derive_context_and_join():
+    calls = []
+
+    def join(index, value):
+        calls.append(index)
+        return index.get(value, "")
+
+    spec = CompiledSpec([
+        {"header": "MAC", "path": "name", "derive": lambda name: name[3:]},
+        {"header": "Whole", "derive": lambda record: len(record)},
+        {"header": "Site", "context": "site_code"},
+        {"header": "Joined", "path": "name", "join": join, "derive": str.lower},
+    ])
+    index = {"SEP0011AABBCCDD": "OWNER"}
+
+    assert spec.row(RECORD, site_code="BGL", index=index) == ("0011AABBCCDD", 4, "BGL", "owner")
+    assert calls == [index]
+    # Without an index, join gets None
+    assert CompiledSpec([{"header": "J", "path": "name", "join": lambda index, value: index}]).row(RECORD) == (None,)
+
+
+def test_missing_context_raises():
+    spec = CompiledSpec([{"header": "Site", "context": "site_code"}])
+
+    with pytest.raises(KeyError):
+        spec.row(RECORD)
+
+
+def test_rows_dicts_headers_and_key_index():
+    spec = CompiledSpec([
+        {"header": "Username", "path": "owner"},
+        {"header": "MAC Address", "path": "name", "key": True},
+    ])
+    records = [{"owner": "a", "name": "SEP1"}, {"name": "SEP2"}]
+
+    assert spec.headers == ["Username", "MAC Address"]
+    assert spec.key_index == 1
+    assert list(spec.rows(iter(records))) == [("a", "SEP1"), ("", "SEP2")]
+    assert spec.dicts(records) == [{"Username": "a", "MAC Address": "SEP1"}, {"Username": "", "MAC Address": "SEP2"}]
+    assert CompiledSpec([{"header": "A", "path": "a"}]).key_index == 0
+
+
+def test_source_keys():
+    assert source_keys([
+        {"header": "A", "path": "lines.line.0.dirn.pattern"},
+        {"header": "B", "path": "name"},
+        {"header": "C", "path": "lines.line.1"},
+        {"header": "D", "context": "site_code"},
+    ]) == ["lines", "name"]
+    # A derive over the whole record needs every key
+    assert source_keys([{"header": "A", "path": "name"}, {"header": "B", "derive": len}]) is None
+
+
+def test_generated_function_has_no_per_field_dispatch():
+    extract = compile_spec([{"header": "A", "path": "a"}, {"header": "B", "path": "b.c", "default": 0}])
+
+    assert extract({"a": 1, "b": {"c": 2}}, {}) == (1, 2)
+    assert extract({}, {}) == ("", 0)
+    assert extract.__code__.co_filename == "<field spec>"
+
+
+def test_empty_spec_returns_empty_rows():
+    assert CompiledSpec([]).row(RECORD) == ()
@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+"""
+@description: Tests of the resumable import journal in import_journal.py.
+"""
+
+import json
+import threading
+
+from import_journal import ImportJournal
+
+
+def lines(path):
+    return path.read_text(encoding="utf-8").splitlines()
+
+
+def test_records_are_read_back_by_the_next_run(tmp_path):
+    path = tmp_path / "journal.jsonl"
+    with ImportJournal(str(path), "org-1") as journal:
+        journal.record("a@example.com", "id-a")
+        journal.record("b@example.com", "id-b")
+        journal.record("a@example.com", "id-other")
+
+    with ImportJournal(str(path), "org-1") as journal:
+        assert "a@example.com" in journal
+        assert journal.get("b@example.com") == "id-b"
+        assert journal.get("c@example.com") is None
+        assert len(journal) == 2
+    assert json.loads(lines(path)[0]) == {"orgId": "org-1"}
+    assert len(lines(path)) == 3
+
+
+def test_partial_last_line_is_ignored_and_appending_resumes_on_a_new_line(tmp_path):
+    path = tmp_path / "journal.jsonl"
+    path.write_text('{"orgId": "org-1"}\n{"key": "a", "id": "1"}\n{"key": "b", "i', encoding="utf-8")
+
+    with ImportJournal(str(path), "org-1") as journal:
+        assert "a" in journal and "b" not in journal
+        journal.record("b", "2")
+
+    with ImportJournal(str(path), "org-1") as journal:
+        assert journal.get("a") == "1" and journal.get("b") == "2"
+    assert lines(path)[-1] == '{"key": "b", "id": "2"}'
+
+
+def test_lines_that_are_not_entries_are_skipped(tmp_path):
+    path = tmp_path / "journal.jsonl"
+    path.write_text('{"orgId": "org-1"}\n12\n{"key": "a"}\n\n{"key": "b", "id": "2"}\n', encoding="utf-8")
+
+    with ImportJournal(str(path), "org-1") as journal:
+        assert len(journal) == 1 and journal.get("b") == "2"
+
+
+def test_journal_of_another_org_is_discarded(tmp_path):
+    path = tmp_path / "journal.jsonl"
+    with ImportJournal(str(path), "org-1") as journal:
+        journal.record("a", "1")
+
+    with ImportJournal(str(path), "org-2") as journal:
+        assert len(journal) == 0
+        journal.record("b", "2")
+    assert [json.loads(line) for line in lines(path)] == [{"orgId": "org-2"}, {"key": "b", "id": "2"}]
+
+
+def test_empty_file_starts_a_new_journal(tmp_path):
+    path = tmp_path / "journal.jsonl"
+    path.write_text("", encoding="utf-8")
+
+    with ImportJournal(str(path), "org-1") as journal:
+        journal.record("a", "1")
+    assert [json.loads(line) for line in lines(path)] == [{"orgId": "org-1"}, {"key": "a", "id": "1"}]
+
+
+def test_fsync_every_batch(tmp_path, monkeypatch):
+    synced = []
+    monkeypatch.setattr("import_journal.os.fsync", lambda fd: synced.append(fd))
+    journal = ImportJournal(str(tmp_path / "journal.jsonl"), "org-1", fsync_every=3)
+    synced.clear()
+
+    for index in range(7):
+        journal.record(str(index), index)
+    assert len(synced) == 2
+    journal.close()
+    journal.close()
+    assert len(synced) == 3
+
+
+def test_concurrent_records_are_all_written_once(tmp_path):
+    path = tmp_path / "journal.jsonl"
+    journal = ImportJournal(str(path), "org-1", fsync_every=1000)
+
+    def worker(offset):
+        for index in range(200):
+            journal.record(str((offset + index) % 500), index)
+
+    threads = [threading.Thread(target=worker, args=(offset,)) for offset in range(0, 500, 100)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    journal.close()
+
+    keys = [json.loads(line)["key"] for line in lines(path)[1:]]
+    assert sorted(keys, key=int) == [str(index) for index in range(500)]
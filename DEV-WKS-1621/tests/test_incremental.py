@@ -0,0 +1,147 @@
+# -*- coding: utf-8 -*-
+"""
+@description: Tests of the versionStamp diff in adapter/incremental.py with a fake
+              AXL client and a previous export in a temporary directory.
+"""
+
+import json
+
+import pytest
+
+from adapter import incremental
+
+CONFIG_LIST = {"Phone": [{"devicePoolName": "Test_DP"}, {"name": ""}, "phone"]}
+
+
+def phone(name, stamp, owner=None, lines=()):
+    return {
+        "name": name,
+        "versionStamp": stamp,
+        "ownerUserName": owner,
+        "lines": {"line": [{"index": 1, "dirn": {"pattern": pattern, "routePartitionName": "PT"}} for pattern in lines]}
+        if lines else None,
+    }
+
+
+class FakeClient(object):
+    """
+    AXL client returning records from dicts and recording every get* call.
+    """
+
+    def __init__(self, phones, users=(), lines=()):
+        self.phones = {record["name"]: record for record in phones}
+        self.users = {record["userid"]: record for record in users}
+        self.lines = {(record["pattern"], record["routePartitionName"]): record for record in lines}
+        self.calls = []
+
+    def getPhone(self, name):
+        self.calls.append(("getPhone", name))
+        return {"return": {"phone": self.phones[name]}}
+
+    def getUser(self, userid):
+        self.calls.append(("getUser", userid))
+        return {"return": {"user": self.users[userid]}}
+
+    def getLine(self, pattern, routePartitionName):
+        self.calls.append(("getLine", pattern))
+        return {"return": {"line": self.lines[(pattern, routePartitionName)]}}
+
+
+class FakeSource(object):
+    def __init__(self, client):
+        self.client = client
+
+
+@pytest.fixture
+def previous(tmp_path):
+    exports = {
+        "Phone": [
+            phone("SEP1", "{111-AAA}", "alice", ["100"]),
+            phone("SEP2", "{222-BBB}", "bob", ["200"]),
+            phone("SEP3", "{333-CCC}", "carol", ["300"]),
+        ],
+        "User": [{"userid": "alice", "v": 1}, {"userid": "bob", "v": 1}, {"userid": "carol", "v": 1}],
+        "Line": [
+            {"pattern": "100", "routePartitionName": "PT", "v": 1},
+            {"pattern": "200", "routePartitionName": "PT", "v": 1},
+            {"pattern": "300", "routePartitionName": "PT", "v": 1},
+        ],
+    }
+    for dtype, records in exports.items():
+        (tmp_path / f"{dtype}.json").write_text(json.dumps(records))
+    return tmp_path
+
+
+def run(monkeypatch, directory, stamps, client):
+    monkeypatch.setattr(incremental, "query_version_stamps", lambda *args: stamps)
+    return incremental.pull_incremental(FakeSource(client), CONFIG_LIST, str(directory))
+
+
+def test_normalize_stamp_matches_axl_and_sql_forms():
+    assert incremental.normalize_stamp("{1739376906-7FC1685A}") == incremental.normalize_stamp("1739376906-7fc1685a")
+    assert incremental.normalize_stamp(None) == ""
+
+
+def test_unchanged_export_fetches_nothing(monkeypatch, previous):
+    client = FakeClient([])
+    stamps = {"SEP1": "111-aaa", "SEP2": "222-bbb", "SEP3": "333-ccc"}
+
+    result = run(monkeypatch, previous, stamps, client)
+
+    assert client.calls == []
+    assert [record["name"] for record in result["Phone"]] == ["SEP1", "SEP2", "SEP3"]
+    assert len(result["User"]) == 3 and len(result["Line"]) == 3
+
+
+def test_changed_new_and_deleted_phones(monkeypatch, previous):
+    client = FakeClient(
+        phones=[phone("SEP2", "{222-NEW}", "bob", ["201"]), phone("SEP4", "{444-DDD}", "dave", ["400"])],
+        users=[{"userid": "bob", "v": 2}, {"userid": "dave", "v": 1}],
+        lines=[{"pattern": "201", "routePartitionName": "PT", "v": 1}, {"pattern": "400", "routePartitionName": "PT", "v": 1}],
+    )
+    # SEP2 changed, SEP3 deleted, SEP4 new
+    stamps = {"SEP1": "111-AAA", "SEP2": "222-NEW", "SEP4": "444-DDD"}
+
+    result = run(monkeypatch, previous, stamps, client)
+
+    assert sorted(call for call in client.calls if call[0] == "getPhone") == [("getPhone", "SEP2"), ("getPhone", "SEP4")]
+    assert [record["name"] for record in result["Phone"]] == ["SEP1", "SEP2", "SEP4"]
+    assert result["Phone"][1]["versionStamp"] == "{222-NEW}"
+
+    # Owners of changed phones are refreshed, unreferenced users pruned
+    assert {"userid": "bob", "v": 2} in result["User"]
+    assert {"userid": "alice", "v": 1} in result["User"]
+    assert "carol" not in [user["userid"] for user in result["User"]]
+    assert ("getUser", "alice") not in client.calls
+
+    # Lines follow the phones: 200 and 300 are no longer referenced
+    assert [line["pattern"] for line in result["Line"]] == ["100", "201", "400"]
+    assert ("getLine", "100") not in client.calls
+
+
+def test_failed_fetch_keeps_the_previous_record(monkeypatch, previous):
+    client = FakeClient([])
+    stamps = {"SEP1": "111-CHANGED", "SEP2": "222-BBB", "SEP3": "333-CCC"}
+
+    result = run(monkeypatch, previous, stamps, client)
+
+    assert ("getPhone", "SEP1") in client.calls
+    assert [record["name"] for record in result["Phone"]] == ["SEP1", "SEP2", "SEP3"]
+    assert result["Phone"][0]["versionStamp"] == "{111-AAA}"
+
+
+def test_first_run_without_previous_export_fetches_everything(monkeypatch, tmp_path):
+    client = FakeClient(
+        phones=[phone("SEP1", "{1}", "alice", ["100"])],
+        users=[{"userid": "alice"}],
+        lines=[{"pattern": "100", "routePartitionName": "PT"}],
+    )
+
+    result = run(monkeypatch, tmp_path, {"SEP1": "1"}, client)
+
+    assert sorted(client.calls) == [("getLine", "100"), ("getPhone", "SEP1"), ("getUser", "alice")]
+    assert len(result["Phone"]) == len(result["User"]) == len(result["Line"]) == 1
+
+
+def test_falls_back_when_version_stamps_are_not_available(monkeypatch, previous):
+    assert run(monkeypatch, previous, None, FakeClient([])) is None
@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+"""
+@description: Tests of the incremental JSON array reader in json_stream.py.
+"""
+
+import json
+import random
+
+import pytest
+
+from json_stream import iter_array
+
+CHUNK_SIZES = [1, 2, 3, 7, 64, 1 << 20]
+
+
+def write(tmp_path, text):
+    path = tmp_path / "export.json"
+    path.write_text(text, encoding="utf-8")
+    return str(path)
+
+
+def random_value(rng, depth=0):
+    kind = rng.randrange(8 if depth < 3 else 5)
+    if kind == 0:
+        return rng.choice([None, True, False])
+    if kind == 1:
+        return rng.randint(-10 ** 6, 10 ** 6)
+    if kind == 2:
+        return rng.choice([-7.5e3, 0.25, 1e-9, -0.0, 12345.678])
+    if kind in (3, 4):
+        return "".join(rng.choice('ab"\\ \né€{}[],:') for _ in range(rng.randrange(6)))
+    if kind in (5, 6):
+        return {f"k{index}": random_value(rng, depth + 1) for index in range(rng.randrange(4))}
+    return [random_value(rng, depth + 1) for _ in range(rng.randrange(4))]
+
+
+@pytest.mark.parametrize("chunk_size", CHUNK_SIZES)
+@pytest.mark.parametrize("indent", [None, 4])
+def test_matches_json_load(tmp_path, chunk_size, indent):
+    rng = random.Random(chunk_size)
+    records = [random_value(rng) for _ in range(60)]
+    path = write(tmp_path, json.dumps(records, indent=indent))
+
+    assert list(iter_array(path, chunk_size=chunk_size)) == records
+
+
+@pytest.mark.parametrize("chunk_size", CHUNK_SIZES)
+def test_numbers_split_across_chunks(tmp_path, chunk_size):
+    path = write(tmp_path, "[-7.5e3, 123456789, 0.125 ,1e-3]")
+
+    assert list(iter_array(path, chunk_size=chunk_size)) == [-7.5e3, 123456789, 0.125, 1e-3]
+
+
+@pytest.mark.parametrize("text", ["[]", "  [ ]  ", "[\n]\n"])
+def test_empty_arrays(tmp_path, text):
+    assert list(iter_array(write(tmp_path, text), chunk_size=1)) == []
+
+
+def test_fields_projection(tmp_path):
+    path = write(tmp_path, json.dumps([{"name": "SEP1", "model": "8861", "lines": None}, {"model": "7962"}, 5]))
+
+    assert list(iter_array(path, fields=["name", "lines"])) == [{"name": "SEP1", "lines": None}, {}, 5]
+
+
+@pytest.mark.parametrize("text", [
+    "",
+    "{}",
+    "[,,1]",
+    "[,1]",
+    "[1,,2]",
+    "[1,]",
+    "[1 2]",
+    "[1",
+    "[1,",
+    "[{\"a\": 1}",
+    "[1] 2",
+    "[] []",
+])
+@pytest.mark.parametrize("chunk_size", [1, 1 << 20])
+def test_rejects_malformed_arrays(tmp_path, text, chunk_size):
+    with pytest.raises(ValueError):
+        list(iter_array(write(tmp_path, text), chunk_size=chunk_size))
+
+
+def test_large_element_grows_the_read_size(tmp_path):
+    records = [{"blob": "x" * 50000}, {"blob": "y"}]
+    path = write(tmp_path, json.dumps(records))
+
+    assert list(iter_array(path, chunk_size=16)) == records
@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+"""
+@description: Tests of the owner personId lookup of webex_device_import.py.
+"""
+
+import asyncio
+
+import pytest
+
+from conftest import ROOT_DIR
+from people_directory import PeopleDirectory
+
+
+@pytest.fixture
+def device_import(monkeypatch):
+    # The module reads ./data_import/config.json when it is imported
+    monkeypatch.chdir(ROOT_DIR)
+    import webex_device_import
+    return webex_device_import
+
+
+class FakeClient(object):
+    """
+    Answers every people lookup with the next (status, data) of `responses`.
+    """
+
+    def __init__(self, responses):
+        self.responses = list(responses)
+        self.requests = []
+
+    async def _send(self, operation, method, url, payload=None, params=None):
+        self.requests.append(params["email"])
+        status, data = self.responses.pop(0)
+        return status, data, {}
+
+
+def resolve(device_import, client, email, directory):
+    return asyncio.run(device_import.resolve_person_id(client, email, directory))
+
+
+def test_found_person_is_added_to_the_directory(device_import):
+    directory = PeopleDirectory([])
+    client = FakeClient([(200, {"items": [{"id": "p1"}]})])
+
+    assert resolve(device_import, client, "A@example.com", directory) == "p1"
+    assert resolve(device_import, client, "a@example.com", directory) == "p1"
+    assert client.requests == ["A@example.com"]
+
+
+def test_empty_result_is_remembered_as_missing(device_import):
+    directory = PeopleDirectory([])
+    client = FakeClient([(200, {"items": []})])
+
+    assert resolve(device_import, client, "a@example.com", directory) == ""
+    assert directory.is_missing("a@example.com")
+    assert resolve(device_import, client, "a@example.com", directory) == ""
+    assert client.requests == ["a@example.com"]
+
+
+@pytest.mark.parametrize("status", [400, 401, 404, 429, 500, 503])
+def test_error_status_is_not_remembered_as_missing(device_import, status):
+    directory = PeopleDirectory([])
+    client = FakeClient([(status, {"message": "error"}), (200, {"items": [{"id": "p1"}]})])
+
+    assert asyncio.run(device_import.get_person_id_async(FakeClient([(status, {})]), "a@example.com")) is None
+    assert resolve(device_import, client, "a@example.com", directory) == ""
+    assert not directory.is_missing("a@example.com")
+    assert resolve(device_import, client, "a@example.com", directory) == "p1"
+    assert client.requests == ["a@example.com", "a@example.com"]
@@ -0,0 +1,153 @@
+# -*- coding: utf-8 -*-
+"""
+@description: Tests of the SCIM Bulk user import of webex_user_import.py: results
+              mapped back by bulkId, single POST fallback and the people refresh.
+"""
+
+import asyncio
+
+import pytest
+
+import people_directory
+from conftest import ROOT_DIR
+from people_directory import PeopleDirectory
+
+
+@pytest.fixture
+def user_import(monkeypatch):
+    # The module reads ./data_import/config.json when it is imported
+    monkeypatch.chdir(ROOT_DIR)
+    import webex_user_import
+    return webex_user_import
+
+
+def user(email):
+    return {"User ID/Email (Required)": email, "First Name": "First", "Last Name": "Last", "Display Name": email}
+
+
+class FakeClient(object):
+    """
+    Answers the Bulk request with `bulk(operations)` and single POSTs with an id.
+    """
+
+    def __init__(self, bulk):
+        self.bulk = bulk
+        self.bulk_requests = []
+        self.singles = []
+
+    async def post(self, operation, url, payload):
+        if operation == "bulk create people":
+            self.bulk_requests.append(payload["Operations"])
+            return self.bulk(payload["Operations"])
+        self.singles.append(payload["emails"][0])
+        return {"id": f"person-{payload['emails'][0]}", "emails": payload["emails"]}
+
+
+def created(operation, code=201):
+    return {
+        "bulkId": operation["bulkId"],
+        "status": str(code),
+        "location": f"https://scim/Users/scim-{operation['data']['userName']}",
+    }
+
+
+def test_results_are_mapped_back_by_bulk_id(user_import):
+    users = [user(f"u{index}@example.com") for index in range(4)]
+    client = FakeClient(lambda operations: {"Operations": [created(operation) for operation in reversed(operations)]})
+
+    responses = asyncio.run(user_import.push_users_bulk_async(client, users))
+    assert [response["id"] for response in responses] == [f"scim-u{index}@example.com" for index in range(4)]
+    assert [operation["bulkId"] for operation in client.bulk_requests[0]] == ["0", "1", "2", "3"]
+    assert client.singles == []
+
+
+def test_failed_and_unknown_operations_fall_back_to_single_posts(user_import):
+    users = [user(f"u{index}@example.com") for index in range(4)]
+
+    def bulk(operations):
+        return {"Operations": [
+            created(operations[0]),
+            {"bulkId": "1", "status": {"code": 409}},
+            dict(created(operations[2]), bulkId="7"),
+            {"status": "201"},
+        ]}
+
+    client = FakeClient(bulk)
+    responses = asyncio.run(user_import.push_users_bulk_async(client, users))
+    assert responses[0]["id"] == "scim-u0@example.com"
+    assert [response["id"] for response in responses[1:]] == [f"person-u{index}@example.com" for index in (1, 2, 3)]
+    assert client.singles == ["u1@example.com", "u2@example.com", "u3@example.com"]
+
+
+def test_failed_bulk_request_falls_back_for_the_whole_batch(user_import):
+    def bulk(operations):
+        raise RuntimeError("bulk failed")
+
+    client = FakeClient(bulk)
+    responses = asyncio.run(user_import.push_users_bulk_async(client, [user("a@example.com"), user("b@example.com")]))
+    assert [response["id"] for response in responses] == ["person-a@example.com", "person-b@example.com"]
+
+
+def test_existing_people_are_skipped_and_keep_their_index(user_import):
+    directory = PeopleDirectory([{"id": "p-b", "emails": ["b@example.com"]}])
+    client = FakeClient(lambda operations: {"Operations": [created(operation) for operation in operations]})
+
+    responses = asyncio.run(user_import.push_users_bulk_async(
+        client, [user("a@example.com"), user("b@example.com"), user("c@example.com")], directory
+    ))
+    assert [operation["bulkId"] for operation in client.bulk_requests[0]] == ["0", "2"]
+    assert responses[1] == {"id": "p-b", "skipped": "Person already exists"}
+    assert [responses[0]["id"], responses[2]["id"]] == ["scim-a@example.com", "scim-c@example.com"]
+
+
+def run_bulk_import(user_import, monkeypatch, tmp_path, bulk, listings):
+    """
+    Runs import_users_to_webex in bulk mode against a FakeClient.
+
+    Returns:
+        tuple: (directory, number of people listings).
+    """
+    directory = PeopleDirectory([])
+    listed = []
+
+    def fetch_people(headers, org_id, scheduler=None):
+        listed.append(org_id)
+        return listings
+
+    def run_import(headers, rows, push, on_result, max_in_flight, scheduler=None):
+        async def main():
+            client = FakeClient(bulk)
+            for batch in rows:
+                on_result(batch, await push(client, batch))
+        asyncio.run(main())
+        return {}
+
+    monkeypatch.setattr(user_import, "JOURNAL_FILE", str(tmp_path / "journal.jsonl"))
+    monkeypatch.setattr(user_import, "RESULTS_FILE", str(tmp_path / "results.jsonl"))
+    monkeypatch.setattr(user_import, "PEOPLE_SNAPSHOT_TTL", 0)
+    monkeypatch.setattr(user_import, "SCIM_BULK_SIZE", 2)
+    monkeypatch.setattr(user_import, "shared_directory", lambda *args: directory)
+    monkeypatch.setattr(user_import, "run_import", run_import)
+    monkeypatch.setattr(people_directory, "fetch_people", fetch_people)
+
+    summary = user_import.import_users_to_webex([user(f"u{index}@example.com") for index in range(5)], bulk=True)
+    assert summary["success_count"] == 5
+    return directory, listed
+
+
+def test_people_are_listed_once_after_a_bulk_import(user_import, monkeypatch, tmp_path):
+    people = [{"id": f"person-{index}", "emails": [f"u{index}@example.com"]} for index in range(5)]
+    directory, listed = run_bulk_import(
+        user_import, monkeypatch, tmp_path,
+        lambda operations: {"Operations": [created(operation) for operation in operations]},
+        people,
+    )
+    assert len(listed) == 1
+    assert [directory.person_id(f"U{index}@example.com") for index in range(5)] == [f"person-{index}" for index in range(5)]
+
+
+def test_people_are_not_listed_again_without_bulk_creations(user_import, monkeypatch, tmp_path):
+    directory, listed = run_bulk_import(user_import, monkeypatch, tmp_path, lambda operations: {"Operations": []}, [])
+    assert listed == []
+    # Single POSTs add the people they create themselves
+    assert directory.person_id("u0@example.com") == "person-u0@example.com"
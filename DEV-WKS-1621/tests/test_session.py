@@ -0,0 +1,122 @@
+# -*- coding: utf-8 -*-
+"""
+@description: Tests of the AXL session cookie auth and pooled adapter in
+              ciscoaxl/session.py against a local HTTP server.
+"""
+
+import base64
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+from ciscoaxl.session import PooledAdapter, SessionCookieAuth
+
+BASIC = "Basic " + base64.b64encode(b"axl:secret").decode()
+
+
+class CucmHandler(BaseHTTPRequestHandler):
+    """
+    Hands out a JSESSIONID on Basic auth and accepts it until it is revoked.
+    """
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        server = self.server
+        self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        cookie = self.headers.get("Cookie", "")
+        authorization = self.headers.get("Authorization")
+        server.seen.append("cookie" if "JSESSIONID=" in cookie else "basic" if authorization else "none")
+        headers = {}
+        if "JSESSIONID=" in cookie:
+            session = cookie.split("JSESSIONID=")[1].split(";")[0]
+            status = 200 if session in server.sessions else 401
+        elif authorization == BASIC:
+            server.issued += 1
+            session = f"s{server.issued}"
+            server.sessions.add(session)
+            headers["Set-Cookie"] = f"JSESSIONID={session}; Path=/"
+            status = 200
+        else:
+            status = 401
+        body = str(status).encode()
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def cucm():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), CucmHandler)
+    server.seen = []
+    server.sessions = set()
+    server.issued = 0
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def session():
+    session = requests.Session()
+    adapter = PooledAdapter(pool_connections=1, pool_maxsize=4)
+    session.mount("http://", adapter)
+    session.auth = SessionCookieAuth("axl", "secret", session)
+    yield session
+    session.close()
+
+
+def url(server):
+    return f"http://127.0.0.1:{server.server_address[1]}/axl/"
+
+
+def test_basic_auth_only_until_the_session_cookie_arrives(cucm, session):
+    for _ in range(3):
+        assert session.post(url(cucm), data="<soap/>").status_code == 200
+
+    assert cucm.seen == ["basic", "cookie", "cookie"]
+    assert session.auth.stats() == {"basic_auth_requests": 1, "cookie_auth_requests": 2, "session_renewals": 0}
+
+
+def test_expired_session_is_replayed_with_basic_auth(cucm, session):
+    session.post(url(cucm), data="<soap/>")
+    cucm.sessions.clear()
+
+    response = session.post(url(cucm), data="<soap/>")
+
+    assert response.status_code == 200
+    assert [r.status_code for r in response.history] == [401]
+    assert cucm.seen == ["basic", "cookie", "basic"]
+    assert session.cookies.get("JSESSIONID") == "s2"
+    assert session.auth.stats()["session_renewals"] == 1
+
+    # The renewed session is used again afterwards
+    assert session.post(url(cucm), data="<soap/>").status_code == 200
+    assert cucm.seen[-1] == "cookie"
+
+
+def test_401_without_a_cookie_is_returned_as_is(cucm):
+    session = requests.Session()
+    session.auth = SessionCookieAuth("axl", "wrong", session)
+
+    assert session.post(url(cucm), data="<soap/>").status_code == 401
+    assert session.auth.stats()["session_renewals"] == 0
+
+
+def test_pooled_adapter_counts_reused_connections(cucm, session):
+    for _ in range(5):
+        session.post(url(cucm), data="<soap/>")
+
+    stats = session.get_adapter("http://").stats()
+    assert stats["requests"] == 5
+    assert stats["connections_opened"] == 1
+    assert stats["reused_requests"] == 4
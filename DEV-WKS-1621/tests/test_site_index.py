@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+"""
+@description: Tests of the site index of data_transformation/site_index.py and the
+              user extension check against Line.json.
+"""
+
+import json
+
+import pytest
+
+from conftest import ROOT_DIR
+from site_index import SiteIndex, load_site_index
+
+
+@pytest.fixture
+def transformation(monkeypatch):
+    # transformation reads ./data_collection/adapter/source.json when it is imported
+    monkeypatch.chdir(ROOT_DIR)
+    from data_transformation import transformation
+    return transformation
+
+
+def user(userid, pattern, partition="PT"):
+    return {"userid": userid, "firstName": "First", "lastName": userid, "displayName": userid,
+            "primaryExtension": {"pattern": pattern, "routePartitionName": partition}}
+
+
+def test_load_site_index_keeps_only_the_index_keys(tmp_path):
+    exports = {
+        "Phone": [{"name": "SEP001122334455", "ownerUserName": "alice", "model": "Cisco 8845", "lines": None}],
+        "User": [user("alice", "1000")],
+        "Line": [{"pattern": "1000", "routePartitionName": "PT", "description": "Alice"}],
+    }
+    for dtype, records in exports.items():
+        with open(tmp_path / f"{dtype}.json", "w") as file:
+            json.dump(records, file)
+
+    index = load_site_index(str(tmp_path))
+
+    assert index.phone("SEP001122334455") == {"name": "SEP001122334455", "ownerUserName": "alice"}
+    assert set(index.user("alice")) == {"userid", "primaryExtension"}
+    assert index.line("1000", "PT") == {"pattern": "1000", "routePartitionName": "PT"}
+    assert index.line("1000") is None
+
+
+def test_extension_missing_from_line_json_is_kept_and_reported(transformation, capsys):
+    index = SiteIndex(lines=[{"pattern": "1000", "routePartitionName": "PT"}])
+    rows = transformation.user_rows([user("alice", "1000"), user("bob", "2000"), user("carol", "2000", None)], "SITE", index)
+
+    assert [row["Extension"] for row in rows] == ["1000", "2000", "2000"]
+    assert index.missing_lines == {("2000", "PT"), ("2000", "")}
+    assert transformation.report_missing_lines(index) == 2
+    assert "2 user extensions are not in Line.json, written as is: 2000, 2000@PT" in capsys.readouterr().out
+
+
+def test_nothing_is_reported_missing_without_line_records(transformation):
+    index = SiteIndex()
+    rows = transformation.user_rows([user("alice", "1000")], "SITE", index)
+
+    assert rows[0]["Extension"] == "1000"
+    assert transformation.report_missing_lines(index) == 0
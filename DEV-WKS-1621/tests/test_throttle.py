@@ -0,0 +1,139 @@
+# -*- coding: utf-8 -*-
+"""
+@description: Tests of the AIMD limiter in ciscoaxl/throttle.py.
+"""
+
+import threading
+
+import pytest
+from zeep.exceptions import Fault, TransportError
+
+from ciscoaxl.throttle import AdaptiveThrottle, ThrottledService, is_throttle_error
+
+
+def test_is_throttle_error():
+    assert is_throttle_error(TransportError(status_code=503))
+    assert is_throttle_error(TransportError(status_code=429))
+    assert not is_throttle_error(TransportError(status_code=500))
+    assert is_throttle_error(Fault("Maximum AXL Memory Allocation Consumed"))
+    assert not is_throttle_error(Fault("Item not valid: The specified Phone was not found"))
+    assert not is_throttle_error(ValueError("anything"))
+
+
+def test_healthy_responses_increase_the_limit_additively():
+    throttle = AdaptiveThrottle(initial_limit=2, max_limit=3)
+    for _ in range(4):
+        throttle.call(lambda: None)
+
+    assert 2 < throttle.limit <= 3
+    for _ in range(50):
+        throttle.call(lambda: None)
+    assert throttle.limit == 3
+
+
+def test_slow_responses_do_not_increase_the_limit():
+    throttle = AdaptiveThrottle(initial_limit=2, target_latency=-1)
+    throttle.call(lambda: None)
+
+    assert throttle.limit == 2
+
+
+def test_reject_halves_the_limit_once_per_cooldown_window():
+    throttle = AdaptiveThrottle(initial_limit=8, cooldown=60)
+    for _ in range(3):
+        throttle.acquire()
+    for _ in range(3):
+        throttle.release(throttled=True)
+
+    assert throttle.limit == 4
+    assert throttle.rejects == 3
+    assert throttle.in_flight == 0
+
+
+def test_limit_never_drops_below_min_limit():
+    throttle = AdaptiveThrottle(initial_limit=2, min_limit=1, cooldown=0)
+    for _ in range(5):
+        throttle.acquire()
+        throttle.release(throttled=True)
+
+    assert throttle.limit == 1
+
+
+def test_call_retries_throttle_rejects_then_succeeds():
+    throttle = AdaptiveThrottle(cooldown=0.001, max_cooldown=0.001)
+    attempts = []
+
+    def operation():
+        attempts.append(1)
+        if len(attempts) < 3:
+            raise TransportError(status_code=503)
+        return "ok"
+
+    assert throttle.call(operation) == "ok"
+    assert throttle.stats()["retries"] == 2
+    assert throttle.stats()["rejects"] == 2
+
+
+def test_call_raises_other_errors_without_retrying():
+    throttle = AdaptiveThrottle()
+    attempts = []
+
+    def operation():
+        attempts.append(1)
+        raise Fault("Item not valid")
+
+    with pytest.raises(Fault):
+        throttle.call(operation)
+    assert len(attempts) == 1
+    assert throttle.in_flight == 0
+
+
+def test_call_gives_up_after_max_retries():
+    throttle = AdaptiveThrottle(cooldown=0.001, max_cooldown=0.001, max_retries=2)
+
+    def operation():
+        raise TransportError(status_code=429)
+
+    with pytest.raises(TransportError):
+        throttle.call(operation)
+    assert throttle.stats()["requests"] == 3
+    assert throttle.stats()["retries"] == 2
+
+
+def test_concurrent_calls_stay_within_the_limit_and_count_every_request():
+    throttle = AdaptiveThrottle(initial_limit=3, max_limit=3)
+    lock = threading.Lock()
+    state = {"running": 0, "peak": 0}
+
+    def operation():
+        with lock:
+            state["running"] += 1
+            state["peak"] = max(state["peak"], state["running"])
+        with lock:
+            state["running"] -= 1
+
+    threads = [threading.Thread(target=lambda: [throttle.call(operation) for _ in range(50)]) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert state["peak"] <= 3
+    assert throttle.stats()["requests"] == 400
+    assert throttle.in_flight == 0
+
+
+def test_throttled_service_proxies_operations():
+    class Service(object):
+        version = "14.0"
+
+        def getPhone(self, name):
+            return {"name": name}
+
+    throttle = AdaptiveThrottle()
+    service = ThrottledService(Service(), throttle)
+
+    assert service.getPhone(name="SEP1") == {"name": "SEP1"}
+    assert service["getPhone"]("SEP2") == {"name": "SEP2"}
+    assert service.version == "14.0"
+    assert throttle.requests == 2
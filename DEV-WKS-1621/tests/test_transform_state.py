@@ -0,0 +1,172 @@
+# -*- coding: utf-8 -*-
+"""
+@description: Tests of the incremental reruns of data_transformation/transformation.py:
+              skipped CSVs, re-extraction of the changed records only, and the
+              <name>.changed.csv rows relative to the last Webex import.
+"""
+
+import csv
+import json
+import os
+import shutil
+
+import pytest
+
+from conftest import ROOT_DIR
+
+
+@pytest.fixture
+def transformation(monkeypatch):
+    # transformation reads ./data_collection/adapter/source.json when it is imported
+    monkeypatch.chdir(ROOT_DIR)
+    from data_transformation import transformation
+    return transformation
+
+
+@pytest.fixture
+def site_dir(transformation, tmp_path):
+    """
+    Copy of the first bundled site, so the tests can edit its exports.
+    """
+    site = transformation.discover_sites()[0]
+    directory = tmp_path / "exports" / site
+    shutil.copytree(os.path.join(transformation.EXPORT_DIR, site), directory)
+    return str(directory)
+
+
+def read(path):
+    with open(path, "r", encoding="utf-8") as file:
+        return file.read()
+
+
+def read_rows(path):
+    with open(path, "r", newline="", encoding="utf-8") as file:
+        return list(csv.DictReader(file))
+
+
+def load(path):
+    with open(path, "r") as file:
+        return json.load(file)
+
+
+def dump(path, records):
+    with open(path, "w") as file:
+        json.dump(records, file, indent=4)
+
+
+def count_extractions(monkeypatch, spec):
+    extracted = []
+    row = spec.row
+
+    def counting_row(record, **context):
+        extracted.append(record)
+        return row(record, **context)
+
+    monkeypatch.setattr(spec, "row", counting_row)
+    return extracted
+
+
+def mark_all_imported(output_file):
+    from transform_state import mark_imported, row_fingerprint
+
+    return mark_imported(output_file, {row_fingerprint(tuple(row.values())) for row in read_rows(output_file)})
+
+
+def test_rerun_after_merge_rewrites_the_site_csvs(transformation, tmp_path):
+    output_dir = str(tmp_path / "output")
+    os.makedirs(output_dir)
+    sites = transformation.discover_sites()
+    input_dir = os.path.join(transformation.EXPORT_DIR, sites[0])
+    transformation.transform_directory(input_dir, output_dir)
+    expected = read(os.path.join(output_dir, "User.csv"))
+
+    for site in sites:
+        transformation.transform_site(site, output_dir)
+    transformation.merge_sites(sites, output_dir)
+    assert read(os.path.join(output_dir, "User.csv")) != expected
+
+    transformation.transform_directory(input_dir, output_dir)
+    assert read(os.path.join(output_dir, "User.csv")) == expected
+
+
+def test_rerun_skips_untouched_csvs(transformation, site_dir, tmp_path):
+    output_dir = str(tmp_path / "output")
+    transformation.transform_directory(site_dir, output_dir)
+    user_csv = os.path.join(output_dir, "User.csv")
+    mtime = os.stat(user_csv).st_mtime_ns
+
+    transformation.transform_directory(site_dir, output_dir)
+    assert os.stat(user_csv).st_mtime_ns == mtime
+
+
+def test_only_changed_records_are_extracted_again(transformation, site_dir, tmp_path, monkeypatch):
+    output_dir = str(tmp_path / "output")
+    transformation.transform_directory(site_dir, output_dir)
+    phone_csv = os.path.join(output_dir, "Phone.csv")
+    expected = read_rows(phone_csv)
+
+    phone_json = os.path.join(site_dir, "Phone.json")
+    phones = load(phone_json)
+    phones[0]["model"] = "Cisco 8865"
+    # Fields the transformation does not read do not cause an extraction
+    phones[-1]["description"] = "Renamed"
+    dump(phone_json, phones)
+    extracted = count_extractions(monkeypatch, transformation.PHONE_SPEC)
+    transformation.transform_directory(site_dir, output_dir)
+
+    assert [record["name"] for record in extracted] == [phones[0]["name"]]
+    expected[0]["Model"] = "Cisco 8865"
+    assert read_rows(phone_csv) == expected
+
+
+def test_changed_rows_are_relative_to_the_last_import(transformation, site_dir, tmp_path):
+    output_dir = str(tmp_path / "output")
+    transformation.transform_directory(site_dir, output_dir)
+    phone_csv = os.path.join(output_dir, "Phone.csv")
+    changed_csv = os.path.join(output_dir, "Phone.changed.csv")
+    phone_json = os.path.join(site_dir, "Phone.json")
+    phones = load(phone_json)
+    assert len(phones) > 1
+
+    # Nothing imported yet: a rerun after an edit still offers every row
+    phones[0]["model"] = "Cisco 8865"
+    dump(phone_json, phones)
+    transformation.transform_directory(site_dir, output_dir)
+    assert len(read_rows(changed_csv)) == len(phones)
+
+    assert mark_all_imported(phone_csv) == len(phones)
+    # An unchanged rerun rewrites the delta against the new baseline
+    transformation.transform_directory(site_dir, output_dir)
+    assert read_rows(changed_csv) == []
+
+    phones[1]["model"] = "Cisco 8845"
+    dump(phone_json, phones)
+    transformation.transform_directory(site_dir, output_dir)
+    assert [row["Model"] for row in read_rows(changed_csv)] == ["Cisco 8845"]
+
+
+def test_same_pattern_in_two_partitions_is_tracked_separately(transformation, tmp_path):
+    from transform_state import STATE_FILE
+
+    site_dir = tmp_path / "exports" / "SITE"
+    os.makedirs(site_dir)
+    for dtype in ["Phone", "User"]:
+        dump(site_dir / f"{dtype}.json", [])
+    line_json = site_dir / "Line.json"
+    dump(line_json, [
+        {"pattern": "1000", "routePartitionName": "PT1"},
+        {"pattern": "1000", "routePartitionName": "PT2"},
+    ])
+    output_dir = str(tmp_path / "output")
+    transformation.transform_directory(str(site_dir), output_dir)
+    dn_csv = os.path.join(output_dir, "DirectoryNumber.csv")
+    assert mark_all_imported(dn_csv) == 2
+
+    dump(line_json, [{"pattern": "1000", "routePartitionName": "PT1"}])
+    transformation.transform_directory(str(site_dir), output_dir)
+
+    entry = load(os.path.join(output_dir, STATE_FILE))["outputs"]["DirectoryNumber.csv"]
+    assert list(entry["records"]) == ["1000@PT1"]
+    assert entry["removed"] == ["1000@PT2"]
+    assert entry["changed"] == 0
+    assert read_rows(os.path.join(output_dir, "DirectoryNumber.changed.csv")) == []
@@ -0,0 +1,178 @@
+# -*- coding: utf-8 -*-
+"""
+@description: Tests of the Retry-After parsing, the token bucket and the throttle
+              retries of webex_client.py, against a local aiohttp server.
+"""
+
+import asyncio
+import time
+from email.utils import formatdate
+
+from aiohttp import web
+
+from webex_client import MAX_RETRY_AFTER, LatencyStats, RateScheduler, WebexClient, parse_retry_after
+
+
+def test_parse_retry_after_seconds():
+    assert parse_retry_after("3", 0) == 3.0
+    assert parse_retry_after("0.5", 0) == 0.5
+    assert parse_retry_after("-4", 0) == 0.0
+    assert parse_retry_after("86400", 0) == MAX_RETRY_AFTER
+
+
+def test_parse_retry_after_http_date():
+    assert 8 <= parse_retry_after(formatdate(time.time() + 10, usegmt=True), 0) <= 10
+    assert parse_retry_after(formatdate(time.time() - 60, usegmt=True), 0) == 0.0
+
+
+def test_parse_retry_after_falls_back_to_exponential_backoff():
+    assert parse_retry_after(None, 0) == 1.0
+    assert parse_retry_after("", 3) == 8.0
+    assert parse_retry_after("soon", 2) == 4.0
+    assert parse_retry_after(None, 20) == MAX_RETRY_AFTER
+
+
+def test_scheduler_spaces_requests_after_the_burst():
+    scheduler = RateScheduler(rate=10, burst=3)
+    now = time.monotonic()
+    slots = [scheduler.reserve() - now for _ in range(6)]
+
+    assert all(slot < 0.01 for slot in slots[:3])
+    assert [round(slot, 1) for slot in slots[3:]] == [0.1, 0.2, 0.3]
+
+
+def test_unpaced_scheduler_never_waits():
+    scheduler = RateScheduler()
+    now = time.monotonic()
+    assert all(scheduler.reserve() - now < 0.01 for _ in range(100))
+
+
+def test_pause_holds_back_reservations_and_counts_overlap_once():
+    scheduler = RateScheduler()
+    scheduler.pause(0.5)
+    scheduler.pause(0.2)
+    assert scheduler.reserve() - time.monotonic() > 0.4
+
+    stats = scheduler.stats()
+    assert stats["throttled_responses"] == 2
+    assert 0.49 <= stats["throttle_seconds"] <= 0.51
+
+
+def test_wait_sees_a_pause_that_starts_while_waiting():
+    scheduler = RateScheduler(rate=10)
+    scheduler.reserve()
+
+    async def main():
+        start = time.monotonic()
+        waiter = asyncio.ensure_future(scheduler.wait())
+        await asyncio.sleep(0.01)
+        scheduler.pause(0.3)
+        await waiter
+        return time.monotonic() - start
+
+    assert asyncio.run(main()) >= 0.3
+
+
+def test_latency_stats_keep_a_bounded_sample():
+    stats = LatencyStats(size=100, seed=1)
+    for index in range(10000):
+        stats.add(index / 1000)
+
+    summary = stats.summary()
+    assert len(stats.samples) == 100
+    assert summary["requests"] == 10000
+    assert summary["mean_ms"] == 4999.5
+    assert summary["max_ms"] == 9999.0
+    assert 3500 <= summary["p50_ms"] <= 6500
+
+
+def run_server(handler, test):
+    """
+    Runs test(base_url) against a local server answering every request with handler.
+    """
+    async def main():
+        app = web.Application()
+        app.router.add_route("*", "/{tail:.*}", handler)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        site = web.TCPSite(runner, "127.0.0.1", 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        try:
+            return await test(f"http://127.0.0.1:{port}")
+        finally:
+            await runner.cleanup()
+
+    return asyncio.run(main())
+
+
+def test_throttled_request_is_retried_after_retry_after():
+    calls = []
+
+    async def handler(request):
+        calls.append(time.monotonic())
+        if len(calls) < 3:
+            return web.json_response({"message": "slow down"}, status=429, headers={"Retry-After": "0.2"})
+        return web.json_response({"items": [1]})
+
+    async def test(base_url):
+        async with WebexClient({}, scheduler=RateScheduler()) as client:
+            data = await client.get("list", f"{base_url}/people")
+            return data, client.stats()
+
+    data, stats = run_server(handler, test)
+    assert data == {"items": [1]}
+    assert len(calls) == 3
+    assert calls[2] - calls[0] >= 0.4
+    assert stats["throttle"]["retries"] == 2
+    assert stats["throttle"]["throttled_responses"] == 2
+    assert stats["latency"]["list"]["requests"] == 3
+
+
+def test_throttled_response_is_returned_after_max_retries():
+    async def handler(request):
+        return web.json_response({"message": "slow down"}, status=429, headers={"Retry-After": "0"})
+
+    async def test(base_url):
+        async with WebexClient({}, scheduler=RateScheduler(), max_retries=2) as client:
+            return await client._send("list", "GET", f"{base_url}/people"), client.retries
+
+    (status, data, _), retries = run_server(handler, test)
+    assert status == 429 and data == {"message": "slow down"}
+    assert retries == 2
+
+
+def test_503_without_retry_after_is_not_retried():
+    calls = []
+
+    async def handler(request):
+        calls.append(request.path)
+        return web.json_response({}, status=503)
+
+    async def test(base_url):
+        async with WebexClient({}, scheduler=RateScheduler()) as client:
+            return (await client._send("list", "GET", f"{base_url}/people"))[0]
+
+    assert run_server(handler, test) == 503
+    assert len(calls) == 1
+
+
+def test_paused_request_releases_its_in_flight_slot():
+    calls = []
+
+    async def handler(request):
+        calls.append(request.path)
+        if len(calls) == 1:
+            return web.json_response({}, status=429, headers={"Retry-After": "0.3"})
+        return web.json_response({"path": request.path})
+
+    async def test(base_url):
+        async with WebexClient({}, max_in_flight=1, scheduler=RateScheduler()) as client:
+            throttled = asyncio.ensure_future(client.get("get", f"{base_url}/a"))
+            while not client.scheduler.throttled:
+                await asyncio.sleep(0.01)
+            assert not client.semaphore.locked()
+            return await throttled
+
+    assert run_server(handler, test) == {"path": "/a"}
+    assert calls == ["/a", "/a"]
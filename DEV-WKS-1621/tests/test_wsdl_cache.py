@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+"""
+@description: Tests of the on-disk cache of parsed WSDLs in ciscoaxl/wsdl_cache.py.
+"""
+
+import os
+import stat
+
+import pytest
+import zeep
+from zeep import Settings
+from zeep.transports import Transport
+
+from ciscoaxl import wsdl_cache
+
+WSDL = """<?xml version="1.0" encoding="UTF-8"?>
+<definitions xmlns="http://schemas.xmlsoap.org/wsdl/" xmlns:soap="http://schemas.xmlsoap.org/wsdl/soap/"
+             xmlns:xsd="http://www.w3.org/2001/XMLSchema" xmlns:tns="urn:test" targetNamespace="urn:test">
+  <types>
+    <xsd:schema targetNamespace="urn:test" elementFormDefault="qualified">
+      <xsd:element name="ping"><xsd:complexType><xsd:sequence>
+        <xsd:element name="name" type="xsd:string"/>
+      </xsd:sequence></xsd:complexType></xsd:element>
+    </xsd:schema>
+  </types>
+  <message name="pingRequest"><part name="parameters" element="tns:ping"/></message>
+  <portType name="TestPort"><operation name="ping"><input message="tns:pingRequest"/></operation></portType>
+  <binding name="TestBinding" type="tns:TestPort">
+    <soap:binding style="document" transport="http://schemas.xmlsoap.org/soap/http"/>
+    <operation name="ping"><soap:operation soapAction="ping"/><input><soap:body use="literal"/></input></operation>
+  </binding>
+  <service name="TestService">
+    <port name="TestPort" binding="tns:TestBinding"><soap:address location="http://localhost/test"/></port>
+  </service>
+</definitions>
+"""
+
+
+@pytest.fixture
+def schema_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(wsdl_cache, "CACHE_DIR", str(tmp_path / "cache"))
+    directory = tmp_path / "schema"
+    directory.mkdir()
+    (directory / "AXLAPI.wsdl").write_text(WSDL)
+    return str(directory)
+
+
+def load(schema_dir):
+    return wsdl_cache.load_document(
+        os.path.join(schema_dir, "AXLAPI.wsdl"), schema_dir, "14.0", Transport(), Settings()
+    )
+
+
+def test_cache_file_is_keyed_on_zeep_version_and_schema_hash(schema_dir):
+    path = wsdl_cache.cache_path(schema_dir, "14.0")
+    assert f"zeep{zeep.__version__}" in os.path.basename(path)
+
+    with open(os.path.join(schema_dir, "AXLAPI.wsdl"), "a") as wsdl:
+        wsdl.write("<!-- edited -->\n")
+    assert wsdl_cache.cache_path(schema_dir, "14.0") != path
+
+
+def test_cache_file_is_private_and_reused(schema_dir, monkeypatch):
+    document = load(schema_dir)
+    path = wsdl_cache.cache_path(schema_dir, "14.0")
+
+    assert os.path.exists(path)
+    if os.name == "posix":
+        assert stat.S_IMODE(os.stat(path).st_mode) == 0o600
+
+    monkeypatch.setattr(wsdl_cache, "Document", None)
+    cached = load(schema_dir)
+    assert list(cached.services) == list(document.services)
+
+
+@pytest.mark.skipif(not hasattr(os, "getuid"), reason="no user ids on this platform")
+def test_cache_file_of_another_user_is_not_loaded(schema_dir, monkeypatch):
+    path = wsdl_cache.cache_path(schema_dir, "14.0")
+    os.makedirs(os.path.dirname(path))
+    with open(path, "wb") as cache_file:
+        cache_file.write(b"not a pickle")
+    monkeypatch.setattr(os, "getuid", lambda: os.stat(path).st_uid + 1)
+
+    def unpickle(*args):
+        raise AssertionError("unpickled a file of another user")
+
+    monkeypatch.setattr(wsdl_cache, "_DocumentUnpickler", unpickle)
+    assert "TestService" in load(schema_dir).services